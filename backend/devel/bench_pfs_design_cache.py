@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Measure PfsDesignCache read throughput under concurrent load.
+
+The script fills a temporary cache database with synthetic rows (no FITS
+files are needed), then several threads issue the queries the design browser
+makes (paginated list with search/sort/date filters, rank lookup, positions,
+cone search) for a fixed time. It reports requests per second and latency
+percentiles.
+
+With --fibers, it also writes synthetic fiber summaries (proposalId, catId,
+obCode prefixes, fiberStatus) to the side tables the way a cold sync does, and
+reports the write time and the database size.
+
+Usage:
+    uv run python devel/bench_pfs_design_cache.py --rows 20000 --threads 8 --seconds 10
+    uv run python devel/bench_pfs_design_cache.py --rows 4000 --fibers 2394 --seconds 1
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pfs_obslog.pfs_design_cache import (  # noqa: E402
+    _INSERT_SQL,
+    _METADATA_COLUMNS,
+    OB_CODE_PREFIX_LENGTH,
+    FiberFilter,
+    FiberSummary,
+    PfsDesignCache,
+)
+
+NAMES = ["cosmos", "sxds", "elais", "deep2", "ngc4559", "m31", "bright", "faint", "sky", "engineering"]
+
+
+def fill(cache: PfsDesignCache, rows: int, seed: int) -> None:
+    """Insert synthetic rows directly into the cache database."""
+    import math
+
+    rng = random.Random(seed)
+    now = time.time()
+    data = []
+    for i in range(rows):
+        design_id = f"{rng.getrandbits(64):016x}"
+        ra = rng.uniform(0, 360)
+        dec = rng.uniform(-60, 80)
+        ra_rad, dec_rad = math.radians(ra), math.radians(dec)
+        data.append(
+            (
+                design_id,
+                f"pfsDesign-0x{design_id}.fits",
+                f"{rng.choice(NAMES)}_{i}",
+                now - rng.uniform(0, 3 * 365 * 86400),
+                ra,
+                dec,
+                math.cos(dec_rad) * math.cos(ra_rad),
+                math.cos(dec_rad) * math.sin(ra_rad),
+                math.sin(dec_rad),
+                rng.choice(["brn", "bmn", "br"]),
+                2394,
+                11970,
+                6,
+                *[rng.randrange(0, 2000) for _ in range(7)],
+                now,
+            )
+        )
+    conn = sqlite3.connect(cache.db_path)
+    try:
+        with conn:
+            conn.executemany(_INSERT_SQL, data)
+    finally:
+        conn.close()
+
+
+def fill_fibers(cache: PfsDesignCache, fibers: int, prefix_length: int, seed: int) -> None:
+    """Write synthetic fiber summaries for every cached design, as a cold sync does.
+
+    obCodes are "<proposalId>_<objId>", distinct for every fiber.
+    A prefix_length of 0 writes whole obCodes.
+    """
+    rng = random.Random(seed)
+    proposals = [f"S{year}{semester}-{n:03d}" for year in (23, 24, 25) for semester in "AB" for n in range(30)]
+    conn = sqlite3.connect(cache.db_path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(_METADATA_COLUMNS)} FROM pfs_design_metadata").fetchall()
+        batch = []
+        num_ob_codes = 0
+        elapsed = 0.0
+        for i, row in enumerate(rows):
+            proposal_ids = rng.sample(proposals, 3)
+            ob_codes = {f"{rng.choice(proposal_ids)}_{rng.getrandbits(40):012d}" for _ in range(fibers)}
+            if prefix_length:
+                ob_codes = {ob_code[:prefix_length] for ob_code in ob_codes}
+            num_ob_codes += len(ob_codes)
+            summary = FiberSummary(
+                tuple(sorted(proposal_ids)),
+                tuple(sorted({rng.randrange(1, 100) for _ in range(3)})),
+                tuple(sorted(ob_codes)),
+                ((1, fibers - 10), (2, 10)),
+            )
+            batch.append((row, summary))
+            if len(batch) == 500 or i == len(rows) - 1:
+                start = time.perf_counter()
+                cache._write_rows(conn, batch)
+                elapsed += time.perf_counter() - start
+                batch = []
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    print(
+        f"fibers={fibers} ob_code_prefix_length={prefix_length or 'full'}: "
+        f"{num_ob_codes} obCode rows written in {elapsed:.1f}s, "
+        f"database {os.path.getsize(cache.db_path) / 1e6:.1f}MB"
+    )
+
+
+def make_requests(rng: random.Random, fibers: bool = False) -> list:
+    """A mix of requests similar to a user browsing designs."""
+
+    def page(cache: PfsDesignCache) -> None:
+        cache.get_entries_paginated(
+            search=rng.choice([None, None, "co", "cosmos", "sky_1"]),
+            sort_by=rng.choice(["date_modified", "name", "altitude"]),
+            offset=rng.randrange(0, 20) * 50,
+            limit=50,
+            zenith_ra=rng.uniform(0, 360),
+            zenith_dec=rng.uniform(-60, 80),
+            date_from=rng.choice([None, "2025-01-01"]),
+        )
+
+    def rank(cache: PfsDesignCache) -> None:
+        cache.get_design_rank("0000000000000000", search=rng.choice([None, "cosmos"]))
+
+    def positions(cache: PfsDesignCache) -> None:
+        cache.get_positions_filtered(search=rng.choice([None, "sxds"]))
+
+    def cone(cache: PfsDesignCache) -> None:
+        cache.get_entries_in_cone(rng.uniform(0, 360), rng.uniform(-60, 80), 5.0)
+
+    def fiber_page(cache: PfsDesignCache) -> None:
+        cache.get_entries_paginated(
+            fibers=FiberFilter(ob_code=rng.choice(["S2", "S24A", "S25B-0"])), offset=0, limit=50
+        )
+
+    return [page] * 12 + [rank, positions, cone] + ([fiber_page] * 3 if fibers else [])
+
+
+def run(cache: PfsDesignCache, threads: int, seconds: float, fibers: bool = False) -> list[float]:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        requests = make_requests(rng, fibers)
+        local: list[float] = []
+        while time.perf_counter() < deadline:
+            request = rng.choice(requests)
+            start = time.perf_counter()
+            request(cache)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="number of cached designs")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent request threads")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of the measurement")
+    parser.add_argument("--fibers", type=int, default=0, help="fibers per design written to the side tables")
+    parser.add_argument(
+        "--ob-code-prefix-length",
+        type=int,
+        default=OB_CODE_PREFIX_LENGTH,
+        help="length of the obCode prefixes written with --fibers (0 writes whole obCodes)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        design_dir = Path(tmp) / "designs"
+        design_dir.mkdir()
+        cache = PfsDesignCache(Path(tmp) / "cache.db", design_dir)
+        fill(cache, args.rows, args.seed)
+        if args.fibers:
+            fill_fibers(cache, args.fibers, args.ob_code_prefix_length, args.seed)
+        run(cache, args.threads, 1.0, args.fibers > 0)  # warm up
+        latencies = run(cache, args.threads, args.seconds, args.fibers > 0)
+        if hasattr(cache, "close"):
+            cache.close()
+
+    latencies.sort()
+    print(f"rows={args.rows} threads={args.threads} seconds={args.seconds}")
+    print(f"requests: {len(latencies)} ({len(latencies) / args.seconds:.1f} req/s)")
+    print(
+        "latency ms: "
+        f"median={statistics.median(latencies) * 1000:.2f} "
+        f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.2f} "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Butler データセットURIキャッシュ
+
+postISRCCD など Butler 管理下のファイルパスを visit 単位でまとめて
+レジストリから解決し、サイズ上限付きのキャッシュに保持します。
+
+Butler の構築には時間がかかるため、ワーカー起動時に
+バックグラウンドで構築（ウォームアップ）できるようにしています。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from pfs_obslog.config import get_settings
+
+logger = getLogger(__name__)
+
+# (arm, spectrograph) -> ファイルパス
+CameraPaths = dict[tuple[str, int], Path]
+
+
+# ============================================================
+# Butler インスタンス管理
+# ============================================================
+
+_butler_instance: Any = None
+_butler_lock = threading.Lock()
+
+
+def get_butler() -> Any:
+    """Butlerインスタンスを取得（プロセス内で1つだけ構築）
+
+    複数スレッドから同時に呼ばれても構築は1回だけ行われます。
+
+    Raises:
+        ImportError: lsst.daf.butler がインストールされていない場合
+        Exception: Butler の構築に失敗した場合
+    """
+    global _butler_instance
+    if _butler_instance is not None:
+        return _butler_instance
+    with _butler_lock:
+        if _butler_instance is None:
+            from lsst.daf.butler import Butler
+
+            settings = get_settings()
+            start_time = time.time()
+            _butler_instance = Butler(str(settings.butler_datastore), collections=settings.butler_collection)  # type: ignore[no-untyped-call]
+            logger.info(f"Butler initialized in {time.time() - start_time:.2f}s")
+        return _butler_instance
+
+
+def start_butler_warmup() -> Optional[threading.Thread]:
+    """バックグラウンドスレッドでButlerを構築する
+
+    ワーカー起動直後に呼び出すことで、最初のpostISRCCDリクエストが
+    Butler構築のコストを払わずに済むようにします。
+    Butlerが利用できない環境（開発環境など）では何もしません。
+
+    Returns:
+        ウォームアップを行うスレッド（無効化されている場合はNone）
+    """
+    settings = get_settings()
+    if not settings.butler_warmup:
+        return None
+
+    def warmup() -> None:
+        try:
+            get_butler()
+        except ImportError:
+            logger.info("lsst.daf.butler is not available, skipping Butler warmup")
+        except Exception as e:
+            logger.warning(f"Butler warmup failed: {e}")
+
+    thread = threading.Thread(target=warmup, name="butler-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _uri_to_path(uri: Any) -> Path:
+    """Butler の URI（file://...）をファイルパスに変換"""
+    # uri is like file:///data/drp/datastore/drpActor/reductions/20250320T071629Z/postISRCCD/postISRCCD_PFS_121237_r1_drpActor_reductions_20250320T071629Z.fits
+    uri = str(uri)
+    prefix = "file://"
+    if not uri.startswith(prefix):
+        raise FileNotFoundError(f"Unexpected URI format: {uri}")
+    return Path(uri[len(prefix) :])
+
+
+# ============================================================
+# URI キャッシュ
+# ============================================================
+
+
+@dataclass
+class _VisitEntry:
+    """visit 単位のキャッシュエントリ"""
+
+    paths: CameraPaths = field(default_factory=dict)
+    fetched_at: float = 0.0
+
+
+class ButlerUriCache:
+    """Butler データセットのファイルパスをvisit単位でキャッシュする
+
+    レジストリへの問い合わせは visit ごとに1回で、
+    その visit の全カメラ分のURIをまとめて解決します。
+
+    コレクション（CHAINED コレクションの場合は子コレクションの並び）が
+    変化した場合はキャッシュ全体を破棄します。
+    """
+
+    def __init__(
+        self,
+        butler_getter: Callable[[], Any],
+        dataset_type: str,
+        collection: str,
+        max_visits: int = 1024,
+        check_interval: float = 30.0,
+    ):
+        """
+        Args:
+            butler_getter: Butlerインスタンスを返す関数
+            dataset_type: データセットタイプ（例: "postISRCCD"）
+            collection: 検索対象のコレクション
+            max_visits: キャッシュするvisit数の上限
+            check_interval: コレクション変更を確認する間隔（秒）
+        """
+        self._butler_getter = butler_getter
+        self.dataset_type = dataset_type
+        self.collection = collection
+        self.max_visits = max_visits
+        self.check_interval = check_interval
+        self._entries: OrderedDict[int, _VisitEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._collection_signature: Optional[tuple[str, ...]] = None
+        self._checked_at = 0.0
+
+    def get_path(self, visit_id: int, arm: str, spectrograph: int) -> Path:
+        """指定カメラのファイルパスを取得
+
+        Raises:
+            FileNotFoundError: データセットが存在しない場合
+        """
+        paths = self.get_visit_paths(visit_id)
+        path = paths.get((arm, spectrograph))
+        if path is None:
+            entry = self._get_entry(visit_id)
+            # 処理途中のvisitは後からデータセットが追加されるため、
+            # 古いエントリで見つからない場合は問い合わせ直す
+            if entry is not None and time.time() - entry.fetched_at > self.check_interval:
+                self._invalidate_visit(visit_id)
+                path = self.get_visit_paths(visit_id).get((arm, spectrograph))
+        if path is None:
+            raise FileNotFoundError(
+                f"No {self.dataset_type} file for visit={visit_id} arm={arm} spectrograph={spectrograph}"
+            )
+        return path
+
+    def get_visit_paths(self, visit_id: int) -> CameraPaths:
+        """visit の全カメラ分のファイルパスを取得（キャッシュあり）"""
+        self._check_collection()
+        entry = self._get_entry(visit_id)
+        if entry is not None:
+            return entry.paths
+        found = self._query(f"visit = {int(visit_id)}")
+        paths = found.get(visit_id, {})
+        self._store({visit_id: paths})
+        return paths
+
+    def clear(self) -> None:
+        """キャッシュを破棄"""
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, visit_id: int) -> Optional[_VisitEntry]:
+        with self._lock:
+            entry = self._entries.get(visit_id)
+            if entry is not None:
+                self._entries.move_to_end(visit_id)
+            return entry
+
+    def _invalidate_visit(self, visit_id: int) -> None:
+        with self._lock:
+            self._entries.pop(visit_id, None)
+
+    def _store(self, results: dict[int, CameraPaths]) -> None:
+        now = time.time()
+        with self._lock:
+            for visit_id, paths in results.items():
+                self._entries[visit_id] = _VisitEntry(paths=paths, fetched_at=now)
+                self._entries.move_to_end(visit_id)
+            while len(self._entries) > self.max_visits:
+                self._entries.popitem(last=False)
+
+    def _query(self, where: str) -> dict[int, CameraPaths]:
+        """レジストリに問い合わせて visit -> カメラ -> パス の辞書を作成"""
+        try:
+            butler = self._butler_getter()
+            # 同じカメラのデータセットが複数の RUN にある場合は、コレクションの並びで最初のものを使う
+            refs = butler.registry.queryDatasets(
+                self.dataset_type, collections=self.collection, where=where, findFirst=True
+            )
+            found: dict[int, CameraPaths] = {}
+            for ref in refs:
+                data_id = ref.dataId
+                path = _uri_to_path(butler.getURI(ref))
+                found.setdefault(int(data_id["visit"]), {})[
+                    (str(data_id["arm"]), int(data_id["spectrograph"]))
+                ] = path
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise FileNotFoundError(
+                f"Failed to query {self.dataset_type} datasets ({where}): {e}"
+            ) from e
+        return found
+
+    def _check_collection(self) -> None:
+        """コレクションが変化していればキャッシュを破棄
+
+        確認は check_interval 秒に1回だけ行います。
+        """
+        now = time.time()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            signature = self._get_collection_signature()
+        except Exception as e:
+            logger.warning(f"Failed to check Butler collection {self.collection}: {e}")
+            return
+        if signature != self._collection_signature:
+            if self._collection_signature is not None:
+                logger.info(f"Butler collection {self.collection} changed, clearing URI cache")
+            self.clear()
+            self._collection_signature = signature
+
+    def _get_collection_signature(self) -> tuple[str, ...]:
+        """コレクションの状態を表すタプルを取得
+
+        CHAINED コレクションの場合は子コレクションの並び、
+        それ以外の場合はコレクション名そのものを返します。
+        """
+        butler = self._butler_getter()
+        try:
+            return tuple(butler.registry.getCollectionChain(self.collection))
+        except Exception:
+            return (self.collection,)
+
+
+# シングルトンインスタンス管理
+_postisrccd_cache: Optional[ButlerUriCache] = None
+_postisrccd_cache_lock = threading.Lock()
+
+
+def get_postisrccd_uri_cache() -> ButlerUriCache:
+    """postISRCCD 用 URI キャッシュのシングルトンを取得"""
+    global _postisrccd_cache
+    with _postisrccd_cache_lock:
+        if _postisrccd_cache is None:
+            settings = get_settings()
+            _postisrccd_cache = ButlerUriCache(
+                get_butler,
+                dataset_type="postISRCCD",
+                collection=settings.butler_collection,
+                max_visits=settings.butler_uri_cache_size,
+            )
+        return _postisrccd_cache
+
+
+def clear_postisrccd_uri_cache() -> None:
+    """シングルトンキャッシュインスタンスをクリア
+
+    テスト用のヘルパー関数です。
+    """
+    global _postisrccd_cache
+    with _postisrccd_cache_lock:
+        _postisrccd_cache = None
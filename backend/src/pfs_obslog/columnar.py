@@ -0,0 +1,247 @@
+"""クエリ結果を列ごとの NumPy 配列として取得
+
+MCS・AGC・cobra のように1フレームあたり数千行あるデータを、
+ORMオブジェクトやPythonのタプルを経由せずに配列として取得します。
+
+PostgreSQL（psycopg）では `COPY (SELECT ...) TO STDOUT (FORMAT BINARY)` で結果を受け取り、
+固定長のレコードとして NumPy で一括変換します。
+固定長にするため、NULL は列ごとの代替値（浮動小数点ではNaN）に置き換えて取得します。
+それ以外のドライバーでは通常の SELECT の結果を列ごとに変換します。
+
+Usage:
+    arrays = await fetch_arrays(
+        db,
+        select(M.McsData.mcs_center_x_pix, M.McsData.peakvalue).where(
+            M.McsData.mcs_frame_id == frame_id
+        ),
+    )
+    x = arrays["mcs_center_x_pix"]
+
+取得した配列は encode_columns でブラウザ向けのバイナリ形式（型付き配列）にできます。
+"""
+
+import struct
+from collections.abc import Mapping, Sequence
+from typing import Any, Optional
+
+import orjson
+
+import numpy as np
+from sqlalchemy import Select, cast, func, literal
+from sqlalchemy import types as sqltypes
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# PostgreSQL のバイナリCOPYの先頭（署名 + フラグ + ヘッダー拡張の長さ）
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_COPY_TRAILER = b"\xff\xff"
+
+
+def _column_dtype(type_: sqltypes.TypeEngine) -> np.dtype:
+    """SQLの型に対応する NumPy の型"""
+    match type_:
+        case sqltypes.Boolean():
+            return np.dtype(np.bool_)
+        case sqltypes.SmallInteger():
+            return np.dtype(np.int16)
+        case sqltypes.BigInteger():
+            return np.dtype(np.int64)
+        case sqltypes.Integer():
+            return np.dtype(np.int32)
+        case sqltypes.REAL():
+            return np.dtype(np.float32)
+        case sqltypes.Float() | sqltypes.Numeric():
+            return np.dtype(np.float64)
+    raise TypeError(f"Column type {type_!r} cannot be fetched as an array")
+
+
+# NumPy の型 -> 取得時にキャストするSQLの型
+_SQL_TYPES: dict[np.dtype, sqltypes.TypeEngine] = {
+    np.dtype(np.bool_): sqltypes.Boolean(),
+    np.dtype(np.int16): sqltypes.SmallInteger(),
+    np.dtype(np.int32): sqltypes.Integer(),
+    np.dtype(np.int64): sqltypes.BigInteger(),
+    np.dtype(np.float32): sqltypes.REAL(),
+    np.dtype(np.float64): sqltypes.Double(),
+}
+
+
+def _default_fill(dtype: np.dtype) -> Any:
+    """NULLの代替値の既定値"""
+    if dtype.kind == "f":
+        return float("nan")
+    if dtype.kind == "b":
+        return False
+    return 0
+
+
+def parse_binary_copy(data: bytes, dtypes: Sequence[np.dtype]) -> list[np.ndarray]:
+    """PostgreSQL のバイナリCOPYの出力を列ごとの配列に変換
+
+    全ての値が固定長で、NULLを含まないことを前提とします。
+
+    Args:
+        data: COPY ... TO STDOUT (FORMAT BINARY) の出力全体
+        dtypes: 各列の型
+
+    Returns:
+        列ごとの配列（ネイティブのバイト順）
+
+    Raises:
+        ValueError: 形式が正しくない場合、NULLを含む場合
+    """
+    if not data.startswith(_COPY_SIGNATURE) or not data.endswith(_COPY_TRAILER):
+        raise ValueError("Not a PostgreSQL binary COPY stream")
+    extension_length = int.from_bytes(data[15:19], "big")
+    body = memoryview(data)[19 + extension_length : len(data) - len(_COPY_TRAILER)]
+
+    # 各行は「列数(int16)」に続いて列ごとに「長さ(int32) + 値」が並ぶ（ネットワークバイト順）
+    fields: list[tuple[str, Any]] = [("count", ">i2")]
+    for i, dtype in enumerate(dtypes):
+        fields.append((f"length{i}", ">i4"))
+        fields.append((f"value{i}", dtype.newbyteorder(">")))
+    record = np.dtype(fields)
+    if len(body) % record.itemsize:
+        raise ValueError("Unexpected row length in binary COPY stream (NULL values?)")
+    rows = np.frombuffer(body, dtype=record)
+    if rows.size:
+        if np.any(rows["count"] != len(dtypes)):
+            raise ValueError("Unexpected number of columns in binary COPY stream")
+        for i, dtype in enumerate(dtypes):
+            if np.any(rows[f"length{i}"] != dtype.itemsize):
+                raise ValueError(f"Unexpected value length in column {i} (NULL values?)")
+    return [rows[f"value{i}"].astype(dtype.newbyteorder("=")) for i, dtype in enumerate(dtypes)]
+
+
+def _columns(stmt: Select, fill: Mapping[str, Any]) -> tuple[list[str], list[np.dtype], list[Any]]:
+    """選択した列の (列名, 型, NULLの代替値)
+
+    Raises:
+        ValueError: 名前のない列（ラベルを付けていない式など）がある場合
+    """
+    columns = list(stmt.selected_columns)
+    names: list[str] = []
+    for column in columns:
+        if column.key is None:
+            raise ValueError(f"Column {column!r} has no name (use .label())")
+        names.append(column.key)
+    dtypes = [_column_dtype(column.type) for column in columns]
+    fills = [fill.get(name, _default_fill(dtype)) for name, dtype in zip(names, dtypes)]
+    return names, dtypes, fills
+
+
+def copy_statement(
+    stmt: Select, dialect: Any, fill: Optional[Mapping[str, Any]] = None
+) -> tuple[str, dict[str, Any]]:
+    """SELECT をバイナリCOPYの文に変換
+
+    NULLを代替値に置き換え、各列を固定長の型にキャストします。
+
+    Returns:
+        (COPY文, パラメータ)
+    """
+    names, dtypes, fills = _columns(stmt, fill or {})
+    # パラメータの型（NaNはfloat8になる）に関わらず固定長になるように、結果全体をキャストする
+    fixed = stmt.with_only_columns(
+        *(
+            cast(func.coalesce(column, literal(value, _SQL_TYPES[dtype])), _SQL_TYPES[dtype]).label(name)
+            for column, name, dtype, value in zip(stmt.selected_columns, names, dtypes, fills)
+        )
+    )
+    compiled = fixed.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    return f"COPY ({compiled}) TO STDOUT (FORMAT BINARY)", dict(compiled.params)
+
+
+async def fetch_arrays(
+    db: AsyncSession,
+    stmt: Select,
+    fill: Optional[Mapping[str, Any]] = None,
+) -> dict[str, np.ndarray]:
+    """SELECT の結果を列ごとの配列として取得
+
+    列の型は選択した列のSQLの型から決めます（REAL -> float32、INTEGER -> int32 など）。
+
+    Args:
+        db: DBセッション
+        stmt: 取得するSELECT文（列は数値または真偽値のみ）
+        fill: 列名 -> NULLの代わりに使う値（既定は浮動小数点ではNaN、整数では0）
+
+    Returns:
+        列名 -> 配列
+    """
+    names, dtypes, fills = _columns(stmt, fill or {})
+
+    conn = await db.connection()
+    if conn.dialect.driver == "psycopg":
+        query, params = copy_statement(stmt, conn.dialect, fill)
+        raw = await conn.get_raw_connection()
+        chunks: list[bytes] = []
+        async with raw.driver_connection.cursor() as cursor:  # type: ignore[union-attr]
+            async with cursor.copy(query, params) as copy:
+                async for chunk in copy:
+                    chunks.append(bytes(chunk))
+        return dict(zip(names, parse_binary_copy(b"".join(chunks), dtypes)))
+
+    # その他のドライバー（列ごとに変換）
+    rows = (await db.execute(stmt)).all()
+    values_by_column = list(zip(*rows)) if rows else [()] * len(names)
+    return {
+        name: np.fromiter(
+            (default if value is None else value for value in values), dtype=dtype, count=len(rows)
+        )
+        for name, dtype, default, values in zip(names, dtypes, fills, values_by_column)
+    }
+
+
+# encode_columns のメディアタイプ
+COLUMNS_MEDIA_TYPE = "application/vnd.pfs-obslog.columns"
+# 各配列の先頭の境界（JavaScript の Float64Array などでそのまま参照できるように）
+_COLUMN_ALIGNMENT = 8
+
+
+def encode_columns(arrays: Mapping[str, np.ndarray], meta: Optional[Mapping[str, Any]] = None) -> bytes:
+    """列ごとの配列をブラウザ向けのバイナリ形式にする
+
+    形式:
+        - 先頭4バイト: ヘッダーの長さ（uint32、リトルエンディアン）
+        - JSONのヘッダー（空白で埋めて8バイト境界に揃える）
+        - 各列のデータ（リトルエンディアン、それぞれ8バイト境界から始まる）
+
+    ヘッダーは `{"length": 行数, "columns": [{"name", "dtype", "offset"}, ...], ...meta}` で、
+    offset はファイル先頭からのバイト位置、dtype は NumPy の型名（float32, int32 など）です。
+    JavaScript では `new Float32Array(buffer, offset, length)` で参照できます。
+
+    Args:
+        arrays: 列名 -> 1次元配列（全て同じ長さ）
+        meta: ヘッダーに追加する情報
+    """
+    lengths = {len(array) for array in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length")
+    length = lengths.pop() if lengths else 0
+    columns = [
+        (name, np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")))
+        for name, array in arrays.items()
+    ]
+
+    def pad(n: int) -> int:
+        return -n % _COLUMN_ALIGNMENT
+
+    # ヘッダーの長さで列の位置が変わるため、位置の桁数が落ち着くまで計算し直す
+    header_length = 0
+    while True:
+        offset = 4 + header_length + pad(4 + header_length)
+        entries = []
+        for name, array in columns:
+            entries.append({"name": name, "dtype": array.dtype.name, "offset": offset})
+            offset += array.nbytes + pad(array.nbytes)
+        header = orjson.dumps({**(meta or {}), "length": length, "columns": entries})
+        if len(header) <= header_length:
+            break
+        header_length = len(header)
+    header = header.ljust(header_length + pad(4 + header_length))
+
+    parts = [struct.pack("<I", len(header)), header]
+    for _, array in columns:
+        data = array.tobytes()
+        parts.append(data + b"\0" * pad(len(data)))
+    return b"".join(parts)
@@ -58,18 +58,49 @@ class Settings(BaseSettings):
         "ginga/detrend",
     ]
 
+    # プレビュー画像設定
+    preview_cache_size_mb: int = 2048  # プレビュー画像ディスクキャッシュの上限（MB）
+    chart_cache_size_mb: int = 256  # MCSチャート画像ディスクキャッシュの上限（MB）
+    design_detail_cache_size_mb: int = 256  # PFS Design詳細（JSON）ディスクキャッシュの上限（MB）
+    render_workers: int = 4  # 画像生成用プロセス数
+    # Accept ヘッダーで選ぶ出力形式の優先順（PNGは常に最後の候補）
+    preview_formats: list[str] = ["webp"]
+    preview_quality: int = 80  # 非可逆形式の品質のデフォルト値
+    # 新しいFITSファイルのプレビュー画像を事前生成する（ワーカーのうち1つが行う）
+    prerender_enabled: bool = False
+    prerender_poll_interval: float = 10.0  # inotifyが使えない場合のポーリング間隔（秒）
+    prerender_max_load: float = 4.0  # ロードアベレージがこれを超えている間は事前生成を控える
+
+    # ファイルダウンロード設定
+    # data_root に対応するNginxの内部ロケーション（例: "/_data"）。
+    # 設定するとFITSファイルの送信を X-Accel-Redirect でNginxに任せる
+    x_accel_redirect_location: str = ""
+
     # PFS Design キャッシュ設定
     pfs_design_cache_enabled: bool = True  # SQLiteキャッシュを有効化
+    pfs_design_sync_workers: int = 4  # キャッシュ同期時にFITSファイルを読み込むプロセス数
+    # キャッシュにない多数のDesignを、FITSファイルを読む前に opdb の pfs_design テーブルから登録する
+    pfs_design_opdb_seed: bool = True
+    # ディレクトリを監視して変更をキャッシュに反映する（無効の場合はAPIの呼び出しごとに走査する）
+    pfs_design_watch_enabled: bool = True
+    pfs_design_watch_poll_interval: float = 30.0  # ディレクトリの更新日時を確認する間隔（秒）
 
     # Butler設定（postISRCCD用）
     butler_datastore: Path = Path("/data/drp/datastore")
     butler_collection: str = "drpActor/reductions"
+    butler_warmup: bool = True  # ワーカー起動時にButlerを構築しておく
+    butler_uri_cache_size: int = 1024  # URIキャッシュに保持するvisit数の上限
 
     @property
     def pfs_design_cache_db(self) -> Path:
         """PFS Design キャッシュDBのパス"""
         return self.cache_dir / "pfs_design.db"
 
+    @property
+    def fits_cache_db(self) -> Path:
+        """FITSヘッダー・表示範囲キャッシュDBのパス"""
+        return self.cache_dir / "fits.db"
+
     @property
     def api_prefix(self) -> str:  # pragma: no cover
         """APIのプレフィックス（例: /obslog/api）"""
@@ -13,16 +13,22 @@ from pfs_obslog.config import get_settings
 
 settings = get_settings()
 
-# PostgreSQL接続URLをasync用に変換
-# postgresql://... → postgresql+psycopg://...
-_db_url = settings.database_url
-if _db_url.startswith("postgresql://"):
-    _db_url = _db_url.replace("postgresql://", "postgresql+psycopg://", 1)
-elif _db_url.startswith("postgres://"):
-    _db_url = _db_url.replace("postgres://", "postgresql+psycopg://", 1)
+
+def psycopg_url(url: str) -> str:
+    """PostgreSQL接続URLのドライバーを psycopg（v3）にする
+
+    postgresql://... → postgresql+psycopg://...
+    psycopg は同期・非同期のどちらのエンジンでも使えます。
+    """
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg://", 1)
+    return url
+
 
 async_engine = create_async_engine(
-    _db_url,
+    psycopg_url(settings.database_url),
     echo=settings.database_echo,
     pool_pre_ping=True,  # 接続の有効性を確認
 )
@@ -0,0 +1,343 @@
+"""ディレクトリ監視
+
+指定したディレクトリに新しく書き込まれたファイルを検出します。
+Linux では inotify を使用し、利用できない環境（他のOSやNFSの一部など）では
+ディレクトリを定期的に走査するポーリングで代替します。
+
+DirectoryChangeWatcher は1つのディレクトリ内のファイルの追加・変更・削除を検出します。
+ファイル数の多いディレクトリ向けに、ポーリングではファイルごとの stat を行わず、
+ディレクトリ自体の更新日時だけを確認します。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = getLogger(__name__)
+
+# inotify の定数（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """inotify の薄いラッパー（ctypes経由でlibcを呼び出す）"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.fd = fd
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float) -> list[tuple[int, int, str]]:
+        """イベントを読み込む（タイムアウトまで待機）
+
+        Returns:
+            (wd, mask, name) のリスト
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset : offset + length].split(b"\0", 1)[0]
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """ディレクトリに書き込みが完了したファイルを検出する
+
+    監視対象は set_directories で随時変更でき、存在しないディレクトリは
+    次に set_directories が呼ばれたときに改めて追加を試みます。
+
+    ポーリングの場合は、2回続けてサイズと更新日時が変わらなかったファイルを
+    書き込み完了とみなします。
+    """
+
+    def __init__(self, poll_interval: float = 10.0, use_inotify: bool = True):
+        """
+        Args:
+            poll_interval: ポーリング間隔（秒）
+            use_inotify: inotify を使用するかどうか（Falseの場合は常にポーリング）
+        """
+        self.poll_interval = poll_interval
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify is not available, falling back to polling: {e}")
+        self._watches: dict[Path, int] = {}  # ディレクトリ -> watch descriptor（ポーリングでは0）
+        self._pending: list[Path] = []  # 次の wait で返すファイル
+        # ポーリング用の状態（パス -> (サイズ, 更新日時)）
+        self._observed: dict[Path, tuple[int, int]] = {}
+        self._reported: dict[Path, tuple[int, int]] = {}
+        self._last_poll = 0.0
+
+    @property
+    def backend(self) -> str:
+        """使用している検出方法（"inotify" または "polling"）"""
+        return "inotify" if self._inotify is not None else "polling"
+
+    @property
+    def directories(self) -> list[Path]:
+        """現在監視しているディレクトリ"""
+        return list(self._watches)
+
+    def set_directories(self, directories: Iterable[Path], report_existing: bool = False) -> None:
+        """監視対象のディレクトリを設定
+
+        Args:
+            directories: 監視するディレクトリ
+            report_existing: 新たに監視を始めたディレクトリに既にあるファイルも
+                新しいファイルとして報告するかどうか
+        """
+        wanted = {Path(d) for d in directories}
+        for directory in list(self._watches):
+            if directory not in wanted:
+                self._remove(directory)
+        for directory in sorted(wanted - set(self._watches)):
+            if directory.is_dir():
+                self._add(directory, report_existing)
+
+    def wait(self, timeout: float) -> list[Path]:
+        """新しいファイルを待つ
+
+        Args:
+            timeout: 最大待ち時間（秒）
+
+        Returns:
+            書き込みが完了したファイルのリスト（タイムアウトした場合は空）
+        """
+        if self._pending:
+            pending, self._pending = self._pending, []
+            return pending
+        if self._inotify is not None:
+            return self._wait_inotify(timeout)
+        return self._wait_polling(timeout)
+
+    def close(self) -> None:
+        """監視を終了"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+
+    def _add(self, directory: Path, report_existing: bool) -> None:
+        existing = self._scan(directory)
+        if self._inotify is not None:
+            try:
+                wd = self._inotify.add_watch(directory, IN_CLOSE_WRITE | IN_MOVED_TO | IN_ONLYDIR)
+            except OSError as e:
+                logger.warning(f"Failed to watch {directory}: {e}")
+                return
+            self._watches[directory] = wd
+        else:
+            self._watches[directory] = 0
+            self._observed.update(existing)
+            self._reported.update(existing)
+        if report_existing:
+            self._pending.extend(sorted(existing))
+        logger.info(f"Watching {directory} ({self.backend})")
+
+    def _remove(self, directory: Path) -> None:
+        wd = self._watches.pop(directory)
+        if self._inotify is not None:
+            self._inotify.rm_watch(wd)
+        for state in (self._observed, self._reported):
+            for path in [p for p in state if p.parent == directory]:
+                del state[path]
+
+    @staticmethod
+    def _scan(directory: Path) -> dict[Path, tuple[int, int]]:
+        """ディレクトリ内のファイルの (サイズ, 更新日時) を取得"""
+        files: dict[Path, tuple[int, int]] = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files[Path(entry.path)] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            pass
+        return files
+
+    def _wait_inotify(self, timeout: float) -> list[Path]:
+        assert self._inotify is not None
+        directories = {wd: directory for directory, wd in self._watches.items()}
+        found: list[Path] = []
+        for wd, mask, name in self._inotify.read_events(timeout):
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify event queue overflowed, some files may be missed")
+                continue
+            directory = directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # ディレクトリが削除された
+                del self._watches[directory]
+                continue
+            if name and not name.startswith("."):
+                found.append(directory / name)
+        return list(dict.fromkeys(found))
+
+    def _wait_polling(self, timeout: float) -> list[Path]:
+        delay = self._last_poll + self.poll_interval - time.monotonic()
+        if delay > timeout:
+            time.sleep(max(0.0, timeout))
+            return []
+        if delay > 0:
+            time.sleep(delay)
+        self._last_poll = time.monotonic()
+
+        found: list[Path] = []
+        observed: dict[Path, tuple[int, int]] = {}
+        for directory in self._watches:
+            observed.update(self._scan(directory))
+        for path, signature in observed.items():
+            # 前回と変わっていなければ書き込み完了とみなす
+            if self._observed.get(path) == signature and self._reported.get(path) != signature:
+                self._reported[path] = signature
+                found.append(path)
+        self._observed = observed
+        self._reported = {p: s for p, s in self._reported.items() if p in observed}
+        return sorted(found)
+
+
+class DirectoryChangeWatcher:
+    """1つのディレクトリ内で追加・変更・削除されたファイル名を検出する
+
+    inotify が使えない場合は、poll_interval ごとにディレクトリの更新日時
+    （ファイルの追加・削除・名前変更で変わる）を確認し、変わっていれば
+    「どのファイルかわからない変更」として報告します。
+    NFS では他のホストでの変更が inotify で通知されないため、
+    inotify を使う場合も同じ確認を行います。
+    """
+
+    def __init__(self, directory: Path, poll_interval: float = 30.0, use_inotify: bool = True):
+        """
+        Args:
+            directory: 監視するディレクトリ（存在している必要がある）
+            poll_interval: ディレクトリの更新日時を確認する間隔（秒）
+            use_inotify: inotify を使用するかどうか
+        """
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._inotify.add_watch(
+                    directory, IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_ONLYDIR
+                )
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify is not available for {directory}, falling back to polling: {e}")
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+        self._mtime_ns = self._directory_mtime()
+        self._last_poll = time.monotonic()
+
+    @property
+    def backend(self) -> str:
+        """使用している検出方法（"inotify" または "polling"）"""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def wait(self, timeout: float) -> Optional[set[str]]:
+        """変更を待つ
+
+        Args:
+            timeout: 最大待ち時間（秒）
+
+        Returns:
+            変更されたファイル名の集合（タイムアウトした場合は空）。
+            どのファイルが変わったかわからない場合（ポーリングで変更を検出した場合、
+            inotify のイベントがあふれた場合）はNone
+        """
+        names: set[str] = set()
+        if self._inotify is not None:
+            delay = min(timeout, max(0.0, self._last_poll + self.poll_interval - time.monotonic()))
+            for _, mask, name in self._inotify.read_events(delay):
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning(f"inotify event queue overflowed for {self.directory}")
+                    return None
+                if name and not name.startswith("."):
+                    names.add(name)
+            if names:
+                # 通知された変更による更新日時の変化はポーリングで報告しない
+                self._mtime_ns = self._directory_mtime()
+                return names
+        else:
+            delay = self._last_poll + self.poll_interval - time.monotonic()
+            if delay > timeout:
+                time.sleep(max(0.0, timeout))
+                return names
+            if delay > 0:
+                time.sleep(delay)
+
+        if time.monotonic() - self._last_poll < self.poll_interval:
+            return names
+        self._last_poll = time.monotonic()
+        mtime_ns = self._directory_mtime()
+        if mtime_ns != self._mtime_ns:
+            self._mtime_ns = mtime_ns
+            return None
+        return names
+
+    def close(self) -> None:
+        """監視を終了"""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _directory_mtime(self) -> Optional[int]:
+        try:
+            return self.directory.stat().st_mtime_ns
+        except OSError:
+            return None
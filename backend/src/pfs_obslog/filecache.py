@@ -0,0 +1,221 @@
+"""ディスクキャッシュ
+
+プレビュー画像やチャート画像などの生成結果をキャッシュディレクトリに保存し、
+ワーカープロセス間で共有します。
+
+合計サイズに上限があり、超えた場合は最終アクセスの古いものから削除します。
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+from pfs_obslog.config import get_settings
+
+logger = getLogger(__name__)
+
+
+class FileCache:
+    """サイズ上限付きのディスクキャッシュ
+
+    キーはハッシュ化してファイル名として使用します。
+    書き込みは一時ファイルへの書き込みとリネームで行うため、
+    複数のプロセスから同時にアクセスしても壊れたファイルは読まれません。
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """
+        Args:
+            directory: キャッシュディレクトリ
+            max_bytes: キャッシュの合計サイズの上限（バイト）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # このプロセスから見た合計サイズの見積もり（Noneは未計測）
+        self._approx_bytes: Optional[int] = None
+
+    @staticmethod
+    def make_key(*parts: object) -> str:
+        """キーの構成要素からキャッシュキーを作成"""
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キャッシュから取得（存在しない場合はNone）"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            # 最終アクセス時刻としてmtimeを更新（削除順序の決定に使用）
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """キャッシュに保存"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            logger.warning(f"Failed to write cache file {path}: {e}")
+            return
+
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += len(data)
+            over = self._approx_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """キャッシュファイルの一覧 (mtime, size, path)"""
+        entries: list[tuple[float, int, Path]] = []
+        if not self.directory.exists():
+            return entries
+        for subdir in self.directory.iterdir():
+            if not subdir.is_dir():
+                continue
+            try:
+                with os.scandir(subdir) as it:
+                    for entry in it:
+                        if entry.name.startswith(".tmp-"):
+                            continue
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((st.st_mtime, st.st_size, Path(entry.path)))
+            except OSError:
+                continue
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """合計サイズが上限の9割以下になるまで古いファイルを削除"""
+        start_time = time.time()
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        with self._lock:
+            self._approx_bytes = total
+        if removed:
+            logger.info(
+                f"Evicted {removed} files from {self.directory} in {time.time() - start_time:.2f}s"
+            )
+
+
+# シングルトンインスタンス管理
+_preview_cache: Optional[FileCache] = None
+_preview_cache_lock = threading.Lock()
+
+
+def get_preview_cache() -> FileCache:
+    """プレビュー画像用ディスクキャッシュのシングルトンを取得"""
+    global _preview_cache
+    with _preview_cache_lock:
+        if _preview_cache is None:
+            settings = get_settings()
+            _preview_cache = FileCache(
+                settings.cache_dir / "previews",
+                settings.preview_cache_size_mb * 1024 * 1024,
+            )
+        return _preview_cache
+
+
+def clear_preview_cache() -> None:
+    """シングルトンキャッシュインスタンスをクリア
+
+    テスト用のヘルパー関数です。
+    """
+    global _preview_cache
+    with _preview_cache_lock:
+        _preview_cache = None
+
+
+_chart_cache: Optional[FileCache] = None
+_chart_cache_lock = threading.Lock()
+
+
+def get_chart_cache() -> FileCache:
+    """チャート画像用ディスクキャッシュのシングルトンを取得"""
+    global _chart_cache
+    with _chart_cache_lock:
+        if _chart_cache is None:
+            settings = get_settings()
+            _chart_cache = FileCache(
+                settings.cache_dir / "charts",
+                settings.chart_cache_size_mb * 1024 * 1024,
+            )
+        return _chart_cache
+
+
+def clear_chart_cache() -> None:
+    """シングルトンキャッシュインスタンスをクリア
+
+    テスト用のヘルパー関数です。
+    """
+    global _chart_cache
+    with _chart_cache_lock:
+        _chart_cache = None
+
+
+_design_detail_cache: Optional[FileCache] = None
+_design_detail_cache_lock = threading.Lock()
+
+
+def get_design_detail_cache() -> FileCache:
+    """PFS Design詳細（シリアライズ済みのJSON）用ディスクキャッシュのシングルトンを取得"""
+    global _design_detail_cache
+    with _design_detail_cache_lock:
+        if _design_detail_cache is None:
+            settings = get_settings()
+            _design_detail_cache = FileCache(
+                settings.cache_dir / "pfs_designs",
+                settings.design_detail_cache_size_mb * 1024 * 1024,
+            )
+        return _design_detail_cache
+
+
+def clear_design_detail_cache() -> None:
+    """シングルトンキャッシュインスタンスをクリア
+
+    テスト用のヘルパー関数です。
+    """
+    global _design_detail_cache
+    with _design_detail_cache_lock:
+        _design_detail_cache = None
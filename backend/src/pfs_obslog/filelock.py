@@ -0,0 +1,64 @@
+"""プロセス間ロック
+
+キャッシュディレクトリ上のロックファイルを使い、
+複数のワーカープロセスの中から1つだけが処理を行うようにします。
+
+ロックは flock で取得するため、保持しているプロセスが終了すると
+OSによって自動的に解放され、別のプロセスが引き継げます。
+"""
+
+import fcntl
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+logger = getLogger(__name__)
+
+
+class LeaderLock:
+    """ノンブロッキングな排他ロック（リーダー選出用）"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: ロックファイルのパス
+        """
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_held(self) -> bool:
+        """このインスタンスがロックを保持しているかどうか"""
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """ロックの取得を試みる（待機しない）
+
+        Returns:
+            ロックを保持していればTrue
+        """
+        if self._fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # 調査用に保持しているプロセスのPIDを書き込む
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """ロックを解放"""
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
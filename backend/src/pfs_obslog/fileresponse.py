@@ -0,0 +1,224 @@
+"""大きなファイルのダウンロード用レスポンス
+
+FITSファイルのように一度書き込まれたら変更されないファイルを配信するための
+FileResponse です。以下に対応します。
+
+- inode・サイズ・更新日時（ns）から作る強いETagと Last-Modified
+- If-None-Match / If-Modified-Since による 304 Not Modified
+- Range / If-Range による部分取得（中断したダウンロードの再開）
+- ゼロコピー送信
+    - Nginx 配下では X-Accel-Redirect で Nginx に sendfile させる
+    - ASGIサーバーが http.response.zerocopysend 拡張に対応していればそれを使う
+"""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+import anyio
+import anyio.to_thread
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from pfs_obslog.config import get_settings
+
+# 304レスポンスで返すヘッダー
+_NOT_MODIFIED_HEADERS = ("etag", "last-modified", "cache-control", "expires", "vary")
+
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    """stat情報から強いETagを作成"""
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match にETagが含まれるか（弱い比較）"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(",")
+    )
+
+
+class _RangeNotSatisfiable(Exception):
+    """Range がファイルの範囲外（416を返す）"""
+
+
+def _parse_range(http_range: str, file_size: int) -> Optional[tuple[int, int]]:
+    """Range ヘッダーを解釈
+
+    1つの範囲（bytes=a-b, bytes=a-, bytes=-n）だけに対応します。
+    形式が正しくない場合と複数の範囲の場合は None を返します（Range を無視して全体を返す）。
+
+    Returns:
+        (開始位置, 終了位置 + 1) または None
+
+    Raises:
+        _RangeNotSatisfiable: 範囲がファイルの外にある場合
+    """
+    unit, _, spec = http_range.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or not all(v.isdigit() for v in (first, last) if v):
+        return None
+    if not first:
+        # 末尾から last バイト
+        length = int(last)
+        if length == 0 or file_size == 0:
+            raise _RangeNotSatisfiable()
+        return max(0, file_size - length), file_size
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= file_size:
+        raise _RangeNotSatisfiable()
+    end = int(last) + 1 if last else file_size
+    return start, min(end, file_size)
+
+
+def _accel_redirect_uri(path: Path) -> Optional[str]:
+    """X-Accel-Redirect で使用するNginx内部URIを取得
+
+    x_accel_redirect_location が未設定、またはファイルが data_root 配下に
+    ない場合はNoneを返します。
+    """
+    settings = get_settings()
+    location = settings.x_accel_redirect_location
+    if not location:
+        return None
+    try:
+        relative = path.resolve().relative_to(settings.data_root.resolve())
+    except ValueError:
+        return None
+    return f"{location.rstrip('/')}/{relative.as_posix()}"
+
+
+class ConditionalFileResponse(FileResponse):
+    """条件付きGET・Range・ゼロコピー送信に対応したFileResponse
+
+    Range / If-Range もここで解釈し（Starlette のバージョンによって FileResponse の
+    対応状況が異なるため）、FileResponse からはヘッダーの組み立てだけを使います。
+    """
+
+    chunk_size = 1024 * 1024
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        self.headers.setdefault("content-length", str(stat_result.st_size))
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+        self.headers.setdefault("etag", strong_etag(stat_result))
+        self.headers.setdefault("accept-ranges", "bytes")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            self.set_stat_headers(self.stat_result)
+        file_size = self.stat_result.st_size
+
+        request_headers = Headers(scope=scope)
+        if self._is_not_modified(request_headers, self.stat_result):
+            headers = {
+                key: value
+                for key, value in self.headers.items()
+                if key in _NOT_MODIFIED_HEADERS
+            }
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        accel_uri = _accel_redirect_uri(Path(self.path))
+        if accel_uri is not None:
+            # Nginxがファイルを直接送信する（Range・条件付きGETもNginxが処理）
+            del self.headers["content-length"]
+            self.headers["x-accel-redirect"] = accel_uri
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        try:
+            byte_range = self._requested_range(request_headers, file_size)
+        except _RangeNotSatisfiable:
+            response = PlainTextResponse(
+                status_code=416,
+                headers={"content-range": f"bytes */{file_size}"},
+            )
+            await response(scope, receive, send)
+            return
+
+        status_code = self.status_code
+        start, end = 0, file_size
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+            self.headers["content-length"] = str(end - start)
+
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            await self._zerocopysend(send, start, end - start)
+        else:
+            await self._send_chunks(send, start, end - start)
+        if self.background is not None:
+            await self.background()
+
+    def _is_not_modified(self, request_headers: Headers, stat_result: os.stat_result) -> bool:
+        """304を返すべきかどうか"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, self.headers["etag"])
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(stat_result.st_mtime) <= since
+        return False
+
+    def _requested_range(self, request_headers: Headers, file_size: int) -> Optional[tuple[int, int]]:
+        """送信する範囲（全体を送る場合は None）
+
+        If-Range が ETag・Last-Modified のどちらとも一致しない場合は Range を無視します。
+
+        Raises:
+            _RangeNotSatisfiable: 範囲がファイルの外にある場合
+        """
+        http_range = request_headers.get("range")
+        if http_range is None:
+            return None
+        if_range = request_headers.get("if-range")
+        if if_range is not None and if_range not in (self.headers["etag"], self.headers["last-modified"]):
+            return None
+        return _parse_range(http_range, file_size)
+
+    async def _send_chunks(self, send: Send, offset: int, count: int) -> None:
+        """ファイルを chunk_size ごとに読んで送信"""
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(offset)
+            while True:
+                chunk = await file.read(min(self.chunk_size, count))
+                count -= len(chunk)
+                more_body = count > 0 and len(chunk) > 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
+
+    async def _zerocopysend(self, send: Send, offset: int, count: int) -> None:
+        """http.response.zerocopysend 拡張でファイルを送信（サーバー側で sendfile される）"""
+        with open(self.path, "rb") as file:
+            await send(
+                {
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                }
+            )
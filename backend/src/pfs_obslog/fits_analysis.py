@@ -0,0 +1,211 @@
+"""FITS画像のピクセル解析
+
+ファイル全体を転送・読み込みせずに、矩形領域の切り出しと統計量の計算を行います。
+画像は memmap で開き、必要な範囲だけを読み込みます（圧縮画像は必要なタイルだけを展開）。
+BZERO/BSCALE によるスケーリングは読み込んだ範囲に対してだけ行います。
+"""
+
+import io
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy
+
+# 切り出しで返す最大ピクセル数
+MAX_CUTOUT_PIXELS = 2048 * 2048
+# 統計量の計算で読み込む最大ピクセル数（SPSのフレーム全体を含む）
+MAX_STATS_PIXELS = 32 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Region:
+    """画像上の矩形領域（0始まりのピクセル座標）"""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def slices(self) -> tuple[slice, slice]:
+        return slice(self.y, self.y + self.height), slice(self.x, self.x + self.width)
+
+    @property
+    def size(self) -> int:
+        return self.width * self.height
+
+
+def resolve_region(
+    shape: tuple[int, int],
+    x: int = 0,
+    y: int = 0,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> Region:
+    """画像に収まる矩形領域を求める
+
+    width / height を省略した場合は画像の端まで、画像からはみ出す部分は切り詰めます。
+
+    Raises:
+        ValueError: 領域が画像と重ならない場合
+    """
+    rows, cols = shape
+    if x < 0 or y < 0 or x >= cols or y >= rows:
+        raise ValueError(f"Region origin ({x}, {y}) is outside the image ({cols}x{rows})")
+    width = cols - x if width is None else min(width, cols - x)
+    height = rows - y if height is None else min(height, rows - y)
+    if width <= 0 or height <= 0:
+        raise ValueError("Region is empty")
+    return Region(x, y, width, height)
+
+
+def _scale(raw: numpy.ndarray, header: Any) -> numpy.ndarray:
+    """BZERO/BSCALE を適用してネイティブのバイト順の配列にする
+
+    符号なし整数（BZERO=2**(n-1)）はそのまま符号なし整数として返します。
+    """
+    bscale = header.get("BSCALE", 1)
+    bzero = header.get("BZERO", 0)
+    data = raw.astype(raw.dtype.newbyteorder("="), copy=True)
+    if bscale == 1 and bzero == 0:
+        return data
+    if bscale == 1 and data.dtype.kind == "i" and bzero == 2 ** (8 * data.dtype.itemsize - 1):
+        return (data.astype(numpy.int64) + int(bzero)).astype(f"u{data.dtype.itemsize}")
+    float_type = numpy.float32 if data.dtype.itemsize <= 2 else numpy.float64
+    return data.astype(float_type) * float_type(bscale) + float_type(bzero)
+
+
+def read_region(
+    filepath: Path,
+    hdu_index: int,
+    x: int = 0,
+    y: int = 0,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: int = MAX_CUTOUT_PIXELS,
+) -> tuple[numpy.ndarray, Region, Any]:
+    """画像HDUの矩形領域を読み込む
+
+    Returns:
+        (領域のデータ, 実際の領域, HDUのヘッダー（構造キーワードを除いたもの）)
+
+    Raises:
+        FileNotFoundError: HDUが存在しない場合
+        ValueError: 2次元画像のHDUでない場合、領域が不正または大きすぎる場合
+    """
+    import astropy.io.fits as afits
+
+    with afits.open(filepath, memmap=True, do_not_scale_image_data=True) as hdul:
+        if not 0 <= hdu_index < len(hdul):
+            raise FileNotFoundError(f"No HDU {hdu_index} in {filepath.name}")
+        hdu = hdul[hdu_index]
+        header = hdu.header  # type: ignore[union-attr]
+        if not hdu.is_image or header.get("NAXIS") != 2:  # type: ignore[union-attr]
+            raise ValueError(f"HDU {hdu_index} of {filepath.name} is not a 2D image")
+        region = resolve_region((header["NAXIS2"], header["NAXIS1"]), x, y, width, height)
+        if region.size > max_pixels:
+            raise ValueError(f"Region is too large ({region.size} pixels > {max_pixels})")
+        if isinstance(hdu, afits.CompImageHDU):
+            # 必要なタイルだけを展開する
+            raw = hdu.section[region.slices]
+        else:
+            raw = hdu.data[region.slices]  # type: ignore[union-attr]
+        data = _scale(numpy.asarray(raw), header)
+        return data, region, header.copy(strip=True)
+
+
+def cutout_fits(data: numpy.ndarray, region: Region, header: Any) -> bytes:
+    """切り出した領域をFITSファイルにする
+
+    元のHDUのヘッダーを引き継ぎ、WCSの基準ピクセル（CRPIXn）を切り出し位置に合わせます。
+    元画像での位置は IRAF の LTV1/LTV2 で記録します。
+    """
+    import astropy.io.fits as afits
+
+    header = header.copy()
+    for axis, offset in ((1, region.x), (2, region.y)):
+        if f"CRPIX{axis}" in header:
+            header[f"CRPIX{axis}"] = header[f"CRPIX{axis}"] - offset
+        header[f"LTV{axis}"] = (-offset, "Offset of the cutout in the original image")
+    buffer = io.BytesIO()
+    afits.PrimaryHDU(data=data, header=header).writeto(buffer)
+    return buffer.getvalue()
+
+
+def cutout_npy(data: numpy.ndarray) -> bytes:
+    """切り出した領域を NumPy の .npy 形式にする"""
+    buffer = io.BytesIO()
+    numpy.save(buffer, data, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _finite(data: numpy.ndarray) -> numpy.ndarray:
+    """有限値だけを1次元配列で取り出す（整数の場合はそのまま）"""
+    if data.dtype.kind == "f":
+        return data[numpy.isfinite(data)]
+    return data.ravel()
+
+
+def _optional(value: Any) -> Optional[float]:
+    value = float(value)
+    return value if numpy.isfinite(value) else None
+
+
+def region_stats(data: numpy.ndarray) -> dict[str, Any]:
+    """領域全体の統計量（NaN/Infは除外）"""
+    values = _finite(data)
+    if values.size == 0:
+        return {"count": 0, "min": None, "max": None, "mean": None, "median": None, "std": None}
+    return {
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean(dtype=numpy.float64)),
+        "median": float(numpy.median(values)),
+        "std": float(values.std(dtype=numpy.float64)),
+    }
+
+
+def profile_stats(data: numpy.ndarray, axis: int) -> dict[str, list[Optional[float]]]:
+    """行ごと（axis=1）または列ごと（axis=0）の統計量（NaN/Infは除外）"""
+    values = data.astype(numpy.float64)
+    values[~numpy.isfinite(values)] = numpy.nan
+    with warnings.catch_warnings():
+        # 全てNaNの行・列はNaN（レスポンスではnull）になる
+        warnings.simplefilter("ignore", RuntimeWarning)
+        stats = {
+            "min": numpy.nanmin(values, axis=axis),
+            "max": numpy.nanmax(values, axis=axis),
+            "mean": numpy.nanmean(values, axis=axis),
+            "median": numpy.nanmedian(values, axis=axis),
+            "std": numpy.nanstd(values, axis=axis),
+        }
+    return {name: [_optional(v) for v in column] for name, column in stats.items()}
+
+
+def histogram(
+    data: numpy.ndarray,
+    bins: int = 100,
+    range_min: Optional[float] = None,
+    range_max: Optional[float] = None,
+) -> dict[str, Any]:
+    """ヒストグラム（範囲を省略した場合はデータの最小値・最大値）
+
+    範囲外の値は underflow / overflow として数えます。
+    """
+    values = _finite(data)
+    if values.size == 0:
+        return {"edges": [], "counts": [], "underflow": 0, "overflow": 0}
+    lo = float(values.min()) if range_min is None else range_min
+    hi = float(values.max()) if range_max is None else range_max
+    if hi <= lo:
+        hi = lo + 1.0
+    counts, edges = numpy.histogram(values, bins=bins, range=(lo, hi))
+    return {
+        "edges": edges.tolist(),
+        "counts": counts.tolist(),
+        "underflow": int(numpy.count_nonzero(values < lo)),
+        "overflow": int(numpy.count_nonzero(values > hi)),
+    }
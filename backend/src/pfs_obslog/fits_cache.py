@@ -0,0 +1,179 @@
+"""FITSファイル情報キャッシュ
+
+FITSファイルのヘッダーと、プレビュー画像の表示範囲（ZScaleの vmin, vmax）を
+SQLiteにキャッシュします。
+
+表示範囲を一度だけ計算して保存しておくことで、同じ画像を異なるサイズで
+描画しても同じ濃淡になり、描画のたびにZScaleを計算する必要もなくなります。
+
+エントリはファイルパスに加えてファイルサイズと更新日時（ns）で識別し、
+ファイルが置き換えられた場合は自動的に無効になります。
+キャッシュDBは複数のワーカープロセスから共有されます。
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from typing import Generator, Optional
+
+from pfs_obslog.config import get_settings
+
+logger = getLogger(__name__)
+
+
+class FitsCache:
+    """FITSヘッダーと表示範囲のSQLiteキャッシュ
+
+    読み書きに失敗した場合はキャッシュなしとして振る舞い、例外は送出しません。
+    """
+
+    # SQLiteスキーマ
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS fits_header (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        meta TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS fits_display_limits (
+        path TEXT NOT NULL,
+        hdu_index INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        vmin REAL NOT NULL,
+        vmax REAL NOT NULL,
+        PRIMARY KEY (path, hdu_index)
+    );
+    """
+
+    def __init__(self, db_path: Path):
+        """
+        Args:
+            db_path: SQLiteデータベースファイルのパス
+        """
+        self.db_path = db_path
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _init_db(self) -> None:
+        """データベースを初期化"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        try:
+            # 複数プロセスからの同時読み書きのためWALモードにする
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
+        """データベース接続を取得（コンテキストマネージャー）"""
+        with self._init_lock:
+            if not self._initialized:
+                self._init_db()
+                self._initialized = True
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_header(self, path: Path, stat_result: os.stat_result) -> Optional[str]:
+        """キャッシュされたヘッダー（FitsMetaのJSON）を取得"""
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute(
+                    "SELECT meta FROM fits_header WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (str(path), stat_result.st_size, stat_result.st_mtime_ns),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read FITS header cache: {e}")
+            return None
+        return row[0] if row else None
+
+    def put_header(self, path: Path, stat_result: os.stat_result, meta: str) -> None:
+        """ヘッダー（FitsMetaのJSON）を保存"""
+        try:
+            with self._get_connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO fits_header (path, size, mtime_ns, meta) VALUES (?, ?, ?, ?)",
+                    (str(path), stat_result.st_size, stat_result.st_mtime_ns, meta),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write FITS header cache: {e}")
+
+    def get_display_limits(
+        self, path: Path, stat_result: os.stat_result, hdu_index: int
+    ) -> Optional[tuple[float, float]]:
+        """キャッシュされた表示範囲 (vmin, vmax) を取得"""
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute(
+                    """
+                    SELECT vmin, vmax FROM fits_display_limits
+                    WHERE path = ? AND hdu_index = ? AND size = ? AND mtime_ns = ?
+                    """,
+                    (str(path), hdu_index, stat_result.st_size, stat_result.st_mtime_ns),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read FITS display limits cache: {e}")
+            return None
+        return (row[0], row[1]) if row else None
+
+    def put_display_limits(
+        self,
+        path: Path,
+        stat_result: os.stat_result,
+        hdu_index: int,
+        limits: tuple[float, float],
+    ) -> None:
+        """表示範囲 (vmin, vmax) を保存"""
+        try:
+            with self._get_connection() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO fits_display_limits
+                        (path, hdu_index, size, mtime_ns, vmin, vmax)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        str(path),
+                        hdu_index,
+                        stat_result.st_size,
+                        stat_result.st_mtime_ns,
+                        limits[0],
+                        limits[1],
+                    ),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write FITS display limits cache: {e}")
+
+
+# シングルトンインスタンス管理
+_fits_cache: Optional[FitsCache] = None
+_fits_cache_lock = threading.Lock()
+
+
+def get_fits_cache() -> FitsCache:
+    """FITS情報キャッシュのシングルトンを取得"""
+    global _fits_cache
+    with _fits_cache_lock:
+        if _fits_cache is None:
+            _fits_cache = FitsCache(get_settings().fits_cache_db)
+        return _fits_cache
+
+
+def clear_fits_cache() -> None:
+    """シングルトンキャッシュインスタンスをクリア
+
+    テスト用のヘルパー関数です。
+    """
+    global _fits_cache
+    with _fits_cache_lock:
+        _fits_cache = None
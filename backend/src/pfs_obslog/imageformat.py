@@ -0,0 +1,193 @@
+"""プレビュー画像の出力形式
+
+PNG のほか WebP / JPEG / AVIF での出力に対応します。
+形式はクエリパラメータ（format=）で明示するか、
+Accept ヘッダーからサーバーの優先順（設定 preview_formats）に従って選びます。
+"""
+
+import io
+import time
+from dataclasses import dataclass
+from enum import Enum
+from functools import cache
+from typing import Annotated, Any, Optional
+
+from fastapi import Depends, HTTPException, Query, Request, status
+
+from pfs_obslog import metrics
+from pfs_obslog.config import get_settings
+
+
+class ImageFormat(str, Enum):
+    """プレビュー画像の形式"""
+
+    png = "png"
+    webp = "webp"
+    jpeg = "jpeg"
+    avif = "avif"
+
+    @property
+    def media_type(self) -> str:
+        return f"image/{self.value}"
+
+
+@dataclass
+class EncodedImage:
+    """エンコード済みの画像"""
+
+    content: bytes
+    format: ImageFormat
+    encode_seconds: float
+
+
+@cache
+def is_supported(fmt: ImageFormat) -> bool:
+    """Pillow がこの形式で書き出せるかどうか"""
+    from PIL import features
+
+    match fmt:
+        case ImageFormat.png:
+            return True
+        case ImageFormat.jpeg:
+            return bool(features.check("jpg"))
+        case _:
+            return bool(features.check(fmt.value))
+
+
+def _parse_accept(accept: str) -> dict[str, float]:
+    """Accept ヘッダーを メディアタイプ -> q値 の辞書に変換"""
+    accepted: dict[str, float] = {}
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[media_type.lower()] = q
+    return accepted
+
+
+def negotiate_format(accept: Optional[str]) -> ImageFormat:
+    """Accept ヘッダーから出力形式を決める
+
+    Accept に明示されている形式（q > 0）のうち、q値が最も高いものを選びます。
+    同じq値の場合は設定 preview_formats の順に優先します。
+    ワイルドカード（image/* など）では PNG 以外を選びません。
+    """
+    if not accept:
+        return ImageFormat.png
+    accepted = _parse_accept(accept)
+    best = ImageFormat.png
+    best_q = 0.0
+    for name in get_settings().preview_formats:
+        fmt = ImageFormat(name)
+        q = accepted.get(fmt.media_type, 0.0)
+        if q > best_q and is_supported(fmt):
+            best, best_q = fmt, q
+    return best
+
+
+def default_format() -> ImageFormat:
+    """ブラウザに対して通常選ばれる形式（preview_formats の先頭で対応しているもの）
+
+    事前生成ではこの形式で画像を生成します。
+    """
+    for name in get_settings().preview_formats:
+        fmt = ImageFormat(name)
+        if is_supported(fmt):
+            return fmt
+    return ImageFormat.png
+
+
+def resolve_quality(quality: Optional[int]) -> Optional[int]:
+    """品質の指定がなければ設定のデフォルト値を使う"""
+    return get_settings().preview_quality if quality is None else quality
+
+
+def encode_image(image: Any, fmt: ImageFormat, quality: Optional[int] = None) -> EncodedImage:
+    """画像をエンコード
+
+    Args:
+        image: PIL の Image、または uint8 の配列（グレースケールまたはRGB/RGBA）
+        fmt: 出力形式
+        quality: 品質（1-100、PNGでは無視）
+
+    Returns:
+        エンコード済みの画像
+    """
+    from PIL import Image
+
+    if not isinstance(image, Image.Image):
+        image = Image.fromarray(image)
+    if fmt == ImageFormat.jpeg and image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+
+    options: dict[str, Any] = {}
+    if fmt != ImageFormat.png:
+        options["quality"] = resolve_quality(quality)
+
+    start_time = time.perf_counter()
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.value, **options)
+    return EncodedImage(buffer.getvalue(), fmt, time.perf_counter() - start_time)
+
+
+def record_encoding(encoded: EncodedImage, kind: str) -> None:
+    """エンコード時間と出力サイズをメトリクスに記録
+
+    Args:
+        encoded: エンコード済みの画像
+        kind: 画像の種類（例: "sps", "mcs_plot"）
+    """
+    metrics.observe("image_encode_seconds", encoded.encode_seconds, format=encoded.format.value, kind=kind)
+    metrics.observe("image_encode_bytes", len(encoded.content), format=encoded.format.value, kind=kind)
+
+
+@dataclass
+class OutputFormat:
+    """リクエストに対する出力形式"""
+
+    format: ImageFormat
+    quality: Optional[int]  # PNGの場合はNone
+    negotiated: bool  # Accept ヘッダーから決めた場合はTrue
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """レスポンスに付けるヘッダー"""
+        return {"vary": "Accept"} if self.negotiated else {}
+
+
+def get_output_format(
+    request: Request,
+    format: Optional[ImageFormat] = Query(
+        default=None,
+        description="Image format. If omitted, chosen from the Accept header (PNG by default).",
+    ),
+    quality: Optional[int] = Query(
+        default=None, ge=1, le=100, description="Quality for lossy formats (ignored for PNG)"
+    ),
+) -> OutputFormat:
+    """クエリパラメータと Accept ヘッダーから出力形式を決める（DI用）"""
+    negotiated = format is None
+    if format is None:
+        format = negotiate_format(request.headers.get("accept"))
+    elif not is_supported(format):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Image format {format.value} is not supported by this server",
+        )
+    return OutputFormat(
+        format=format,
+        quality=None if format == ImageFormat.png else resolve_quality(quality),
+        negotiated=negotiated,
+    )
+
+
+# 依存性注入用の型エイリアス
+ImageOutput = Annotated[OutputFormat, Depends(get_output_format)]
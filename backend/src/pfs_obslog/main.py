@@ -1,17 +1,39 @@
 """PFS Obslog API - メインアプリケーション"""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from pfs_obslog.auth.middleware import AuthMiddleware
+from pfs_obslog.butler_cache import start_butler_warmup
 from pfs_obslog.config import get_settings
 from pfs_obslog.orjsonresponse import ORJSONResponse
+from pfs_obslog.pfs_design_watch import start_pfs_design_watcher, stop_pfs_design_watcher
+from pfs_obslog.prerender import start_prerender_service, stop_prerender_service
+from pfs_obslog.render_pool import shutdown_render_executor
 from pfs_obslog.routers import auth, fits, health, notes, pfs_designs, plot, visits
 from pfs_obslog.staticassets import setup_static_assets
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """ワーカーの起動・終了時の処理"""
+    # Butlerの構築は時間がかかるため、起動時にバックグラウンドで済ませておく
+    start_butler_warmup()
+    # 新しいFITSファイルのプレビュー画像の事前生成（有効な場合のみ）
+    start_prerender_service()
+    # PFS Design ディレクトリの変更をキャッシュに反映する
+    start_pfs_design_watcher()
+    yield
+    stop_pfs_design_watcher()
+    stop_prerender_service()
+    shutdown_render_executor()
+
+
 app = FastAPI(
     title="PFS Obslog API",
     description="PFS Observation Log System API",
@@ -21,6 +43,7 @@ app = FastAPI(
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
     default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # CORS設定（最初に処理される）
@@ -57,6 +80,7 @@ app.include_router(visits.router, prefix="/api", tags=["visits"])
 app.include_router(visits.csv_router, prefix="/api", tags=["visits"])
 app.include_router(notes.router, tags=["notes"])
 app.include_router(fits.router, tags=["fits"])
+app.include_router(fits.visit_files_router, tags=["fits"])
 app.include_router(pfs_designs.router, tags=["pfs_designs"])
 app.include_router(plot.router, prefix="/api", tags=["plot"])
 
@@ -0,0 +1,82 @@
+"""簡易メトリクス
+
+処理時間やサイズなどの測定値をプロセス内で集計します。
+集計結果は /api/metrics で確認できます（ワーカープロセスごとの値です）。
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# (メトリクス名, ラベル) -> 集計値
+_MetricKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+@dataclass
+class Summary:
+    """測定値の集計"""
+
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+_summaries: dict[_MetricKey, Summary] = {}
+_lock = threading.Lock()
+_started_at = time.time()
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """測定値を記録
+
+    Args:
+        name: メトリクス名（例: "image_encode_seconds"）
+        value: 測定値
+        labels: ラベル（例: format="webp"）
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            summary = _summaries[key] = Summary()
+        summary.observe(value)
+
+
+def snapshot() -> dict:
+    """現在の集計値を取得"""
+    with _lock:
+        metrics = [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "count": summary.count,
+                "sum": summary.total,
+                "mean": summary.mean,
+                "min": summary.min,
+                "max": summary.max,
+            }
+            for (name, labels), summary in sorted(_summaries.items())
+        ]
+    return {"pid": os.getpid(), "since": _started_at, "metrics": metrics}
+
+
+def reset() -> None:
+    """集計値をクリア
+
+    テスト用のヘルパー関数です。
+    """
+    with _lock:
+        _summaries.clear()
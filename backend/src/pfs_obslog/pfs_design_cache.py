@@ -2,24 +2,128 @@
 
 PFS Design FITSファイルのメタデータをSQLiteにキャッシュし、
 一覧取得を高速化します。
+
+キャッシュが空の状態からの構築（数千ファイル）では、FITSファイルの読み込みを
+プロセスプールで並列に行い、結果はまとめて1トランザクションで書き込みます（WALモード）。
+
+gunicorn の複数ワーカーはそれぞれインスタンスを持ちますが、同期はキャッシュDBの横の
+ロックファイルを取得した1プロセスだけが行います。他のワーカーは同期せずに、
+最後に完了した同期の結果（世代）を読みます。
+
+読み込み用の接続はスレッドごとに開いたまま使い回し（プリペアドステートメントも
+接続ごとにキャッシュされる）、書き込みはインスタンスに1つの接続で行います。
+
+位置の一覧と高度順のソートは、全行の位置などを NumPy の配列としてメモリに持った
+コピー（DesignColumns）で計算します。コピーは世代が変わったときに作り直します。
+
+同期ではファイバーの値の要約（proposalId・catId の種類、obCode の先頭部分の種類、fiberStatus ごとの本数）も
+副テーブルに書き込み、FITSファイルを開かずにこれらでDesignを絞り込めるようにします（FiberFilter）。
+obCode はファイバーごとにほぼ異なるため先頭 OB_CODE_PREFIX_LENGTH 文字だけを書き込み、
+それより長い前方一致は候補のDesignのFITSファイルで確かめます。
+
+キャッシュにない多数のDesignを読み込むとき（初回の構築やキャッシュを失った後）は、
+FITSファイルを読む前に opdb の pfs_design・pfs_design_fiber テーブルから
+一覧に必要な値をまとめて登録します（数百件ごとに1クエリ）。
+opdb にない値（ARMS、測光の行数、ファイバーの値の副テーブル）はその後のFITSファイルの読み込みで埋めます。
 """
 
+import base64
+import dataclasses
 import datetime
+import functools
+import math
+import multiprocessing
 import os
 import re
 import sqlite3
 import threading
 import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 from logging import getLogger
 from pathlib import Path
-from typing import Generator, Optional
+from typing import TYPE_CHECKING, Callable, Generator, Iterable, Optional
+
+import numpy as np
+import orjson
+
+from pfs_obslog.config import get_settings
+from pfs_obslog.filelock import LeaderLock
+
+if TYPE_CHECKING:
+    from sqlalchemy import Engine
 
 logger = getLogger(__name__)
 
 # FITSファイル名のパターン
 DESIGN_FILE_PATTERN = re.compile(r"^pfsDesign-0x([0-9a-fA-F]{16})\.fits$")
 
+# 更新するファイルがこれより少ない場合はプロセスプールを使わずに1件ずつ更新する
+PARALLEL_SYNC_THRESHOLD = 32
+# プロセスプールの1タスクで読み込むファイル数
+READ_CHUNK_SIZE = 64
+# 1トランザクションで書き込む最大行数
+WRITE_BATCH_SIZE = 500
+# 同期の進捗をログに出す間隔（秒）
+PROGRESS_LOG_INTERVAL = 10.0
+# opdb の1クエリで取得するDesignの数
+OPDB_SEED_CHUNK_SIZE = 500
+# opdb への接続とクエリのタイムアウト（秒）。opdb に届かないときに同期が止まらないようにする
+OPDB_CONNECT_TIMEOUT = 5
+OPDB_STATEMENT_TIMEOUT = 30
+# 副テーブルに書き込む obCode の先頭の文字数。
+# obCode 全体を書き込むと 4,000 Design × 2,394 ファイバーで約960万行・565MB になり、
+# 書き込みだけで72秒かかった（先頭8文字では1.2万行・5MB、0.6秒。
+# devel/bench_pfs_design_cache.py --rows 4000 --fibers 2394 [--ob-code-prefix-length 0]）
+OB_CODE_PREFIX_LENGTH = 8
+# FITSファイルで obCode を確かめるときに、読んだ obCode の集合を覚えておくDesignの数
+OB_CODE_RECHECK_CACHE_SIZE = 256
+
+_METADATA_COLUMNS = (
+    "id", "frameid", "name", "file_mtime", "ra", "dec", "x", "y", "z", "arms",
+    "num_design_rows", "num_photometry_rows", "num_guidestar_rows",
+    "science_count", "sky_count", "fluxstd_count",
+    "unassigned_count", "engineering_count",
+    "sunss_imaging_count", "sunss_diffuse_count",
+    "cached_at",
+)
+
+# INSERT OR REPLACE は行を削除してから挿入するが、そのときDELETEトリガーが動かないため
+# （全文検索インデックスが古いまま残る）、UPSERTでUPDATEトリガーが動くようにする
+_INSERT_SQL = f"""
+    INSERT INTO pfs_design_metadata ({", ".join(_METADATA_COLUMNS)}, fibers_cached)
+    VALUES ({", ".join("?" * len(_METADATA_COLUMNS))}, 1)
+    ON CONFLICT(id) DO UPDATE SET
+    {", ".join(f"{column} = excluded.{column}" for column in _METADATA_COLUMNS[1:])},
+    fibers_cached = 1
+"""
+
+# opdb から登録する行（ファイバーの値などが未取得のため fibers_cached = 0 にして、後でFITSファイルを読む）。
+# 既にある行はFITSファイルから読んだ値なので上書きしない
+_SEED_SQL = f"""
+    INSERT INTO pfs_design_metadata ({", ".join(_METADATA_COLUMNS)}, fibers_cached)
+    VALUES ({", ".join("?" * len(_METADATA_COLUMNS))}, 0)
+    ON CONFLICT(id) DO NOTHING
+"""
+
+# ファイバーの値の副テーブル -> design_rowid 以外の列（FiberSummary.table_rows の順）
+_FIBER_TABLES = {
+    "pfs_design_proposal": ("proposal_id",),
+    "pfs_design_cat": ("cat_id",),
+    "pfs_design_ob_code_prefix": ("ob_code_prefix",),
+    "pfs_design_fiber_status": ("fiber_status", "count"),
+}
+
+# 読み込み用の接続のメモリマップの大きさ（バイト）とページキャッシュの大きさ（KiB）
+READ_MMAP_SIZE = 256 * 1024 * 1024
+READ_CACHE_SIZE_KB = 16 * 1024
+# 接続ごとにキャッシュするプリペアドステートメントの数
+CACHED_STATEMENTS = 256
+
+# trigram で検索できる最短の長さ（これより短い検索語は LIKE で検索する）
+_MIN_SEARCH_LENGTH = 3
+
 
 def _pick_id(filename: str) -> str:
     """ファイル名からDesign IDを抽出
@@ -32,6 +136,486 @@ def _pick_id(filename: str) -> str:
     return ""
 
 
+@dataclass(frozen=True)
+class FiberSummary:
+    """Design のファイバーの値の要約（副テーブルに書き込む）"""
+
+    proposal_ids: tuple[str, ...] = ()
+    cat_ids: tuple[int, ...] = ()
+    # obCode の先頭 OB_CODE_PREFIX_LENGTH 文字
+    ob_code_prefixes: tuple[str, ...] = ()
+    # (fiberStatus, ファイバー数)
+    fiber_status_counts: tuple[tuple[int, int], ...] = ()
+
+    @classmethod
+    def from_hdu(cls, hdu) -> "FiberSummary":
+        """Design のHDU（HDU 1）から作成（ない列は空にする）"""
+        if hdu.data is None:
+            return cls()
+        names = set(hdu.columns.names)
+
+        def distinct_strings(name: str, length: Optional[int] = None) -> tuple[str, ...]:
+            if name not in names:
+                return ()
+            values = np.char.strip(np.asarray(hdu.data.field(name), dtype=str))
+            if length is not None:
+                values = values.astype(f"<U{length}")
+            return tuple(str(value) for value in np.unique(values) if value)
+
+        cat_ids: tuple[int, ...] = ()
+        if "catId" in names:
+            cat_ids = tuple(int(value) for value in np.unique(hdu.data.field("catId")))
+        fiber_status_counts: tuple[tuple[int, int], ...] = ()
+        if "fiberStatus" in names:
+            values, counts = np.unique(hdu.data.field("fiberStatus"), return_counts=True)
+            fiber_status_counts = tuple((int(v), int(c)) for v, c in zip(values, counts))
+        return cls(
+            distinct_strings("proposalId"),
+            cat_ids,
+            distinct_strings("obCode", OB_CODE_PREFIX_LENGTH),
+            fiber_status_counts,
+        )
+
+    def table_rows(self) -> dict[str, list[tuple]]:
+        """副テーブル -> (値, ...) の行（design_rowid を除く）"""
+        return {
+            "pfs_design_proposal": [(value,) for value in self.proposal_ids],
+            "pfs_design_cat": [(value,) for value in self.cat_ids],
+            "pfs_design_ob_code_prefix": [(value,) for value in self.ob_code_prefixes],
+            "pfs_design_fiber_status": list(self.fiber_status_counts),
+        }
+
+
+@dataclass(frozen=True)
+class FiberFilter:
+    """ファイバーの値による絞り込み（副テーブルのインデックスで検索する）
+
+    指定した条件を全て満たすファイバーを含むDesignに絞り込みます（条件ごとに別のファイバーでもよい）。
+    """
+
+    proposal_id: Optional[str] = None  # proposalId の完全一致
+    cat_id: Optional[int] = None  # catId の完全一致
+    ob_code: Optional[str] = None  # obCode の前方一致
+    fiber_status: Optional[int] = None  # fiberStatus が一致するファイバーがある
+
+    def clauses(self) -> tuple[list[str], list]:
+        """WHERE句の条件とパラメータ"""
+        where_clauses: list[str] = []
+        params: list = []
+        if self.proposal_id is not None:
+            where_clauses.append(
+                "rowid IN (SELECT design_rowid FROM pfs_design_proposal WHERE proposal_id = ?)"
+            )
+            params.append(self.proposal_id)
+        if self.cat_id is not None:
+            where_clauses.append("rowid IN (SELECT design_rowid FROM pfs_design_cat WHERE cat_id = ?)")
+            params.append(self.cat_id)
+        if self.ob_code and len(self.ob_code) <= OB_CODE_PREFIX_LENGTH:
+            # 前方一致を主キーの範囲の検索にする（U+10FFFF は UTF-8 で最も大きい文字）
+            where_clauses.append(
+                "rowid IN (SELECT design_rowid FROM pfs_design_ob_code_prefix "
+                "WHERE ob_code_prefix >= ? AND ob_code_prefix < ?)"
+            )
+            params.extend([self.ob_code, self.ob_code + "\U0010ffff"])
+        elif self.ob_code:
+            where_clauses.append(
+                "rowid IN (SELECT design_rowid FROM pfs_design_ob_code_prefix WHERE ob_code_prefix = ?)"
+            )
+            params.append(self.ob_code[:OB_CODE_PREFIX_LENGTH])
+        if self.fiber_status is not None:
+            where_clauses.append(
+                "rowid IN (SELECT design_rowid FROM pfs_design_fiber_status WHERE fiber_status = ?)"
+            )
+            params.append(self.fiber_status)
+        if self.ob_code and len(self.ob_code) > OB_CODE_PREFIX_LENGTH:
+            # 先頭部分が一致する候補だけをFITSファイルで確かめる（他の条件より後に評価させる）
+            where_clauses.append("pfs_design_has_ob_code(frameid, file_mtime, ?)")
+            params.append(self.ob_code)
+        return where_clauses, params
+
+
+def read_design_metadata(filepath: Path, design_id: str, mtime: float) -> tuple[tuple, FiberSummary]:
+    """Design FITSファイルからキャッシュする1行分の値を読み込む
+
+    プロセスプールからも呼ばれるため、モジュールレベルの関数にしています。
+
+    Returns:
+        (pfs_design_metadata テーブルの1行（_INSERT_SQL の列順）, ファイバーの値の要約)
+    """
+    import astropy.io.fits as afits
+    import numpy
+
+    with afits.open(filepath) as hdul:
+        # ヘッダーからメタデータ取得
+        header = hdul[0].header  # type: ignore[union-attr]
+        name = header.get("DSGN_NAM", "")
+        ra = float(header.get("RA", 0.0))
+        dec = float(header.get("DEC", 0.0))
+        arms = header.get("ARMS", "-")
+
+        # ra, decから単位ベクトルを計算（高度ソート用）
+        ra_rad = numpy.radians(ra)
+        dec_rad = numpy.radians(dec)
+        x = float(numpy.cos(dec_rad) * numpy.cos(ra_rad))
+        y = float(numpy.cos(dec_rad) * numpy.sin(ra_rad))
+        z = float(numpy.sin(dec_rad))
+
+        # 行数を取得
+        num_design_rows = len(hdul[1].data) if hdul[1].data is not None else 0  # type: ignore[union-attr]
+        num_photometry_rows = len(hdul[2].data) if hdul[2].data is not None else 0  # type: ignore[union-attr]
+        num_guidestar_rows = len(hdul[3].data) if hdul[3].data is not None else 0  # type: ignore[union-attr]
+
+        # ターゲットタイプ別カウント（science, sky, fluxstd, unassigned, engineering, sunss_imaging, sunss_diffuse）
+        if hdul[1].data is not None:  # type: ignore[union-attr]
+            target_types = numpy.clip(hdul[1].data.field("targetType"), 0, 8)  # type: ignore[union-attr]
+            bc = numpy.bincount(target_types, minlength=8)
+            counts = [int(c) for c in bc[1:8]]
+        else:
+            counts = [0] * 7
+
+        fibers = FiberSummary.from_hdu(hdul[1])
+
+    row = (
+        design_id,
+        filepath.name,
+        name,
+        mtime,
+        ra,
+        dec,
+        x,
+        y,
+        z,
+        arms,
+        num_design_rows,
+        num_photometry_rows,
+        num_guidestar_rows,
+        *counts,
+        time.time(),
+    )
+    return row, fibers
+
+
+@functools.lru_cache(maxsize=OB_CODE_RECHECK_CACHE_SIZE)
+def _read_ob_codes(filepath: Path, mtime: float) -> frozenset[str]:
+    """Design FITSファイルの obCode の集合（mtime はキャッシュのキーにするためだけに受け取る）"""
+    import astropy.io.fits as afits
+
+    with afits.open(filepath) as hdul:
+        hdu = hdul[1]
+        if hdu.data is None or "obCode" not in hdu.columns.names:  # type: ignore[union-attr]
+            return frozenset()
+        values = np.char.strip(np.asarray(hdu.data.field("obCode"), dtype=str))  # type: ignore[union-attr]
+        return frozenset(str(value) for value in np.unique(values))
+
+
+def _signed_design_id(design_id: str) -> int:
+    """16進数のDesign IDを opdb の pfs_design_id（符号付き64ビット整数）にする"""
+    value = int(design_id, 16)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def read_opdb_design_metadata(engine: "Engine", items: list[tuple[str, str, float]]) -> list[tuple]:
+    """opdb からキャッシュする行を読み込む
+
+    pfs_design の行と、pfs_design_fiber のターゲットタイプ別の本数をまとめて取得します。
+    opdb にない値（ARMS、測光の行数）は NULL にします。
+    中心座標がないDesign、ファイバーの行がないDesignは返しません（FITSファイルから読む）。
+
+    Args:
+        engine: opdb のエンジン
+        items: (id, ファイル名, mtime) のリスト
+
+    Returns:
+        pfs_design_metadata テーブルの行（_SEED_SQL の列順）のリスト
+
+    Raises:
+        sqlalchemy.exc.SQLAlchemyError: opdb に接続できない場合など
+    """
+    from sqlalchemy import func, select
+
+    from pfs_obslog import models as M
+
+    files = {_signed_design_id(design_id): (design_id, filename, mtime) for design_id, filename, mtime in items}
+    fiber = M.t_pfs_design_fiber.c
+    rows: list[tuple] = []
+    with engine.connect() as conn:
+        all_ids = list(files)
+        for i in range(0, len(all_ids), OPDB_SEED_CHUNK_SIZE):
+            ids = all_ids[i : i + OPDB_SEED_CHUNK_SIZE]
+            counts = (
+                select(
+                    fiber.pfs_design_id,
+                    func.count().label("num_fibers"),
+                    # ターゲットタイプ 1〜7（science, sky, fluxstd, unassigned, engineering, sunss_imaging, sunss_diffuse）
+                    *(func.count().filter(fiber.target_type == t).label(f"type{t}") for t in range(1, 8)),
+                )
+                .where(fiber.pfs_design_id.in_(ids))
+                .group_by(fiber.pfs_design_id)
+                .subquery()
+            )
+            query = select(
+                M.PfsDesign.pfs_design_id,
+                M.PfsDesign.design_name,
+                M.PfsDesign.ra_center_designed,
+                M.PfsDesign.dec_center_designed,
+                M.PfsDesign.num_guide_stars,
+                counts.c.num_fibers,
+                *(counts.c[f"type{t}"] for t in range(1, 8)),
+            ).join(counts, counts.c.pfs_design_id == M.PfsDesign.pfs_design_id)
+            for pfs_design_id, name, ra, dec, num_guide_stars, num_fibers, *type_counts in conn.execute(query):
+                if ra is None or dec is None:
+                    continue
+                design_id, filename, mtime = files[pfs_design_id]
+                rows.append(
+                    (
+                        design_id,
+                        filename,
+                        name or "",
+                        mtime,
+                        ra,
+                        dec,
+                        *_unit_vector(ra, dec),
+                        None,
+                        num_fibers,
+                        None,
+                        num_guide_stars or 0,
+                        *type_counts,
+                        time.time(),
+                    )
+                )
+    return rows
+
+
+def _read_design_chunk(
+    design_dir: Path, items: list[tuple[str, str, float]]
+) -> tuple[list[tuple[tuple, FiberSummary]], list[tuple[str, str]]]:
+    """複数のDesignファイルを読み込む（プロセスプールで実行）
+
+    Args:
+        design_dir: Designファイルのディレクトリ
+        items: (id, ファイル名, mtime) のリスト
+
+    Returns:
+        (読み込めた (行, ファイバーの値の要約) のリスト, 読み込めなかった (ファイル名, エラー) のリスト)
+    """
+    rows: list[tuple[tuple, FiberSummary]] = []
+    errors: list[tuple[str, str]] = []
+    for design_id, filename, mtime in items:
+        try:
+            rows.append(read_design_metadata(design_dir / filename, design_id, mtime))
+        except Exception as e:
+            errors.append((filename, str(e)))
+    return rows, errors
+
+
+# 一覧用のエントリとして取得する列（_entry_from_row の順）
+_ENTRY_COLUMNS = """id, frameid, name, file_mtime, ra, dec, x, y, z, arms,
+    num_design_rows, num_photometry_rows, num_guidestar_rows,
+    science_count, sky_count, fluxstd_count,
+    unassigned_count, engineering_count,
+    sunss_imaging_count, sunss_diffuse_count"""
+_NUM_ENTRY_COLUMNS = len(_ENTRY_COLUMNS.split(","))
+
+
+def _entry_from_row(row: tuple) -> dict:
+    """_ENTRY_COLUMNS の行を一覧用のエントリ（辞書形式）にする
+
+    _ENTRY_COLUMNS の後に続く列は無視します。
+    """
+    (
+        design_id, frameid, name, file_mtime, ra, dec, x, y, z, arms,
+        num_design_rows, num_photometry_rows, num_guidestar_rows,
+        science, sky, fluxstd, unassigned, engineering, sunss_imaging, sunss_diffuse,
+    ) = row[:_NUM_ENTRY_COLUMNS]
+    return {
+        "id": design_id,
+        "frameid": frameid,
+        "name": name or "",
+        "date_modified": datetime.datetime.fromtimestamp(file_mtime),
+        "ra": ra or 0.0,
+        "dec": dec or 0.0,
+        "x": x,
+        "y": y,
+        "z": z,
+        "arms": arms or "-",
+        "num_design_rows": num_design_rows or 0,
+        "num_photometry_rows": num_photometry_rows or 0,
+        "num_guidestar_rows": num_guidestar_rows or 0,
+        "design_rows": {
+            "science": science or 0,
+            "sky": sky or 0,
+            "fluxstd": fluxstd or 0,
+            "unassigned": unassigned or 0,
+            "engineering": engineering or 0,
+            "sunss_imaging": sunss_imaging or 0,
+            "sunss_diffuse": sunss_diffuse or 0,
+        },
+    }
+
+
+def _filter_clauses(
+    search: str | None,
+    date_from: str | None,
+    date_to: str | None,
+    fibers: Optional[FiberFilter] = None,
+) -> tuple[list[str], list]:
+    """検索・日付・ファイバーの値のフィルターのWHERE句の条件とパラメータ
+
+    検索は全文検索インデックス（id, frameid, name, arms への部分一致、大文字小文字を区別しない）
+    を使います。trigram では3文字未満の語を検索できないため、短い検索語は LIKE で検索します。
+    """
+    where_clauses: list[str] = []
+    params: list = []
+
+    if search:
+        if len(search) >= _MIN_SEARCH_LENGTH:
+            where_clauses.append(
+                "rowid IN (SELECT rowid FROM pfs_design_search WHERE pfs_design_search MATCH ?)"
+            )
+            # 語全体を1つのフレーズとして部分一致させる
+            params.append('"' + search.replace('"', '""') + '"')
+        else:
+            where_clauses.append("(name LIKE ? OR id LIKE ? OR frameid LIKE ? OR arms LIKE ?)")
+            params.extend([f"%{search}%"] * 4)
+
+    # 日付フィルター（file_mtimeはUNIXタイムスタンプなので変換が必要）
+    if date_from:
+        where_clauses.append("date(file_mtime, 'unixepoch') >= ?")
+        params.append(date_from)
+    if date_to:
+        where_clauses.append("date(file_mtime, 'unixepoch') <= ?")
+        params.append(date_to)
+
+    if fibers is not None:
+        fiber_clauses, fiber_params = fibers.clauses()
+        where_clauses.extend(fiber_clauses)
+        params.extend(fiber_params)
+
+    return where_clauses, params
+
+
+def _unit_vector(ra: float, dec: float) -> tuple[float, float, float]:
+    """赤経・赤緯（度）の方向の単位ベクトル"""
+    ra_rad = math.radians(ra)
+    dec_rad = math.radians(dec)
+    return (
+        math.cos(dec_rad) * math.cos(ra_rad),
+        math.cos(dec_rad) * math.sin(ra_rad),
+        math.sin(dec_rad),
+    )
+
+
+def _sort_key(sort_by: str) -> str:
+    """ソートキーのSQL式
+
+    カーソルで比較できるように、NULL にならない式にします。
+    高度順（天頂方向との内積）はメモリ上の列で並べるため、ここでは扱いません
+    （DesignColumns.altitude）。
+    """
+    sort_column_map = {
+        "date_modified": "file_mtime",
+        "name": "COALESCE(name, '')",
+        "id": "id",
+    }
+    return sort_column_map.get(sort_by, "file_mtime")
+
+
+def encode_cursor(sort_by: str, sort_order: str, key: object, design_id: str) -> str:
+    """ページの最後の行からカーソル（URLに使える文字列）を作る"""
+    payload = orjson.dumps([sort_by, sort_order.lower(), key, design_id])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> tuple[object, str]:
+    """カーソルから (ソートキーの値, Design ID) を取り出す
+
+    Raises:
+        ValueError: カーソルが正しくない場合、作ったときとソート条件が異なる場合
+    """
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_sort_by, cursor_sort_order, key, design_id = payload
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order.lower()):
+        raise ValueError("Cursor does not match the sort order")
+    if not isinstance(key, (int, float, str)) or not isinstance(design_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key, design_id
+
+
+@dataclass
+class DesignPage:
+    """一覧の1ページ"""
+
+    entries: list[dict]  # エントリ（辞書形式）
+    total: int  # フィルター適用後の総件数
+    next_cursor: Optional[str]  # 次のページのカーソル（最後のページではNone）
+
+
+@dataclass(frozen=True)
+class DesignColumns:
+    """pfs_design_metadata の全行の一部の列（NumPy の配列、行は id 順）
+
+    世代ごとに作り直し、作った後は変更しません（複数のスレッドからそのまま読めます）。
+    """
+
+    generation: int  # 作ったときのキャッシュの世代
+    rowid: np.ndarray  # int64
+    id: np.ndarray  # Design ID（<U16）
+    file_mtime: np.ndarray  # float64
+    date: np.ndarray  # file_mtime のUTCの日付（<U10, YYYY-MM-DD）
+    ra: np.ndarray  # float64（NULLは0）
+    dec: np.ndarray  # float64（NULLは0）
+    x: np.ndarray  # float64（NULLはNaN）
+    y: np.ndarray
+    z: np.ndarray
+
+    @classmethod
+    def from_rows(cls, generation: int, rows: list[tuple]) -> "DesignColumns":
+        """(rowid, id, file_mtime, ra, dec, x, y, z) の行から作る"""
+        rowid, ids, file_mtime, ra, dec, x, y, z = zip(*rows) if rows else [()] * 8
+        file_mtime_array = np.array(file_mtime, dtype=np.float64)
+        columns = cls(
+            generation=generation,
+            rowid=np.array(rowid, dtype=np.int64),
+            id=np.array(ids, dtype="<U16"),
+            file_mtime=file_mtime_array,
+            # SQLite の date(file_mtime, 'unixepoch') と同じ日付
+            date=np.datetime_as_string(np.floor(file_mtime_array).astype("datetime64[s]"), unit="D"),
+            # None は NaN になる
+            ra=np.nan_to_num(np.array(ra, dtype=np.float64)),
+            dec=np.nan_to_num(np.array(dec, dtype=np.float64)),
+            x=np.array(x, dtype=np.float64),
+            y=np.array(y, dtype=np.float64),
+            z=np.array(z, dtype=np.float64),
+        )
+        for column in dataclasses.fields(cls)[1:]:
+            getattr(columns, column.name).flags.writeable = False
+        return columns
+
+    def altitude(self, zenith_ra: float, zenith_dec: float) -> np.ndarray:
+        """天頂との角距離のコサイン（高度順のソートキー、x, y, z がない行は-2）"""
+        zenith_x, zenith_y, zenith_z = _unit_vector(zenith_ra, zenith_dec)
+        # カーソルに入れた値と比較するため、常に同じ式（同じ演算の順序）で計算する
+        altitude = self.x * zenith_x + self.y * zenith_y + self.z * zenith_z
+        return np.where(np.isnan(altitude), -2.0, altitude)
+
+
+@dataclass
+class SyncProgress:
+    """同期の進捗"""
+
+    total: int  # 読み込むファイル数
+    done: int = 0  # 読み込みが終わったファイル数（失敗を含む）
+    failed: int = 0  # 読み込めなかったファイル数
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def elapsed(self) -> float:
+        return time.time() - self.started_at
+
+
 class PfsDesignCache:
     """PFS Design メタデータのSQLiteキャッシュ
 
@@ -40,6 +624,7 @@ class PfsDesignCache:
 
     キャッシュ更新はファイルのmtimeベースで差分更新され、
     二重起動を防ぐためのロック機構を持ちます。
+    更新するファイルが多い場合はプロセスプールで並列に読み込みます。
     """
 
     # SQLiteスキーマ
@@ -65,31 +650,171 @@ class PfsDesignCache:
         engineering_count INTEGER,
         sunss_imaging_count INTEGER,
         sunss_diffuse_count INTEGER,
-        cached_at REAL NOT NULL
+        cached_at REAL NOT NULL,
+        -- ファイバーの値の副テーブルを書き込んだか（0の行は次の同期で読み直す）
+        fibers_cached INTEGER NOT NULL DEFAULT 0
+    );
+    -- 一覧のソート・カーソルによるページ送り用（同じキーの行は id で並べる）
+    DROP INDEX IF EXISTS idx_pfs_design_mtime;
+    CREATE INDEX IF NOT EXISTS idx_pfs_design_mtime_id ON pfs_design_metadata(file_mtime, id);
+    CREATE INDEX IF NOT EXISTS idx_pfs_design_name_id ON pfs_design_metadata(COALESCE(name, ''), id);
+    -- 検索用の全文検索インデックス（trigramによる部分一致、トリガーで同期する）
+    CREATE VIRTUAL TABLE IF NOT EXISTS pfs_design_search USING fts5(
+        id, frameid, name, arms,
+        content='pfs_design_metadata', content_rowid='rowid', tokenize='trigram'
     );
-    CREATE INDEX IF NOT EXISTS idx_pfs_design_mtime ON pfs_design_metadata(file_mtime);
+    CREATE TRIGGER IF NOT EXISTS pfs_design_search_insert AFTER INSERT ON pfs_design_metadata BEGIN
+        INSERT INTO pfs_design_search (rowid, id, frameid, name, arms)
+        VALUES (new.rowid, new.id, new.frameid, new.name, new.arms);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pfs_design_search_delete AFTER DELETE ON pfs_design_metadata BEGIN
+        INSERT INTO pfs_design_search (pfs_design_search, rowid, id, frameid, name, arms)
+        VALUES ('delete', old.rowid, old.id, old.frameid, old.name, old.arms);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pfs_design_search_update AFTER UPDATE ON pfs_design_metadata BEGIN
+        INSERT INTO pfs_design_search (pfs_design_search, rowid, id, frameid, name, arms)
+        VALUES ('delete', old.rowid, old.id, old.frameid, old.name, old.arms);
+        INSERT INTO pfs_design_search (rowid, id, frameid, name, arms)
+        VALUES (new.rowid, new.id, new.frameid, new.name, new.arms);
+    END;
+    -- 中心方向の単位ベクトルの空間インデックス（コーンサーチ用、トリガーで同期する）
+    CREATE VIRTUAL TABLE IF NOT EXISTS pfs_design_position USING rtree(
+        id, min_x, max_x, min_y, max_y, min_z, max_z
+    );
+    CREATE TRIGGER IF NOT EXISTS pfs_design_position_insert AFTER INSERT ON pfs_design_metadata
+    WHEN new.x IS NOT NULL BEGIN
+        INSERT INTO pfs_design_position VALUES (new.rowid, new.x, new.x, new.y, new.y, new.z, new.z);
+    END;
+    CREATE TRIGGER IF NOT EXISTS pfs_design_position_delete AFTER DELETE ON pfs_design_metadata BEGIN
+        DELETE FROM pfs_design_position WHERE id = old.rowid;
+    END;
+    CREATE TRIGGER IF NOT EXISTS pfs_design_position_update AFTER UPDATE OF x, y, z ON pfs_design_metadata BEGIN
+        DELETE FROM pfs_design_position WHERE id = old.rowid;
+        INSERT INTO pfs_design_position
+        SELECT new.rowid, new.x, new.x, new.y, new.y, new.z, new.z WHERE new.x IS NOT NULL;
+    END;
+    -- ファイバーの値の副テーブル（値で検索するため (値, design_rowid) を主キーにする）
+    CREATE TABLE IF NOT EXISTS pfs_design_proposal (
+        proposal_id TEXT NOT NULL,
+        design_rowid INTEGER NOT NULL,
+        PRIMARY KEY (proposal_id, design_rowid)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS pfs_design_cat (
+        cat_id INTEGER NOT NULL,
+        design_rowid INTEGER NOT NULL,
+        PRIMARY KEY (cat_id, design_rowid)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS pfs_design_ob_code_prefix (
+        ob_code_prefix TEXT NOT NULL,
+        design_rowid INTEGER NOT NULL,
+        PRIMARY KEY (ob_code_prefix, design_rowid)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS pfs_design_fiber_status (
+        fiber_status INTEGER NOT NULL,
+        design_rowid INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (fiber_status, design_rowid)
+    ) WITHOUT ROWID;
+    -- Designの更新・削除で行を消すためのインデックス
+    CREATE INDEX IF NOT EXISTS idx_pfs_design_proposal_design ON pfs_design_proposal(design_rowid);
+    CREATE INDEX IF NOT EXISTS idx_pfs_design_cat_design ON pfs_design_cat(design_rowid);
+    CREATE INDEX IF NOT EXISTS idx_pfs_design_ob_code_prefix_design ON pfs_design_ob_code_prefix(design_rowid);
+    CREATE INDEX IF NOT EXISTS idx_pfs_design_fiber_status_design ON pfs_design_fiber_status(design_rowid);
+    CREATE TRIGGER IF NOT EXISTS pfs_design_fibers_delete AFTER DELETE ON pfs_design_metadata BEGIN
+        DELETE FROM pfs_design_proposal WHERE design_rowid = old.rowid;
+        DELETE FROM pfs_design_cat WHERE design_rowid = old.rowid;
+        DELETE FROM pfs_design_ob_code_prefix WHERE design_rowid = old.rowid;
+        DELETE FROM pfs_design_fiber_status WHERE design_rowid = old.rowid;
+    END;
+    -- 同期の世代（内容が変わった同期が完了するたびに増える。
+    -- 大量の読み込み中は、途中の書き込みのまとまりごとにも増える）
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        generation INTEGER NOT NULL,
+        completed_at REAL
+    );
+    INSERT OR IGNORE INTO sync_state (id, generation, completed_at) VALUES (0, 0, NULL);
     """
 
-    def __init__(self, db_path: Path, design_dir: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        design_dir: Path,
+        sync_workers: int = 4,
+        opdb_engine: Optional["Engine"] = None,
+    ):
         """
         Args:
             db_path: SQLiteデータベースファイルのパス
             design_dir: PFS DesignファイルのFITSファイルがあるディレクトリ
+            sync_workers: 同期時にFITSファイルを読み込むプロセス数
+            opdb_engine: キャッシュにない多数のDesignを先に登録する opdb のエンジン
+                （Noneの場合はFITSファイルだけから読む。close() で破棄する）
         """
         self.db_path = db_path
         self.design_dir = design_dir
+        self.sync_workers = sync_workers
+        self.opdb_engine = opdb_engine
         self._sync_lock = threading.Lock()
         self._syncing = False
+        self._progress: Optional[SyncProgress] = None
+        # ワーカープロセス間で同期を1つに限るためのロック
+        self._process_lock = LeaderLock(db_path.with_name(db_path.name + ".lock"))
+        # スレッドごとの読み込み用の接続（close() で閉じるために全て覚えておく）
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        # 書き込み用の接続（1つだけ）
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        # メモリ上の列のコピー（世代が変わったときに作り直す）
+        self._columns: Optional[DesignColumns] = None
+        self._columns_lock = threading.Lock()
         self._init_db()
 
     def _init_db(self) -> None:
         """データベースを初期化"""
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
         try:
+            # 同期中の書き込みで一覧取得が待たされないようにWALモードにする
+            conn.execute("PRAGMA journal_mode=WAL")
+            existing_tables = {
+                row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            # マイグレーション：x, y, zカラムがなければ追加（トリガーより先に行う）
+            if "pfs_design_metadata" in existing_tables:
+                self._migrate_add_xyz_columns(conn)
+                self._migrate_add_fibers_cached_column(conn)
+            if "pfs_design_ob_code" in existing_tables:
+                # obCode 全体の副テーブルを消すトリガーを作り直す（SCHEMA で作られる）
+                conn.execute("DROP TRIGGER IF EXISTS pfs_design_fibers_delete")
             conn.executescript(self.SCHEMA)
-            # マイグレーション：x, y, zカラムがなければ追加
-            self._migrate_add_xyz_columns(conn)
+            if "pfs_design_ob_code" in existing_tables:
+                # マイグレーション：obCode 全体の副テーブルを先頭部分の副テーブルに置き換える
+                logger.info("Migrating: Replacing pfs_design_ob_code with pfs_design_ob_code_prefix")
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO pfs_design_ob_code_prefix
+                    SELECT substr(ob_code, 1, ?), design_rowid FROM pfs_design_ob_code
+                    """,
+                    (OB_CODE_PREFIX_LENGTH,),
+                )
+                conn.execute("DROP TABLE pfs_design_ob_code")
+                conn.commit()
+            if "pfs_design_search" not in existing_tables:
+                # マイグレーション：既存の行から全文検索インデックスを作る
+                conn.execute("INSERT INTO pfs_design_search (pfs_design_search) VALUES ('rebuild')")
+                conn.commit()
+            if "pfs_design_position" not in existing_tables:
+                # マイグレーション：既存の行から空間インデックスを作る
+                conn.execute(
+                    """
+                    INSERT INTO pfs_design_position
+                    SELECT rowid, x, x, y, y, z, z FROM pfs_design_metadata WHERE x IS NOT NULL
+                    """
+                )
+                conn.commit()
         finally:
             conn.close()
 
@@ -120,15 +845,190 @@ class PfsDesignCache:
             conn.commit()
             logger.info("Migration complete: x, y, z columns added")
 
-    @contextmanager
-    def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
-        """データベース接続を取得（コンテキストマネージャー）"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def _migrate_add_fibers_cached_column(self, conn: sqlite3.Connection) -> None:
+        """fibers_cached カラムを追加するマイグレーション
+
+        既存の行は 0（ファイバーの値が未取得）になり、次の同期でFITSファイルを読み直します。
+        """
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pfs_design_metadata)")}
+        if "fibers_cached" not in columns:
+            logger.info("Migrating: Adding fibers_cached column to pfs_design_metadata")
+            conn.execute(
+                "ALTER TABLE pfs_design_metadata ADD COLUMN fibers_cached INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        """このスレッドの読み込み用の接続を取得
+
+        接続はスレッドごとに開いたまま使い回します。行はタプルで返します。
+        """
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            # close() は別のスレッドから呼ばれるため check_same_thread を無効にする
+            conn = sqlite3.connect(
+                self.db_path, timeout=10.0, check_same_thread=False, cached_statements=CACHED_STATEMENTS
+            )
+            conn.execute(f"PRAGMA mmap_size={READ_MMAP_SIZE}")
+            conn.execute(f"PRAGMA cache_size={-READ_CACHE_SIZE_KB}")
+            conn.execute("PRAGMA query_only=ON")
+            conn.create_function("pfs_design_has_ob_code", 3, self._has_ob_code)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _has_ob_code(self, frameid: str, file_mtime: float, ob_code: str) -> bool:
+        """Designに obCode が ob_code で始まるファイバーがあるか（FITSファイルで確かめる）
+
+        FiberFilter の OB_CODE_PREFIX_LENGTH 文字より長い前方一致で使います。
+        読めないファイルは一致しないものとします。
+        """
         try:
-            yield conn
-        finally:
+            ob_codes = _read_ob_codes(self.design_dir / frameid, file_mtime)
+        except Exception as e:
+            logger.warning(f"Failed to read obCode from {frameid}: {e}")
+            return False
+        return any(value.startswith(ob_code) for value in ob_codes)
+
+    @contextmanager
+    def _writer(self) -> Generator[sqlite3.Connection, None, None]:
+        """書き込み用の接続を取得（コンテキストマネージャー、同時に1スレッドのみ）"""
+        with self._write_lock:
+            if self._write_conn is None:
+                conn = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False)
+                # WALモードでは NORMAL でもDBは壊れない（電源断時に直前のコミットが失われるだけ）
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._write_conn = conn
+            yield self._write_conn
+
+    def close(self) -> None:
+        """開いている接続を全て閉じる
+
+        閉じた後も使えます（必要になったときに接続を開き直します）。
+        """
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+            # 他のスレッドの threading.local からは閉じた接続を消せないため、入れ物ごと取り替える
+            self._local = threading.local()
+        for conn in readers:
             conn.close()
+        with self._write_lock:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
+        if self.opdb_engine is not None:
+            self.opdb_engine.dispose()
+
+    def get_columns(self) -> DesignColumns:
+        """メモリ上の列のコピーを取得
+
+        キャッシュの世代が変わっていれば作り直します（同じ読み込みトランザクションで
+        世代と行を読むため、コピーの内容は常にその世代のものです）。
+        """
+        generation = self.get_generation()
+        columns = self._columns
+        if columns is not None and columns.generation == generation:
+            return columns
+        with self._columns_lock:
+            columns = self._columns
+            if columns is not None and columns.generation == self.get_generation():
+                return columns
+            conn = self._reader()
+            conn.execute("BEGIN")
+            try:
+                generation = conn.execute("SELECT generation FROM sync_state WHERE id = 0").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT rowid, id, file_mtime, ra, dec, x, y, z FROM pfs_design_metadata ORDER BY id"
+                ).fetchall()
+            finally:
+                conn.rollback()
+            columns = DesignColumns.from_rows(generation, rows)
+            self._columns = columns
+            return columns
+
+    def _columns_mask(
+        self,
+        columns: DesignColumns,
+        search: str | None,
+        date_from: str | None,
+        date_to: str | None,
+        fibers: Optional[FiberFilter] = None,
+    ) -> np.ndarray:
+        """フィルター条件に合う行（_filter_clauses と同じ条件）"""
+        mask = np.ones(len(columns.rowid), dtype=bool)
+        where_clauses, params = _filter_clauses(search, None, None, fibers)
+        if where_clauses:
+            # 検索・ファイバーの値はインデックスを使い、合う行の rowid を取得する
+            matched = np.fromiter(
+                (
+                    rowid
+                    for (rowid,) in self._reader().execute(
+                        "SELECT rowid FROM pfs_design_metadata WHERE " + " AND ".join(where_clauses), params
+                    )
+                ),
+                dtype=np.int64,
+            )
+            mask &= np.isin(columns.rowid, matched)
+        if date_from:
+            mask &= columns.date >= date_from
+        if date_to:
+            mask &= columns.date <= date_to
+        return mask
+
+    def get_position_arrays(
+        self,
+        search: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        fibers: Optional[FiberFilter] = None,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """フィルター条件に合うDesignの位置を配列で取得
+
+        Returns:
+            (id, ra, dec) の配列（id 順）
+        """
+        if not self.design_dir.exists():
+            return np.array([], dtype="<U16"), np.array([]), np.array([])
+        columns = self.get_columns()
+        if not (search or date_from or date_to or fibers):
+            return columns.id, columns.ra, columns.dec
+        mask = self._columns_mask(columns, search, date_from, date_to, fibers)
+        return columns.id[mask], columns.ra[mask], columns.dec[mask]
+
+    def _order_by_altitude(
+        self,
+        columns: DesignColumns,
+        mask: np.ndarray,
+        zenith_ra: float,
+        zenith_dec: float,
+        descending: bool,
+        count: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """フィルター条件に合う行のうち、高度順で先頭の count 行
+
+        同じ高度の行は id で並べます（get_page の ORDER BY と同じ順序）。
+
+        Returns:
+            (行の位置, 高度) の配列
+        """
+        (indices,) = np.nonzero(mask)
+        altitude = columns.altitude(zenith_ra, zenith_dec)[indices]
+        if count < len(indices):
+            # 先頭の count 行になりうる行（境界と同じ高度の行を含む）だけを並べる
+            if descending:
+                threshold = np.partition(altitude, len(altitude) - count)[len(altitude) - count]
+                (candidates,) = np.nonzero(altitude >= threshold)
+            else:
+                threshold = np.partition(altitude, count - 1)[count - 1]
+                (candidates,) = np.nonzero(altitude <= threshold)
+            indices, altitude = indices[candidates], altitude[candidates]
+        # 行は id 順なので、安定ソートで同じ高度の行は id 順になる（降順は全体を逆にする）
+        order = np.argsort(altitude, kind="stable")
+        if descending:
+            order = order[::-1]
+        order = order[:count]
+        return indices[order], altitude[order]
 
     def get_all_entries(self) -> list[dict]:
         """キャッシュから全エントリを取得
@@ -141,47 +1041,15 @@ class PfsDesignCache:
         if not self.design_dir.exists():
             return []
 
-        with self._get_connection() as conn:
-            cursor = conn.execute(
-                """
-                SELECT id, frameid, name, file_mtime, ra, dec, x, y, z, arms,
-                       num_design_rows, num_photometry_rows, num_guidestar_rows,
-                       science_count, sky_count, fluxstd_count,
-                       unassigned_count, engineering_count,
-                       sunss_imaging_count, sunss_diffuse_count
-                FROM pfs_design_metadata
-                ORDER BY file_mtime DESC
-                """
-            )
-            rows = cursor.fetchall()
+        rows = self._reader().execute(
+            f"""
+            SELECT {_ENTRY_COLUMNS}
+            FROM pfs_design_metadata
+            ORDER BY file_mtime DESC
+            """
+        ).fetchall()
 
-        return [
-            {
-                "id": row["id"],
-                "frameid": row["frameid"],
-                "name": row["name"] or "",
-                "date_modified": datetime.datetime.fromtimestamp(row["file_mtime"]),
-                "ra": row["ra"] or 0.0,
-                "dec": row["dec"] or 0.0,
-                "x": row["x"],
-                "y": row["y"],
-                "z": row["z"],
-                "arms": row["arms"] or "-",
-                "num_design_rows": row["num_design_rows"] or 0,
-                "num_photometry_rows": row["num_photometry_rows"] or 0,
-                "num_guidestar_rows": row["num_guidestar_rows"] or 0,
-                "design_rows": {
-                    "science": row["science_count"] or 0,
-                    "sky": row["sky_count"] or 0,
-                    "fluxstd": row["fluxstd_count"] or 0,
-                    "unassigned": row["unassigned_count"] or 0,
-                    "engineering": row["engineering_count"] or 0,
-                    "sunss_imaging": row["sunss_imaging_count"] or 0,
-                    "sunss_diffuse": row["sunss_diffuse_count"] or 0,
-                },
-            }
-            for row in rows
-        ]
+        return [_entry_from_row(row) for row in rows]
 
     def get_entries_paginated(
         self,
@@ -194,11 +1062,12 @@ class PfsDesignCache:
         zenith_dec: float | None = None,
         date_from: str | None = None,
         date_to: str | None = None,
+        fibers: Optional[FiberFilter] = None,
     ) -> tuple[list[dict], int]:
         """ページネーション、フィルタリング、ソート対応でエントリを取得
 
         Args:
-            search: 検索文字列（name または id に部分一致）
+            search: 検索文字列（name, id, frameid, arms に部分一致）
             sort_by: ソートキー（"date_modified", "name", "id", "altitude"）
             sort_order: ソート順序（"asc", "desc"）
             offset: 取得開始位置
@@ -207,122 +1076,161 @@ class PfsDesignCache:
             zenith_dec: 天頂のDec（度）- 高度ソート時に必要
             date_from: 日付範囲開始（YYYY-MM-DD形式）
             date_to: 日付範囲終了（YYYY-MM-DD形式）
+            fibers: ファイバーの値による絞り込み
 
         Returns:
             (エントリリスト, 総件数) のタプル
         """
-        if not self.design_dir.exists():
-            return [], 0
+        page = self.get_page(
+            search=search,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            offset=offset,
+            limit=limit,
+            zenith_ra=zenith_ra,
+            zenith_dec=zenith_dec,
+            date_from=date_from,
+            date_to=date_to,
+            fibers=fibers,
+        )
+        return page.entries, page.total
+
+    def get_page(
+        self,
+        search: str | None = None,
+        sort_by: str = "date_modified",
+        sort_order: str = "desc",
+        offset: int = 0,
+        limit: int = 50,
+        zenith_ra: float | None = None,
+        zenith_dec: float | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        cursor: str | None = None,
+        fibers: Optional[FiberFilter] = None,
+    ) -> DesignPage:
+        """カーソルによるページ送りに対応してエントリを取得
+
+        cursor を指定すると、そのカーソルを返したページの最後の行の次から取得します
+        （ソートキーと id の組での比較なので、OFFSET と違って読み飛ばす行を数えません）。
+        offset は cursor の位置から数えます。
+
+        Args:
+            cursor: 前のページの next_cursor
+            （その他は get_entries_paginated と同じ）
+
+        Returns:
+            ページ（エントリ、フィルター適用後の総件数、次のページのカーソル）
 
-        import math
+        Raises:
+            ValueError: カーソルが正しくない場合、ソート条件が異なる場合
+        """
+        if not self.design_dir.exists():
+            return DesignPage([], 0, None)
 
-        # 天頂の単位ベクトルを計算（高度ソート用）
-        zenith_x: float | None = None
-        zenith_y: float | None = None
-        zenith_z: float | None = None
         if sort_by == "altitude" and zenith_ra is not None and zenith_dec is not None:
-            ra_rad = math.radians(zenith_ra)
-            dec_rad = math.radians(zenith_dec)
-            zenith_x = math.cos(dec_rad) * math.cos(ra_rad)
-            zenith_y = math.cos(dec_rad) * math.sin(ra_rad)
-            zenith_z = math.sin(dec_rad)
+            return self._get_page_by_altitude(
+                search, sort_order, offset, limit, zenith_ra, zenith_dec, date_from, date_to, cursor, fibers
+            )
+
+        key_expr = _sort_key(sort_by)
+        descending = sort_order.lower() != "asc"
+        sort_dir = "DESC" if descending else "ASC"
 
         # SQLクエリの構築
-        select_columns = """id, frameid, name, file_mtime, ra, dec, x, y, z, arms,
-                   num_design_rows, num_photometry_rows, num_guidestar_rows,
-                   science_count, sky_count, fluxstd_count,
-                   unassigned_count, engineering_count,
-                   sunss_imaging_count, sunss_diffuse_count"""
-
-        base_query = f"""
-            SELECT {select_columns}
+        count_query = "SELECT COUNT(*) FROM pfs_design_metadata"
+        where_clauses, where_params = _filter_clauses(search, date_from, date_to, fibers)
+        if where_clauses:
+            count_query += " WHERE " + " AND ".join(where_clauses)
+        count_params = where_params.copy()
+
+        if cursor is not None:
+            after_key, after_id = decode_cursor(cursor, sort_by, sort_order)
+            # 前のページの最後の行より後ろの行（同じキーの行は id で並べる）
+            where_clauses.append(f"({key_expr}, id) {'<' if descending else '>'} (?, ?)")
+            where_params.extend([after_key, after_id])
+
+        # 総件数も同じクエリで取得する（相関のないサブクエリは1回だけ実行される）。
+        # COUNT(*) OVER () ではソートで上位の行だけを残す最適化が効かなくなるため使わない
+        query = f"""
+            SELECT {_ENTRY_COLUMNS}, ({count_query}) AS total, {key_expr} AS sort_key
             FROM pfs_design_metadata
         """
-        count_query = "SELECT COUNT(*) FROM pfs_design_metadata"
-        where_clauses: list[str] = []
-        params: list = []
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+        query += f" ORDER BY sort_key {sort_dir}, id {sort_dir} LIMIT ? OFFSET ?"
+        params = [*count_params, *where_params, limit, offset]
 
-        # 検索条件
-        if search:
-            where_clauses.append("(name LIKE ? OR id LIKE ?)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
+        conn = self._reader()
+        rows = conn.execute(query, params).fetchall()
+        if rows:
+            total = rows[0][_NUM_ENTRY_COLUMNS]
+        else:
+            # 範囲外のページでは行がなく総件数が分からないため、件数だけを取得する
+            total = conn.execute(count_query, count_params).fetchone()[0]
 
-        # 日付フィルター（file_mtimeはUNIXタイムスタンプなので変換が必要）
-        if date_from:
-            where_clauses.append("date(file_mtime, 'unixepoch') >= ?")
-            params.append(date_from)
-        if date_to:
-            where_clauses.append("date(file_mtime, 'unixepoch') <= ?")
-            params.append(date_to)
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_cursor = encode_cursor(sort_by, sort_order, last[_NUM_ENTRY_COLUMNS + 1], last[0])
 
-        # WHERE句を追加
-        if where_clauses:
-            where_clause = " WHERE " + " AND ".join(where_clauses)
-            base_query += where_clause
-            count_query += where_clause
-
-        # WHERE句のパラメータ数を記録（ソートパラメータ追加前）
-        count_params = params.copy()
-
-        # ソート
-        sort_dir = "ASC" if sort_order.lower() == "asc" else "DESC"
-        if sort_by == "altitude" and zenith_x is not None:
-            # 高度はcos(角距離) = 内積で計算
-            # コサインが大きいほど天頂に近い（descで高度順）
-            base_query += f" ORDER BY (x * ? + y * ? + z * ?) {sort_dir}"
-            params.extend([zenith_x, zenith_y, zenith_z])
-        else:
-            sort_column_map = {
-                "date_modified": "file_mtime",
-                "name": "name",
-                "id": "id",
-            }
-            sort_column = sort_column_map.get(sort_by, "file_mtime")
-            base_query += f" ORDER BY {sort_column} {sort_dir}"
-
-        # ページネーション
-        base_query += " LIMIT ? OFFSET ?"
-        query_params = params + [limit, offset]
-
-        with self._get_connection() as conn:
-            # 総件数を取得（WHERE句のパラメータのみ使用）
-            cursor = conn.execute(count_query, count_params)
-            total = cursor.fetchone()[0]
-
-            # データを取得
-            cursor = conn.execute(base_query, query_params)
-            rows = cursor.fetchall()
-
-        entries = [
-            {
-                "id": row["id"],
-                "frameid": row["frameid"],
-                "name": row["name"] or "",
-                "date_modified": datetime.datetime.fromtimestamp(row["file_mtime"]),
-                "ra": row["ra"] or 0.0,
-                "dec": row["dec"] or 0.0,
-                "x": row["x"],
-                "y": row["y"],
-                "z": row["z"],
-                "arms": row["arms"] or "-",
-                "num_design_rows": row["num_design_rows"] or 0,
-                "num_photometry_rows": row["num_photometry_rows"] or 0,
-                "num_guidestar_rows": row["num_guidestar_rows"] or 0,
-                "design_rows": {
-                    "science": row["science_count"] or 0,
-                    "sky": row["sky_count"] or 0,
-                    "fluxstd": row["fluxstd_count"] or 0,
-                    "unassigned": row["unassigned_count"] or 0,
-                    "engineering": row["engineering_count"] or 0,
-                    "sunss_imaging": row["sunss_imaging_count"] or 0,
-                    "sunss_diffuse": row["sunss_diffuse_count"] or 0,
-                },
-            }
-            for row in rows
-        ]
+        return DesignPage([_entry_from_row(row) for row in rows], total, next_cursor)
 
-        return entries, total
+    def _get_page_by_altitude(
+        self,
+        search: str | None,
+        sort_order: str,
+        offset: int,
+        limit: int,
+        zenith_ra: float,
+        zenith_dec: float,
+        date_from: str | None,
+        date_to: str | None,
+        cursor: str | None,
+        fibers: Optional[FiberFilter],
+    ) -> DesignPage:
+        """高度順のページをメモリ上の列で計算して取得
+
+        高度（天頂方向との内積）は行ごとに異なるためインデックスが使えません。
+        SQLite で全行を並べ替える代わりに、配列で並べ替えてページの行だけを読みます。
+        """
+        columns = self.get_columns()
+        descending = sort_order.lower() != "asc"
+        mask = self._columns_mask(columns, search, date_from, date_to, fibers)
+        total = int(np.count_nonzero(mask))
+        if cursor is not None:
+            after_key, after_id = decode_cursor(cursor, "altitude", sort_order)
+            altitude = columns.altitude(zenith_ra, zenith_dec)
+            # 行は id 順なので、id の比較は位置の比較にできる
+            position = np.arange(len(columns.id))
+            if descending:
+                after = np.searchsorted(columns.id, after_id, side="left")
+                mask &= (altitude < after_key) | ((altitude == after_key) & (position < after))
+            else:
+                after = np.searchsorted(columns.id, after_id, side="right")
+                mask &= (altitude > after_key) | ((altitude == after_key) & (position >= after))
+        indices, altitude = self._order_by_altitude(
+            columns, mask, zenith_ra, zenith_dec, descending, offset + limit
+        )
+        indices = indices[offset:]
+        altitude = altitude[offset:]
+
+        # ページの行を読む（コピーを作った後に削除された行は除く）
+        page_rowids = columns.rowid[indices].tolist()
+        rows = self._reader().execute(
+            f"SELECT {_ENTRY_COLUMNS}, rowid FROM pfs_design_metadata "
+            f"WHERE rowid IN ({', '.join('?' * len(page_rowids))})",
+            page_rowids,
+        ).fetchall()
+        rows_by_rowid = {row[_NUM_ENTRY_COLUMNS]: row for row in rows}
+        entries = [_entry_from_row(rows_by_rowid[rowid]) for rowid in page_rowids if rowid in rows_by_rowid]
+
+        next_cursor = None
+        if len(indices) == limit:
+            next_cursor = encode_cursor(
+                "altitude", sort_order, float(altitude[-1]), str(columns.id[indices[-1]])
+            )
+        return DesignPage(entries, total, next_cursor)
 
     def get_design_rank(
         self,
@@ -334,11 +1242,13 @@ class PfsDesignCache:
         zenith_dec: float | None = None,
         date_from: str | None = None,
         date_to: str | None = None,
+        fibers: Optional[FiberFilter] = None,
     ) -> int | None:
         """指定したDesign IDの順位（0始まり）を取得
 
         現在のフィルター・ソート条件での順位を返します。
         見つからない場合はNoneを返します。
+        全件を並べ替える代わりに、ソート順でそのDesignより前にある行を数えます。
 
         Args:
             design_id: Design ID（hex形式）
@@ -349,6 +1259,7 @@ class PfsDesignCache:
             zenith_dec: 天頂のDec（度）- 高度ソート時に必要
             date_from: 日付範囲開始（YYYY-MM-DD形式）
             date_to: 日付範囲終了（YYYY-MM-DD形式）
+            fibers: ファイバーの値による絞り込み
 
         Returns:
             順位（0始まり）またはNone
@@ -356,69 +1267,45 @@ class PfsDesignCache:
         if not self.design_dir.exists():
             return None
 
-        import math
-
-        # 天頂の単位ベクトルを計算（高度ソート用）
-        zenith_x: float | None = None
-        zenith_y: float | None = None
-        zenith_z: float | None = None
+        descending = sort_order.lower() != "asc"
         if sort_by == "altitude" and zenith_ra is not None and zenith_dec is not None:
-            ra_rad = math.radians(zenith_ra)
-            dec_rad = math.radians(zenith_dec)
-            zenith_x = math.cos(dec_rad) * math.cos(ra_rad)
-            zenith_y = math.cos(dec_rad) * math.sin(ra_rad)
-            zenith_z = math.sin(dec_rad)
-
-        # サブクエリでソート順を定義し、ROW_NUMBER相当を計算
-        # SQLiteにはWINDOW関数があるのでROW_NUMBER()が使える
-        select_columns = "id"
-        base_query = f"""
-            SELECT {select_columns}
-            FROM pfs_design_metadata
-        """
-        where_clauses: list[str] = []
-        params: list = []
-
-        if search:
-            where_clauses.append("(name LIKE ? OR id LIKE ?)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
-
-        if date_from:
-            where_clauses.append("date(file_mtime, 'unixepoch') >= ?")
-            params.append(date_from)
-
-        if date_to:
-            where_clauses.append("date(file_mtime, 'unixepoch') <= ?")
-            params.append(date_to)
-
-        if where_clauses:
-            base_query += " WHERE " + " AND ".join(where_clauses)
-
-        # ソート
-        sort_dir = "ASC" if sort_order.lower() == "asc" else "DESC"
-        if sort_by == "altitude" and zenith_x is not None:
-            base_query += f" ORDER BY (x * ? + y * ? + z * ?) {sort_dir}"
-            params.extend([zenith_x, zenith_y, zenith_z])
-        else:
-            sort_column_map = {
-                "date_modified": "file_mtime",
-                "name": "name",
-                "id": "id",
-            }
-            sort_column = sort_column_map.get(sort_by, "file_mtime")
-            base_query += f" ORDER BY {sort_column} {sort_dir}"
-
-        with self._get_connection() as conn:
-            cursor = conn.execute(base_query, params)
-            rows = cursor.fetchall()
-
-        # 順位を検索
-        for i, row in enumerate(rows):
-            if row["id"] == design_id:
-                return i
+            # 高度順はメモリ上の列で、前にある行を数える
+            columns = self.get_columns()
+            target = int(np.searchsorted(columns.id, design_id))
+            if target == len(columns.id) or columns.id[target] != design_id:
+                return None
+            mask = self._columns_mask(columns, search, date_from, date_to, fibers)
+            if not mask[target]:
+                return None
+            altitude = columns.altitude(zenith_ra, zenith_dec)
+            target_altitude = altitude[target]
+            # 行は id 順なので、id の比較は位置の比較にできる
+            position = np.arange(len(columns.id))
+            if descending:
+                before = (altitude > target_altitude) | ((altitude == target_altitude) & (position > target))
+            else:
+                before = (altitude < target_altitude) | ((altitude == target_altitude) & (position < target))
+            return int(np.count_nonzero(mask & before))
+
+        key_expr = _sort_key(sort_by)
+        where_clauses, params = _filter_clauses(search, date_from, date_to, fibers)
+        conn = self._reader()
+
+        # 対象のDesignのソートキー（フィルター条件に合わない場合は見つからない）
+        target = conn.execute(
+            f"SELECT {key_expr} FROM pfs_design_metadata WHERE "
+            + " AND ".join(["id = ?", *where_clauses]),
+            [design_id, *params],
+        ).fetchone()
+        if target is None:
+            return None
 
-        return None
+        # 一覧と同じ順序（ソートキー、同じキーの行は id）で前にある行を数える
+        where_clauses.append(f"({key_expr}, id) {'>' if descending else '<'} (?, ?)")
+        params.extend([target[0], design_id])
+        return conn.execute(
+            "SELECT COUNT(*) FROM pfs_design_metadata WHERE " + " AND ".join(where_clauses), params
+        ).fetchone()[0]
 
     def get_all_positions(self) -> list[dict]:
         """全Designの位置情報を取得（軽量版）
@@ -426,106 +1313,166 @@ class PfsDesignCache:
         Returns:
             位置情報（id, ra, dec）のリスト
         """
-        if not self.design_dir.exists():
-            return []
-
-        with self._get_connection() as conn:
-            cursor = conn.execute(
-                """
-                SELECT id, ra, dec
-                FROM pfs_design_metadata
-                """
-            )
-            rows = cursor.fetchall()
+        return self.get_positions_filtered()
 
-        return [
-            {
-                "id": row["id"],
-                "ra": row["ra"] or 0.0,
-                "dec": row["dec"] or 0.0,
-            }
-            for row in rows
-        ]
-
-    def get_positions_filtered(
+    def get_entries_in_cone(
         self,
+        ra: float,
+        dec: float,
+        radius: float,
         search: str | None = None,
         date_from: str | None = None,
         date_to: str | None = None,
+        limit: int = 1000,
+        fibers: Optional[FiberFilter] = None,
     ) -> list[dict]:
-        """フィルター条件に合うDesignの位置情報を取得
+        """中心方向が指定した円（コーン）の中にあるDesignを近い順に取得
+
+        空間インデックスで円を囲む立方体の中の候補を絞り込み、
+        単位ベクトルの内積で円の中にあるものを選びます。
 
         Args:
-            search: 検索文字列（name または id に部分一致）
+            ra: 円の中心の赤経（度）
+            dec: 円の中心の赤緯（度）
+            radius: 円の半径（度）
+            search: 検索文字列
             date_from: 日付範囲開始（YYYY-MM-DD形式）
             date_to: 日付範囲終了（YYYY-MM-DD形式）
+            limit: 取得件数
+            fibers: ファイバーの値による絞り込み
 
         Returns:
-            位置情報（id, ra, dec）のリスト
+            エントリ（辞書形式）のリスト。各エントリには中心からの角距離 separation（度）が付く
         """
         if not self.design_dir.exists():
             return []
 
-        query = "SELECT id, ra, dec FROM pfs_design_metadata"
-        where_clauses: list[str] = []
-        params: list = []
-
-        if search:
-            where_clauses.append("(name LIKE ? OR id LIKE ?)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
+        center = _unit_vector(ra, dec)
+        radius_rad = math.radians(min(radius, 180.0))
+        # 円の中の単位ベクトルは中心から弦の長さ以内にある
+        chord = 2 * math.sin(radius_rad / 2)
+        box: list[float] = []
+        for c in center:
+            box.extend([max(-1.0, c - chord), min(1.0, c + chord)])
+
+        where_clauses, params = _filter_clauses(search, date_from, date_to, fibers)
+        where_clauses[:0] = [
+            """rowid IN (
+                SELECT id FROM pfs_design_position
+                WHERE max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ? AND max_z >= ? AND min_z <= ?
+            )""",
+            "(x * ? + y * ? + z * ?) >= ?",
+        ]
+        params[:0] = [*box, *center, math.cos(radius_rad)]
 
-        if date_from:
-            where_clauses.append("date(file_mtime, 'unixepoch') >= ?")
-            params.append(date_from)
+        query = f"""
+            SELECT {_ENTRY_COLUMNS}, (x * ? + y * ? + z * ?) AS cos_separation
+            FROM pfs_design_metadata
+            WHERE {" AND ".join(where_clauses)}
+            ORDER BY cos_separation DESC
+            LIMIT ?
+        """
+        rows = self._reader().execute(query, [*center, *params, limit]).fetchall()
 
-        if date_to:
-            where_clauses.append("date(file_mtime, 'unixepoch') <= ?")
-            params.append(date_to)
+        entries = []
+        for row in rows:
+            entry = _entry_from_row(row)
+            cos_separation = row[_NUM_ENTRY_COLUMNS]
+            entry["separation"] = math.degrees(math.acos(max(-1.0, min(1.0, cos_separation))))
+            entries.append(entry)
+        return entries
 
-        if where_clauses:
-            query += " WHERE " + " AND ".join(where_clauses)
+    def get_positions_filtered(
+        self,
+        search: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        fibers: Optional[FiberFilter] = None,
+    ) -> list[dict]:
+        """フィルター条件に合うDesignの位置情報を取得
 
-        with self._get_connection() as conn:
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
+        Args:
+            search: 検索文字列（name, id, frameid, arms に部分一致）
+            date_from: 日付範囲開始（YYYY-MM-DD形式）
+            date_to: 日付範囲終了（YYYY-MM-DD形式）
+            fibers: ファイバーの値による絞り込み
 
+        Returns:
+            位置情報（id, ra, dec）のリスト
+        """
+        ids, ra, dec = self.get_position_arrays(search, date_from, date_to, fibers)
         return [
-            {
-                "id": row["id"],
-                "ra": row["ra"] or 0.0,
-                "dec": row["dec"] or 0.0,
-            }
-            for row in rows
+            {"id": design_id, "ra": design_ra, "dec": design_dec}
+            for design_id, design_ra, design_dec in zip(ids.tolist(), ra.tolist(), dec.tolist())
         ]
 
     def sync(self) -> bool:
         """ファイルシステムとデータベースを同期
 
         二重起動を防ぐためのロック機構があります。
-        既に同期中の場合は何もせずFalseを返します。
+        このプロセスまたは他のワーカープロセスで既に同期中の場合は何もせずFalseを返します。
 
         Returns:
             True: 同期を実行した
             False: 既に同期中のためスキップした
         """
+        return self._run_exclusive(self._do_sync)
+
+    def update_files(self, filenames: Iterable[str]) -> bool:
+        """指定したファイルだけをキャッシュに反映
+
+        ディレクトリ全体を走査せずに、追加・変更・削除されたファイルだけを反映します。
+        Design ファイルでないファイル名は無視します。
+
+        Args:
+            filenames: design_dir 内のファイル名
+
+        Returns:
+            True: 反映した
+            False: 既に同期中のためスキップした
+        """
+        names = sorted({name for name in filenames if DESIGN_FILE_PATTERN.match(name)})
+        return self._run_exclusive(lambda: self._do_update_files(names))
+
+    def _run_exclusive(self, func: Callable[[], None]) -> bool:
+        """同期処理をプロセス内・ワーカープロセス間で排他的に実行"""
         # 二重起動防止
         if not self._sync_lock.acquire(blocking=False):
             logger.debug("Sync already in progress, skipping")
             return False
 
         try:
-            self._syncing = True
-            self._do_sync()
-            return True
+            if not self._process_lock.try_acquire():
+                logger.debug("Sync is running in another worker, skipping")
+                return False
+            try:
+                self._syncing = True
+                func()
+                return True
+            finally:
+                self._syncing = False
+                self._progress = None
+                self._process_lock.release()
         finally:
-            self._syncing = False
             self._sync_lock.release()
 
     def is_syncing(self) -> bool:
         """同期中かどうか"""
         return self._syncing
 
+    def get_generation(self) -> int:
+        """キャッシュの世代
+
+        キャッシュの内容が変わった同期が完了するたびに増えます（全ワーカーで共通）。
+        プロセスプールでの読み込み中は、書き込みのまとまりごとにも増えます。
+        """
+        return self._reader().execute("SELECT generation FROM sync_state WHERE id = 0").fetchone()[0]
+
+    def get_sync_progress(self) -> Optional[SyncProgress]:
+        """同期中のFITSファイル読み込みの進捗（同期中でない場合はNone）"""
+        progress = self._progress
+        return dataclasses.replace(progress) if progress is not None else None
+
     def _do_sync(self) -> None:
         """実際の同期処理"""
         if not self.design_dir.exists():
@@ -550,10 +1497,12 @@ class PfsDesignCache:
             logger.warning(f"Failed to scan design directory: {e}")
             return
 
-        # 現在のキャッシュ状態を取得
-        with self._get_connection() as conn:
-            cursor = conn.execute("SELECT id, file_mtime FROM pfs_design_metadata")
-            cached_info = {row["id"]: row["file_mtime"] for row in cursor.fetchall()}
+        # 現在のキャッシュ状態を取得（ファイバーの値が未取得の行は mtime を None にして読み直す）
+        cached_info = dict(
+            self._reader().execute(
+                "SELECT id, CASE WHEN fibers_cached THEN file_mtime END FROM pfs_design_metadata"
+            )
+        )
 
         # 更新・追加が必要なファイルを特定
         to_update: list[tuple[str, str, float]] = []  # (id, filename, mtime)
@@ -570,111 +1519,217 @@ class PfsDesignCache:
             f"{len(file_info) - len(to_update)} up to date"
         )
 
+        self._apply(to_update, to_delete, [item for item in to_update if item[0] not in cached_info])
+
+        elapsed = time.time() - start_time
+        logger.info(f"PFS Design cache sync completed in {elapsed:.2f}s")
+
+    def _do_update_files(self, filenames: list[str]) -> None:
+        """指定したファイルの変更を反映"""
+        if not filenames:
+            return
+        ids = {_pick_id(name): name for name in filenames}
+        cached_info = dict(
+            self._reader().execute(
+                "SELECT id, CASE WHEN fibers_cached THEN file_mtime END FROM pfs_design_metadata "
+                f"WHERE id IN ({', '.join('?' * len(ids))})",
+                list(ids),
+            )
+        )
+
+        to_update: list[tuple[str, str, float]] = []
+        to_delete: set[str] = set()
+        for design_id, filename in ids.items():
+            try:
+                mtime = (self.design_dir / filename).stat().st_mtime
+            except FileNotFoundError:
+                if design_id in cached_info:
+                    to_delete.add(design_id)
+                continue
+            cached_mtime = cached_info.get(design_id)
+            if cached_mtime is None or abs(cached_mtime - mtime) > 0.001:
+                to_update.append((design_id, filename, mtime))
+
+        logger.info(f"Cache update: {len(to_update)} to update, {len(to_delete)} to delete")
+        self._apply(to_update, to_delete, [item for item in to_update if item[0] not in cached_info])
+
+    def _apply(
+        self,
+        to_update: list[tuple[str, str, float]],
+        to_delete: set[str],
+        to_add: list[tuple[str, str, float]],
+    ) -> None:
+        """更新・削除をキャッシュに反映し、同期の完了を記録
+
+        Args:
+            to_update: 読み込むファイルの (id, ファイル名, mtime)
+            to_delete: 削除するDesign ID
+            to_add: to_update のうちキャッシュにないもの（opdb から先に登録する）
+        """
         # 削除処理
         if to_delete:
-            with self._get_connection() as conn:
+            with self._writer() as conn, conn:
                 conn.executemany(
                     "DELETE FROM pfs_design_metadata WHERE id = ?",
                     [(id,) for id in to_delete],
                 )
-                conn.commit()
+
+        # 少数ならFITSファイルをすぐに読み終わるため、opdb から登録するのは多い場合だけ
+        if self.opdb_engine is not None and len(to_add) >= PARALLEL_SYNC_THRESHOLD:
+            self._seed_from_opdb(to_add)
 
         # 更新処理（FITSファイル読み込み）
-        for design_id, filename, mtime in to_update:
-            try:
-                self._update_entry(design_id, filename, mtime)
-            except Exception as e:
-                logger.warning(f"Failed to update cache for {filename}: {e}")
+        if len(to_update) < PARALLEL_SYNC_THRESHOLD or self.sync_workers <= 1:
+            # 少数の差分更新ではプロセスの起動の方が高くつくため1件ずつ処理する
+            for design_id, filename, mtime in to_update:
+                try:
+                    self._update_entry(design_id, filename, mtime)
+                except Exception as e:
+                    logger.warning(f"Failed to update cache for {filename}: {e}")
+        else:
+            self._update_entries_parallel(to_update)
 
-        elapsed = time.time() - start_time
-        logger.info(f"PFS Design cache sync completed in {elapsed:.2f}s")
+        # 同期の完了を記録（内容が変わった場合は世代を進める）
+        with self._writer() as conn, conn:
+            conn.execute(
+                "UPDATE sync_state SET generation = generation + ?, completed_at = ? WHERE id = 0",
+                (1 if to_update or to_delete else 0, time.time()),
+            )
 
-    def _update_entry(self, design_id: str, filename: str, mtime: float) -> None:
-        """単一エントリをキャッシュに追加・更新"""
-        import numpy
+    def _seed_from_opdb(self, items: list[tuple[str, str, float]]) -> None:
+        """opdb にあるDesignを、FITSファイルを読む前に一覧に登録する
+
+        登録した行はすぐに一覧に現れ（世代を進める）、その後のFITSファイルの読み込みで置き換わります。
+        opdb に接続できない場合は何もしません（FITSファイルだけから読む）。
+        """
+        from sqlalchemy.exc import SQLAlchemyError
 
+        assert self.opdb_engine is not None
+        start_time = time.time()
         try:
-            import astropy.io.fits as afits
-        except ImportError:
-            logger.error("astropy is not installed")
+            rows = read_opdb_design_metadata(self.opdb_engine, items)
+        except SQLAlchemyError as e:
+            logger.warning(f"Failed to seed PFS Design cache from opdb: {e}")
+            return
+        if not rows:
             return
+        with self._writer() as conn, conn:
+            conn.executemany(_SEED_SQL, rows)
+            conn.execute("UPDATE sync_state SET generation = generation + 1 WHERE id = 0")
+        logger.info(
+            f"Seeded {len(rows)}/{len(items)} designs from opdb in {time.time() - start_time:.2f}s"
+        )
 
-        filepath = self.design_dir / filename
-
-        with afits.open(filepath) as hdul:
-            # ヘッダーからメタデータ取得
-            header = hdul[0].header  # type: ignore[union-attr]
-            name = header.get("DSGN_NAM", "")
-            ra = float(header.get("RA", 0.0))
-            dec = float(header.get("DEC", 0.0))
-            arms = header.get("ARMS", "-")
-
-            # ra, decから単位ベクトルを計算（高度ソート用）
-            ra_rad = numpy.radians(ra)
-            dec_rad = numpy.radians(dec)
-            x = float(numpy.cos(dec_rad) * numpy.cos(ra_rad))
-            y = float(numpy.cos(dec_rad) * numpy.sin(ra_rad))
-            z = float(numpy.sin(dec_rad))
-
-            # 行数を取得
-            num_design_rows = len(hdul[1].data) if hdul[1].data is not None else 0  # type: ignore[union-attr]
-            num_photometry_rows = len(hdul[2].data) if hdul[2].data is not None else 0  # type: ignore[union-attr]
-            num_guidestar_rows = len(hdul[3].data) if hdul[3].data is not None else 0  # type: ignore[union-attr]
-
-            # ターゲットタイプ別カウント
-            if hdul[1].data is not None:  # type: ignore[union-attr]
-                target_types = numpy.clip(hdul[1].data.field("targetType"), 0, 8)  # type: ignore[union-attr]
-                bc = numpy.bincount(target_types, minlength=8)
-                science_count = int(bc[1])
-                sky_count = int(bc[2])
-                fluxstd_count = int(bc[3])
-                unassigned_count = int(bc[4])
-                engineering_count = int(bc[5])
-                sunss_imaging_count = int(bc[6])
-                sunss_diffuse_count = int(bc[7])
-            else:
-                science_count = sky_count = fluxstd_count = 0
-                unassigned_count = engineering_count = 0
-                sunss_imaging_count = sunss_diffuse_count = 0
+    def _create_executor(self) -> Executor:
+        """FITSファイル読み込み用のプロセスプールを作成
 
-        # データベースに保存
-        with self._get_connection() as conn:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO pfs_design_metadata (
-                    id, frameid, name, file_mtime, ra, dec, x, y, z, arms,
-                    num_design_rows, num_photometry_rows, num_guidestar_rows,
-                    science_count, sky_count, fluxstd_count,
-                    unassigned_count, engineering_count,
-                    sunss_imaging_count, sunss_diffuse_count,
-                    cached_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    design_id,
-                    filename,
-                    name,
-                    mtime,
-                    ra,
-                    dec,
-                    x,
-                    y,
-                    z,
-                    arms,
-                    num_design_rows,
-                    num_photometry_rows,
-                    num_guidestar_rows,
-                    science_count,
-                    sky_count,
-                    fluxstd_count,
-                    unassigned_count,
-                    engineering_count,
-                    sunss_imaging_count,
-                    sunss_diffuse_count,
-                    time.time(),
-                ),
-            )
-            conn.commit()
+        ワーカープロセスはスレッドを持つため、fork ではなく forkserver で子プロセスを作成します。
+        """
+        return ProcessPoolExecutor(
+            max_workers=self.sync_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+
+    def _update_entries_parallel(self, to_update: list[tuple[str, str, float]]) -> None:
+        """複数のエントリを並列に読み込み、まとめて書き込む
+
+        読み込み済みの行は WRITE_BATCH_SIZE 行ごとに1トランザクションで書き込むため、
+        構築中でも一覧には読み込み済みのDesignから表示されます。
+        """
+        progress = SyncProgress(total=len(to_update))
+        self._progress = progress
+        chunks = [
+            to_update[i : i + READ_CHUNK_SIZE] for i in range(0, len(to_update), READ_CHUNK_SIZE)
+        ]
+        pending: list[tuple[tuple, FiberSummary]] = []
+        logged_at = time.time()
+
+        with self._writer() as conn, self._create_executor() as executor:
+            futures = {
+                executor.submit(_read_design_chunk, self.design_dir, chunk): chunk for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    rows, errors = future.result()
+                except Exception as e:
+                    rows, errors = [], [(filename, str(e)) for _, filename, _ in chunk]
+                for filename, error in errors:
+                    logger.warning(f"Failed to update cache for {filename}: {error}")
+                pending.extend(rows)
+                progress.done += len(chunk)
+                progress.failed += len(errors)
+
+                if len(pending) >= WRITE_BATCH_SIZE:
+                    self._write_rows(conn, pending, advance_generation=True)
+                    pending = []
+                if time.time() - logged_at >= PROGRESS_LOG_INTERVAL:
+                    logged_at = time.time()
+                    logger.info(
+                        f"Cache sync progress: {progress.done}/{progress.total} files "
+                        f"({progress.failed} failed) in {progress.elapsed:.1f}s"
+                    )
+            if pending:
+                self._write_rows(conn, pending)
+
+    @staticmethod
+    def _write_rows(
+        conn: sqlite3.Connection, rows: list[tuple[tuple, FiberSummary]], advance_generation: bool = False
+    ) -> None:
+        """読み込んだ行とファイバーの値の副テーブルを1トランザクションで書き込む
+
+        Args:
+            rows: read_design_metadata の結果のリスト
+            advance_generation: 同じトランザクションで世代を進める
+                （時間のかかる同期の途中でも、書き込んだ行がETagやメモリ上の列に反映されるように）
+        """
+        with conn:
+            conn.executemany(_INSERT_SQL, [row for row, _ in rows])
+            # 副テーブルは design_rowid で参照する（UPSERTでは rowid は変わらない）
+            design_ids = [(row[0],) for row, _ in rows]
+            for table, columns in _FIBER_TABLES.items():
+                conn.executemany(
+                    f"DELETE FROM {table} "
+                    "WHERE design_rowid = (SELECT rowid FROM pfs_design_metadata WHERE id = ?)",
+                    design_ids,
+                )
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}, design_rowid) "
+                    f"SELECT {', '.join('?' * len(columns))}, rowid FROM pfs_design_metadata WHERE id = ?",
+                    [
+                        (*values, row[0])
+                        for row, fibers in rows
+                        for values in fibers.table_rows()[table]
+                    ],
+                )
+            if advance_generation:
+                conn.execute("UPDATE sync_state SET generation = generation + 1 WHERE id = 0")
+
+    def _update_entry(self, design_id: str, filename: str, mtime: float) -> None:
+        """単一エントリをキャッシュに追加・更新"""
+        record = read_design_metadata(self.design_dir / filename, design_id, mtime)
+        with self._writer() as conn:
+            self._write_rows(conn, [record])
+
+
+def create_opdb_engine(database_url: str) -> "Engine":
+    """opdb から登録するためのエンジンを作成
+
+    接続は登録するときに初めて開きます。接続・クエリには
+    OPDB_CONNECT_TIMEOUT・OPDB_STATEMENT_TIMEOUT のタイムアウトを付けます。
+    """
+    from sqlalchemy import create_engine
+
+    from pfs_obslog.database import psycopg_url
+
+    return create_engine(
+        psycopg_url(database_url),
+        pool_pre_ping=True,
+        connect_args={
+            "connect_timeout": OPDB_CONNECT_TIMEOUT,
+            "options": f"-c statement_timeout={OPDB_STATEMENT_TIMEOUT * 1000}",
+        },
+    )
 
 
 # シングルトンインスタンス管理
@@ -685,6 +1740,9 @@ _cache_lock = threading.Lock()
 def get_pfs_design_cache(db_path: Path, design_dir: Path) -> PfsDesignCache:
     """PfsDesignCacheのシングルトンインスタンスを取得
 
+    同期時の読み込みプロセス数は設定（pfs_design_sync_workers）から決めます。
+    設定（pfs_design_opdb_seed）が有効な場合は、database_url の opdb から先に登録します。
+
     Args:
         db_path: SQLiteデータベースファイルのパス
         design_dir: PFS DesignファイルのFITSファイルがあるディレクトリ
@@ -695,7 +1753,16 @@ def get_pfs_design_cache(db_path: Path, design_dir: Path) -> PfsDesignCache:
     global _cache_instance
     with _cache_lock:
         if _cache_instance is None:
-            _cache_instance = PfsDesignCache(db_path, design_dir)
+            settings = get_settings()
+            opdb_engine = None
+            if settings.pfs_design_opdb_seed:
+                opdb_engine = create_opdb_engine(settings.database_url)
+            _cache_instance = PfsDesignCache(
+                db_path,
+                design_dir,
+                sync_workers=settings.pfs_design_sync_workers,
+                opdb_engine=opdb_engine,
+            )
         return _cache_instance
 
 
@@ -706,4 +1773,6 @@ def clear_pfs_design_cache() -> None:
     """
     global _cache_instance
     with _cache_lock:
+        if _cache_instance is not None:
+            _cache_instance.close()
         _cache_instance = None
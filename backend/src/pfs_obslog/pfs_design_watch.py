@@ -0,0 +1,187 @@
+"""PFS Design ディレクトリの監視
+
+pfs_design_dir の変更を監視し、追加・変更・削除されたファイルだけを
+PFS Design キャッシュに反映します。
+API のリクエストごとにディレクトリ全体を走査する代わりに使います。
+
+gunicorn の複数ワーカーのうち、ロックファイルを取得した1つ（リーダー）だけが
+監視と反映を行います。他のワーカーはキャッシュDBを読むだけです。
+
+- inotify で変更されたファイル名を受け取る（使えない場合はディレクトリの更新日時を確認し、
+  変わっていればディレクトリ全体を走査する）
+- 変更が続いている間は反映を待ち（デバウンス）、反映の間隔も一定以上空ける
+"""
+
+import os
+import threading
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+from pfs_obslog.config import get_settings
+from pfs_obslog.dirwatch import DirectoryChangeWatcher
+from pfs_obslog.filelock import LeaderLock
+from pfs_obslog.pfs_design_cache import PfsDesignCache, get_pfs_design_cache
+
+logger = getLogger(__name__)
+
+
+class PfsDesignWatchService:
+    """pfs_design_dir の変更をキャッシュに反映するバックグラウンドサービス"""
+
+    # リーダーでない場合にロックの取得を試みる間隔（秒）
+    LEADER_RETRY_INTERVAL = 30.0
+    # 最後の変更からこの時間（秒）変更がなければ反映する
+    DEBOUNCE = 2.0
+    # 変更が続いていても、最初の変更からこの時間（秒）経ったら反映する
+    MAX_DELAY = 30.0
+    # 反映の最小間隔（秒）
+    MIN_RESCAN_INTERVAL = 10.0
+
+    def __init__(self, cache: PfsDesignCache, lock_path: Path, poll_interval: float = 30.0):
+        """
+        Args:
+            cache: 反映先のキャッシュ
+            lock_path: リーダー選出用ロックファイルのパス
+            poll_interval: ディレクトリの更新日時を確認する間隔（秒）
+        """
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self._lock = LeaderLock(lock_path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 反映待ちの変更
+        self._changed: set[str] = set()
+        self._rescan = False
+        self._first_change: Optional[float] = None
+        self._last_change: Optional[float] = None
+        self._applied_at = 0.0
+
+    def start(self) -> None:
+        """バックグラウンドスレッドを開始"""
+        self._thread = threading.Thread(target=self._run, name="pfs-design-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止してロックを解放"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+            self._thread = None
+        self._lock.release()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._lock.try_acquire():
+                self._stop.wait(self.LEADER_RETRY_INTERVAL)
+                continue
+            logger.info(f"PFS Design watch leader elected (pid={os.getpid()})")
+            try:
+                self._lead()
+            except Exception:
+                logger.exception("PFS Design watch service failed")
+                self._stop.wait(self.LEADER_RETRY_INTERVAL)
+
+    def _lead(self) -> None:
+        """リーダーとして監視と反映を行う"""
+        directory = self.cache.design_dir
+        while not directory.is_dir():
+            if self._stop.wait(self.poll_interval):
+                return
+        watcher = DirectoryChangeWatcher(directory, poll_interval=self.poll_interval)
+        logger.info(f"Watching {directory} for PFS Design changes ({watcher.backend})")
+        # 監視していなかった間の変更を反映するため、最初はディレクトリ全体を走査する
+        self._rescan = True
+        self._first_change = self._last_change = time.monotonic() - self.MAX_DELAY
+        try:
+            while not self._stop.is_set():
+                changes = watcher.wait(self._timeout())
+                self.record(changes)
+                if self._due():
+                    self.flush()
+        finally:
+            watcher.close()
+
+    def record(self, changes: Optional[set[str]]) -> None:
+        """検出した変更を反映待ちに加える
+
+        Args:
+            changes: 変更されたファイル名（Noneの場合はディレクトリ全体を走査する）
+        """
+        if changes is not None and not changes:
+            return
+        now = time.monotonic()
+        if changes is None:
+            self._rescan = True
+        else:
+            self._changed |= changes
+        if self._first_change is None:
+            self._first_change = now
+        self._last_change = now
+
+    def _due_at(self) -> Optional[float]:
+        """反映する時刻（反映待ちの変更がなければNone）"""
+        if self._first_change is None or self._last_change is None:
+            return None
+        settled = min(self._last_change + self.DEBOUNCE, self._first_change + self.MAX_DELAY)
+        return max(settled, self._applied_at + self.MIN_RESCAN_INTERVAL)
+
+    def _due(self) -> bool:
+        due_at = self._due_at()
+        return due_at is not None and time.monotonic() >= due_at
+
+    def _timeout(self) -> float:
+        """次に変更を待つ時間（停止の確認のため最大1秒）"""
+        due_at = self._due_at()
+        if due_at is None:
+            return 1.0
+        return min(1.0, max(0.0, due_at - time.monotonic()))
+
+    def flush(self) -> None:
+        """反映待ちの変更をキャッシュに反映"""
+        self._applied_at = time.monotonic()
+        changed, rescan = self._changed, self._rescan
+        self._changed, self._rescan = set(), False
+        done = self.cache.sync() if rescan else self.cache.update_files(changed)
+        if not done:
+            # 他のワーカーが同期中（最小間隔の後に改めて反映する）
+            self._changed |= changed
+            self._rescan |= rescan
+            return
+        self._first_change = self._last_change = None
+
+
+# シングルトンインスタンス管理
+_service: Optional[PfsDesignWatchService] = None
+_service_lock = threading.Lock()
+
+
+def start_pfs_design_watcher() -> Optional[PfsDesignWatchService]:
+    """PFS Design ディレクトリの監視を開始
+
+    キャッシュまたは監視が設定で無効化されている場合は何もしません。
+    ディレクトリがまだない場合（後からマウントされる場合など）は、できるまで待ってから監視します。
+    """
+    global _service
+    settings = get_settings()
+    if not (settings.pfs_design_cache_enabled and settings.pfs_design_watch_enabled):
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = PfsDesignWatchService(
+                get_pfs_design_cache(settings.pfs_design_cache_db, settings.pfs_design_dir),
+                settings.cache_dir / "pfs_design_watch.lock",
+                poll_interval=settings.pfs_design_watch_poll_interval,
+            )
+            _service.start()
+        return _service
+
+
+def stop_pfs_design_watcher() -> None:
+    """PFS Design ディレクトリの監視を停止"""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.stop()
+            _service = None
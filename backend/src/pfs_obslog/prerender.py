@@ -0,0 +1,294 @@
+"""プレビュー画像の事前生成
+
+観測中に新しく書き込まれたFITSファイルを監視し、
+デフォルトサイズのプレビュー画像を先に生成してディスクキャッシュに保存します。
+最初にvisitを開いた人が全カメラ分の生成を待たずに済むようにするためのものです。
+
+gunicorn の複数ワーカーのうち、ロックファイルを取得した1つ（リーダー）だけが
+監視と生成を行います。リーダーが終了するとロックが解放され、別のワーカーが引き継ぎます。
+
+対話的なリクエストと競合しないように、以下のように動作します。
+
+- 生成は優先度を下げた（nice）専用の1プロセスで1件ずつ行う
+- ロードアベレージが設定値を超えている間は生成を控える
+- 待ち行列は優先度付きで、SPS → MCS → AGC の順、同じ種類では新しいファイルから生成する
+"""
+
+import datetime
+import heapq
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Optional
+
+from pfs_obslog.config import get_settings
+from pfs_obslog.dirwatch import DirectoryWatcher
+from pfs_obslog.filelock import LeaderLock
+
+logger = getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PrerenderTarget:
+    """事前生成の対象となるファイルの種類"""
+
+    pattern: re.Pattern[str]  # ファイル名のパターン
+    width: int
+    height: int
+    hdu_indices: Optional[tuple[int, ...]]  # Noneの場合は全ての画像HDU
+    priority: int  # 小さいほど先に生成する
+
+
+# raw/<日付>/ 以下のディレクトリ名 -> 対象
+# サイズは各プレビューAPIのデフォルト値に合わせる
+PRERENDER_TARGETS: dict[str, PrerenderTarget] = {
+    "sps": PrerenderTarget(re.compile(r"^PFSA\d{8}\.fits$"), 1024, 1024, (1,), 0),
+    "ramps": PrerenderTarget(re.compile(r"^PFSB\d{8}\.fits$"), 1024, 1024, (1,), 0),
+    "mcs": PrerenderTarget(re.compile(r"^PFSC\d{8}\.fits$"), 1024, 1024, (1,), 1),
+    "agcc": PrerenderTarget(re.compile(r"^agcc_\d+_\d+\.fits$"), 512, 512, None, 2),
+}
+
+# 待ち行列の上限（超えた場合は優先度の低いものから捨てる）
+MAX_QUEUE_SIZE = 10000
+
+
+def classify(path: Path) -> Optional[str]:
+    """ファイルが事前生成の対象であれば種類（ディレクトリ名）を返す"""
+    kind = path.parent.name
+    target = PRERENDER_TARGETS.get(kind)
+    if target is None or not target.pattern.match(path.name):
+        return None
+    return kind
+
+
+def target_directories(data_root: Path, now: Optional[datetime.datetime] = None) -> list[Path]:
+    """監視対象のディレクトリを取得
+
+    raw/ 以下の日付ディレクトリはUTCの日付のため、
+    日付の変わり目を考慮して今日と前日の分を監視します。
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    directories = []
+    for days in (1, 0):
+        date_dir = data_root / "raw" / (now - datetime.timedelta(days=days)).strftime(r"%Y-%m-%d")
+        directories.extend(date_dir / kind for kind in PRERENDER_TARGETS)
+    return directories
+
+
+def prerender_file(path: Path, kind: str) -> int:
+    """1ファイル分のプレビュー画像を生成してディスクキャッシュに保存
+
+    事前生成用のプロセスで実行されます。
+    既にキャッシュにあるものは生成しません。
+
+    Returns:
+        処理したHDUの数
+    """
+    from pfs_obslog.imageformat import ImageFormat, default_format, resolve_quality
+    from pfs_obslog.routers.fits import _cache_agc_previews, _cache_preview
+
+    target = PRERENDER_TARGETS[kind]
+    # ブラウザが Accept で受け付ける形式を生成する
+    fmt = default_format()
+    quality = None if fmt == ImageFormat.png else resolve_quality(None)
+    if target.hdu_indices is None:
+        # 全ての画像HDUをファイルを1回開くだけで生成する
+        return len(_cache_agc_previews(path, target.width, target.height, fmt, quality))
+    for hdu_index in target.hdu_indices:
+        _cache_preview(path, target.width, target.height, hdu_index, fmt, quality)
+    return len(target.hdu_indices)
+
+
+def _lower_priority() -> None:
+    """事前生成用プロセスの優先度を下げる"""
+    os.nice(10)
+
+
+class PrerenderQueue:
+    """事前生成の優先度付き待ち行列"""
+
+    def __init__(self, max_size: int = MAX_QUEUE_SIZE):
+        self.max_size = max_size
+        self._heap: list[tuple[int, int, int, Path, str]] = []
+        self._queued: set[Path] = set()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, path: Path) -> bool:
+        """ファイルを追加（対象外または追加済みの場合はFalse）"""
+        kind = classify(path)
+        if kind is None or path in self._queued:
+            return False
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            return False
+        heapq.heappush(
+            self._heap,
+            (PRERENDER_TARGETS[kind].priority, -mtime_ns, next(self._counter), path, kind),
+        )
+        self._queued.add(path)
+        if len(self._heap) > self.max_size:
+            dropped = max(self._heap)
+            self._heap.remove(dropped)
+            heapq.heapify(self._heap)
+            self._queued.discard(dropped[3])
+        return True
+
+    def pop(self) -> tuple[Path, str]:
+        """最も優先度の高いファイルを取り出す"""
+        _, _, _, path, kind = heapq.heappop(self._heap)
+        self._queued.discard(path)
+        return path, kind
+
+
+class PrerenderService:
+    """新しいFITSファイルのプレビュー画像を事前生成するバックグラウンドサービス"""
+
+    # リーダーでない場合にロックの取得を試みる間隔（秒）
+    LEADER_RETRY_INTERVAL = 30.0
+    # 監視ディレクトリを更新する間隔（秒）
+    DIRECTORY_REFRESH_INTERVAL = 60.0
+    # ロードアベレージが高い場合に待つ時間（秒）
+    THROTTLE_WAIT = 5.0
+
+    def __init__(
+        self,
+        data_root: Path,
+        lock_path: Path,
+        poll_interval: float = 10.0,
+        max_load: float = 4.0,
+    ):
+        """
+        Args:
+            data_root: データのルートディレクトリ
+            lock_path: リーダー選出用ロックファイルのパス
+            poll_interval: inotify が使えない場合のポーリング間隔（秒）
+            max_load: ロードアベレージ（1分）がこれを超えている間は生成を控える
+        """
+        self.data_root = data_root
+        self.poll_interval = poll_interval
+        self.max_load = max_load
+        self.queue = PrerenderQueue()
+        self._lock = LeaderLock(lock_path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        """バックグラウンドスレッドを開始"""
+        self._thread = threading.Thread(target=self._run, name="prerender", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止してロックを解放"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10.0)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._lock.release()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._lock.try_acquire():
+                self._stop.wait(self.LEADER_RETRY_INTERVAL)
+                continue
+            logger.info(f"Prerender leader elected (pid={os.getpid()})")
+            try:
+                self._lead()
+            except Exception:
+                logger.exception("Prerender service failed")
+                self._stop.wait(self.LEADER_RETRY_INTERVAL)
+
+    def _lead(self) -> None:
+        """リーダーとして監視と生成を行う"""
+        watcher = DirectoryWatcher(poll_interval=self.poll_interval)
+        refreshed_at = 0.0
+        first = True
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - refreshed_at > self.DIRECTORY_REFRESH_INTERVAL:
+                    # 起動時に既にあるファイルは対象外、その後に作られたディレクトリの中身は対象
+                    watcher.set_directories(
+                        target_directories(self.data_root), report_existing=not first
+                    )
+                    refreshed_at = time.monotonic()
+                    first = False
+
+                for path in watcher.wait(0.0 if self.queue else 1.0):
+                    self.queue.push(path)
+
+                if not self.queue:
+                    continue
+                if self._overloaded():
+                    self._stop.wait(self.THROTTLE_WAIT)
+                    continue
+                self._render(*self.queue.pop())
+        finally:
+            watcher.close()
+
+    def _overloaded(self) -> bool:
+        try:
+            return os.getloadavg()[0] > self.max_load
+        except OSError:
+            return False
+
+    def _render(self, path: Path, kind: str) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_lower_priority,
+            )
+        start_time = time.time()
+        try:
+            count = self._executor.submit(prerender_file, path, kind).result()
+        except Exception as e:
+            logger.warning(f"Failed to prerender {path}: {e}")
+            return
+        logger.info(f"Prerendered {count} previews of {path} in {time.time() - start_time:.2f}s")
+
+
+# シングルトンインスタンス管理
+_service: Optional[PrerenderService] = None
+_service_lock = threading.Lock()
+
+
+def start_prerender_service() -> Optional[PrerenderService]:
+    """事前生成サービスを開始（設定で無効化されている場合は何もしない）"""
+    global _service
+    settings = get_settings()
+    if not settings.prerender_enabled:
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = PrerenderService(
+                settings.data_root,
+                settings.cache_dir / "prerender.lock",
+                poll_interval=settings.prerender_poll_interval,
+                max_load=settings.prerender_max_load,
+            )
+            _service.start()
+        return _service
+
+
+def stop_prerender_service() -> None:
+    """事前生成サービスを停止"""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.stop()
+            _service = None
@@ -0,0 +1,40 @@
+"""画像生成用プロセスプール
+
+FITSのデコードや縮小などCPUを多く使う処理を、
+ワーカープロセスとは別のプロセスで並列に実行します。
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from pfs_obslog.config import get_settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor() -> ProcessPoolExecutor:
+    """画像生成用プロセスプールを取得（初回呼び出し時に作成）
+
+    ワーカープロセスはスレッドを持つため、fork ではなく forkserver で子プロセスを作成します。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            settings = get_settings()
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.render_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _executor
+
+
+def shutdown_render_executor() -> None:
+    """プロセスプールを終了"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -4,27 +4,45 @@ FITS（Flexible Image Transport System）ファイルのダウンロードとプ
 SPS、MCS、AGCの各カメラタイプに対応しています。
 """
 
+import asyncio
 import datetime
-import functools
-import io
+import os
+from dataclasses import dataclass
 from enum import Enum
 from logging import getLogger
 from pathlib import Path
-from typing import Annotated, Any, Literal, Optional
+from typing import Annotated, Any, Awaitable, Callable, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import FileResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from pfs_obslog import fits_analysis
 from pfs_obslog import models as M
+from pfs_obslog.butler_cache import get_postisrccd_uri_cache
 from pfs_obslog.config import get_settings
 from pfs_obslog.database import get_db
+from pfs_obslog.filecache import FileCache, get_preview_cache
+from pfs_obslog.fileresponse import ConditionalFileResponse
+from pfs_obslog.fits_cache import get_fits_cache
+from pfs_obslog.imageformat import (
+    EncodedImage,
+    ImageFormat,
+    ImageOutput,
+    OutputFormat,
+    encode_image,
+    record_encoding,
+)
+from pfs_obslog.render_pool import get_render_executor
 
 
 logger = getLogger(__name__)
 router = APIRouter(prefix="/api/fits", tags=["fits"])
+# Visit単位のファイル情報（/api/visits/{visit_id}/files）
+visit_files_router = APIRouter(prefix="/api/visits", tags=["fits"])
 
 # キャッシュコントロールヘッダー（3日間）
 CACHE_CONTROL_HEADER = f"max-age={3 * 24 * 3600}"
@@ -43,6 +61,22 @@ class FitsType(str, Enum):
     postISRCCD = "postISRCCD"
 
 
+class CutoutFormat(str, Enum):
+    """切り出し画像の形式"""
+
+    fits = "fits"
+    npy = "npy"  # NumPy の .npy 形式
+
+
+class StatsMode(str, Enum):
+    """ピクセル統計の種類"""
+
+    region = "region"  # 領域全体
+    rows = "rows"  # 行ごと
+    columns = "columns"  # 列ごと
+    histogram = "histogram"
+
+
 # ============================================================
 # Schemas
 # ============================================================
@@ -83,6 +117,91 @@ class FitsMeta(BaseModel):
     hdul: list[FitsHdu]
 
 
+class FitsFileInfo(BaseModel):
+    """存在するFITSファイルの情報"""
+
+    filename: str
+    size: int  # バイト数
+    mtime: datetime.datetime  # 更新日時
+
+
+class SpsFitsFiles(BaseModel):
+    """SPSカメラごとのFITSファイル"""
+
+    camera_id: int  # カメラID（1-16）
+    raw: FitsFileInfo | None
+    calexp: FitsFileInfo | None
+    postISRCCD: FitsFileInfo | None
+
+
+class McsFitsFile(BaseModel):
+    """MCSフレームのFITSファイル"""
+
+    frame_id: int
+    file: FitsFileInfo
+
+
+class AgcFitsFile(BaseModel):
+    """AGC露出のFITSファイル"""
+
+    exposure_id: int
+    file: FitsFileInfo
+
+
+class VisitFiles(BaseModel):
+    """Visitに関連する存在するFITSファイルの一覧"""
+
+    visit_id: int
+    sps: list[SpsFitsFiles]  # いずれかのファイルが存在するカメラのみ
+    mcs: list[McsFitsFile]
+    agc: list[AgcFitsFile]
+
+
+class PixelStats(BaseModel):
+    """領域全体のピクセル統計（NaN/Infは除外）"""
+
+    count: int
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+    median: Optional[float]
+    std: Optional[float]
+
+
+class ProfileStats(BaseModel):
+    """行ごとまたは列ごとのピクセル統計（領域の先頭から順に並ぶ）"""
+
+    min: list[Optional[float]]
+    max: list[Optional[float]]
+    mean: list[Optional[float]]
+    median: list[Optional[float]]
+    std: list[Optional[float]]
+
+
+class PixelHistogram(BaseModel):
+    """ピクセル値のヒストグラム"""
+
+    edges: list[float]  # ビンの境界（ビン数+1個）
+    counts: list[int]
+    underflow: int  # 範囲より小さい値の数
+    overflow: int  # 範囲より大きい値の数
+
+
+class FitsStats(BaseModel):
+    """FITS画像の領域のピクセル統計"""
+
+    hdu_index: int
+    # 実際に計算した領域（画像の範囲に切り詰めたもの）
+    x: int
+    y: int
+    width: int
+    height: int
+    region: Optional[PixelStats] = None
+    rows: Optional[ProfileStats] = None
+    columns: Optional[ProfileStats] = None
+    histogram: Optional[PixelHistogram] = None
+
+
 # ============================================================
 # Helper Functions
 # ============================================================
@@ -133,8 +252,8 @@ def _sps_fits_path(visit: M.PfsVisit, camera_id: int, settings=None) -> Path:
     return path
 
 
-def _calexp_fits_path(visit: M.PfsVisit, camera_id: int, settings=None) -> Path:
-    """calexp FITSファイルのパスを取得"""
+def _calexp_fits_candidates(visit: M.PfsVisit, camera_id: int, settings=None) -> list[Path]:
+    """calexp FITSファイルのパス候補を優先順に取得"""
     if settings is None:
         settings = get_settings()
 
@@ -144,6 +263,7 @@ def _calexp_fits_path(visit: M.PfsVisit, camera_id: int, settings=None) -> Path:
     sm = camera_id // 4 + 1
     arm = "brnm"[camera_id % 4]
 
+    candidates: list[Path] = []
     for rerun in settings.calexp_reruns:
         for delta_d in (
             datetime.timedelta(days=0),
@@ -157,33 +277,29 @@ def _calexp_fits_path(visit: M.PfsVisit, camera_id: int, settings=None) -> Path:
                 / date.strftime(r"%Y-%m-%d")
             )
             category = "B" if arm == "n" else "A"
-            path = (
+            candidates.append(
                 date_dir
                 / f"v{visit_id:06d}"
                 / f"calExp-S{category}{visit_id:06d}{arm}{sm}.fits"
             )
-            if path.exists():
-                return path
+    return candidates
+
+
+def _calexp_fits_path(visit: M.PfsVisit, camera_id: int, settings=None) -> Path:
+    """calexp FITSファイルのパスを取得"""
+    for path in _calexp_fits_candidates(visit, camera_id, settings):
+        if path.exists():
+            return path
 
     raise FileNotFoundError(
         f"No such file for calexp visit={visit.pfs_visit_id} camera_id={camera_id}"
     )
 
 
-@functools.cache
-def _get_butler():
-    """Butlerインスタンスを取得（キャッシュ）"""
-    from lsst.daf.butler import Butler
-
-    settings = get_settings()
-    butler = Butler(str(settings.butler_datastore), collections=settings.butler_collection)  # type: ignore[no-untyped-call]
-    return butler
-
-
 def _postISRCCD_fits_path(visit: M.PfsVisit, camera_id: int) -> Path:
     """postISRCCD FITSファイルのパスを取得
 
-    ButlerからpostISRCCDのURIを取得してファイルパスに変換します。
+    visit単位でまとめて解決されたButlerのURIキャッシュからファイルパスを取得します。
 
     Args:
         visit: PfsVisitオブジェクト
@@ -198,28 +314,16 @@ def _postISRCCD_fits_path(visit: M.PfsVisit, camera_id: int) -> Path:
     camera_id -= 1
     sm = camera_id // 4 + 1
     arm = "brnm"[camera_id % 4]
-    butler = _get_butler()
-    try:
-        uri = str(butler.getURI("postISRCCD", visit=visit.pfs_visit_id, arm=arm, spectrograph=sm))  # type: ignore[no-untyped-call]
-    except Exception as e:
-        raise FileNotFoundError(
-            f"No postISRCCD file for visit={visit.pfs_visit_id} camera_id={camera_id}: {e}"
-        ) from e
-    # uri is a string like file:///data/drp/datastore/drpActor/reductions/20250320T071629Z/postISRCCD/postISRCCD_PFS_121237_r1_drpActor_reductions_20250320T071629Z.fits
-    prefix = "file://"
-    if not uri.startswith(prefix):
-        raise FileNotFoundError(
-            f"Unexpected URI format for postISRCCD: {uri}"
-        )
-    return Path(uri[len(prefix):])
+    return get_postisrccd_uri_cache().get_path(visit.pfs_visit_id, arm, sm)
 
 
-def _mcs_fits_path(visit: M.PfsVisit, frame_id: int, settings=None) -> Path:
-    """MCS FITSファイルのパスを取得"""
+def _mcs_fits_candidates(visit: M.PfsVisit, frame_id: int, settings=None) -> list[Path]:
+    """MCS FITSファイルのパス候補を優先順に取得"""
     if settings is None:
         settings = get_settings()
 
     date0 = _visit_date(visit)
+    candidates: list[Path] = []
     for delta_d in (
         datetime.timedelta(days=0),
         datetime.timedelta(days=-1),
@@ -227,7 +331,13 @@ def _mcs_fits_path(visit: M.PfsVisit, frame_id: int, settings=None) -> Path:
     ):
         date = date0 + delta_d
         date_dir = settings.data_root / "raw" / date.strftime(r"%Y-%m-%d")
-        path = date_dir / "mcs" / f"PFSC{frame_id:08d}.fits"
+        candidates.append(date_dir / "mcs" / f"PFSC{frame_id:08d}.fits")
+    return candidates
+
+
+def _mcs_fits_path(visit: M.PfsVisit, frame_id: int, settings=None) -> Path:
+    """MCS FITSファイルのパスを取得"""
+    for path in _mcs_fits_candidates(visit, frame_id, settings):
         if path.exists():
             return path
 
@@ -259,19 +369,24 @@ def _agc_fits_path(agc_exposure: M.AgcExposure, settings=None) -> Path:
     if settings is None:
         settings = get_settings()
 
+    # 撮影日時がなければディレクトリを決められない
+    if agc_exposure.taken_at is None:
+        raise AgcFitsNotAccessible(
+            f"No taken_at for agc_exposure_id={agc_exposure.agc_exposure_id}"
+        )
+
     # 新しい命名規則を試す
     new_path = _agc_fits_path_newer(agc_exposure, settings)
     if new_path.exists():
         return new_path
 
     # 古い命名規則（日時ベース）を試す
-    if agc_exposure.taken_at is not None:
-        fs_date = _dbdate2filesystem_date(agc_exposure.taken_at)
-        date_dir = settings.data_root / "raw" / fs_date.strftime(r"%Y-%m-%d")
-        fname_pattern = agc_exposure.taken_at.strftime(f"agcc_%Y%m%d_%H%M%S?.fits")
-        for path in (date_dir / "agcc").glob(fname_pattern):
-            if _agc_frame_id_from_fits(path) == agc_exposure.agc_exposure_id:
-                return path
+    fs_date = _dbdate2filesystem_date(agc_exposure.taken_at)
+    date_dir = settings.data_root / "raw" / fs_date.strftime(r"%Y-%m-%d")
+    fname_pattern = agc_exposure.taken_at.strftime(f"agcc_%Y%m%d_%H%M%S?.fits")
+    for path in (date_dir / "agcc").glob(fname_pattern):
+        if _agc_frame_id_from_fits(path) == agc_exposure.agc_exposure_id:
+            return path
 
     raise AgcFitsNotAccessible(
         f"No FITS file for agc_exposure_id={agc_exposure.agc_exposure_id}"
@@ -293,8 +408,71 @@ def _agc_frame_id_from_fits(path: Path) -> Optional[int]:
     return None
 
 
+class _FileIndex:
+    """ディレクトリ一覧をキャッシュしてファイルの存在を確認する
+
+    同じディレクトリにある多数のファイルの存在を確認する際に、
+    ファイルごとに stat を発行せず、ディレクトリを1回だけ読み込みます。
+    """
+
+    def __init__(self):
+        self._listings: dict[Path, dict[str, os.DirEntry]] = {}
+
+    def _listing(self, directory: Path) -> dict[str, os.DirEntry]:
+        listing = self._listings.get(directory)
+        if listing is None:
+            try:
+                with os.scandir(directory) as entries:
+                    listing = {entry.name: entry for entry in entries}
+            except OSError:
+                listing = {}
+            self._listings[directory] = listing
+        return listing
+
+    def stat(self, path: Path) -> Optional[os.stat_result]:
+        """ファイルが存在すればstat情報を、存在しなければNoneを返す"""
+        entry = self._listing(path.parent).get(path.name)
+        if entry is None:
+            return None
+        try:
+            return entry.stat()
+        except OSError:
+            return None
+
+    def file_info(self, path: Path) -> Optional[FitsFileInfo]:
+        """ファイルが存在すればFitsFileInfoを返す"""
+        st = self.stat(path)
+        if st is None:
+            return None
+        return FitsFileInfo(
+            filename=path.name,
+            size=st.st_size,
+            mtime=datetime.datetime.fromtimestamp(st.st_mtime),
+        )
+
+    def first_file_info(self, candidates: list[Path]) -> Optional[FitsFileInfo]:
+        """候補の中で最初に存在するファイルのFitsFileInfoを返す"""
+        for path in candidates:
+            info = self.file_info(path)
+            if info is not None:
+                return info
+        return None
+
+
 def _fits_meta(path: Path) -> FitsMeta:
-    """FITSファイルのメタデータを取得"""
+    """FITSファイルのメタデータを取得（キャッシュあり）"""
+    cache = get_fits_cache()
+    st = path.stat()
+    cached = cache.get_header(path, st)
+    if cached is not None:
+        return FitsMeta.model_validate_json(cached)
+    meta = _read_fits_meta(path)
+    cache.put_header(path, st, meta.model_dump_json())
+    return meta
+
+
+def _read_fits_meta(path: Path) -> FitsMeta:
+    """FITSファイルを読み込んでメタデータを作成"""
     import astropy.io.fits as afits
 
     with afits.open(path) as hdul:
@@ -328,8 +506,100 @@ def _stringify(value: Any) -> str:
     return str(value)
 
 
-def _fits2png(filepath: Path, max_width: int = 1024, max_height: int = 1024, hdu_index: int = 1) -> bytes:
-    """FITSファイルからPNG画像を生成
+def _zscale_limits(
+    data,
+    n_samples: int = 1000,
+    contrast: float = 0.25,
+    max_reject: float = 0.5,
+    min_npixels: int = 5,
+    krej: float = 2.5,
+    max_iterations: int = 5,
+) -> tuple[float, float]:
+    """ZScaleアルゴリズムで表示範囲 (vmin, vmax) を計算
+
+    astropy の ZScaleInterval と同じアルゴリズムですが、
+    配列全体ではなく等間隔に抽出したサンプルのみを扱い、
+    直線フィットも重み付き最小二乗の閉じた式で計算します。
+
+    Args:
+        data: 画像配列（フル解像度）
+        n_samples: サンプル数
+        contrast: コントラスト
+        max_reject: 棄却できるピクセルの最大割合
+        min_npixels: フィットに必要な最小ピクセル数
+        krej: 棄却しきい値（標準偏差の倍数）
+        max_iterations: 棄却の最大反復回数
+
+    Returns:
+        (vmin, vmax)
+    """
+    import numpy
+
+    flat = numpy.ravel(data)
+    stride = max(1, flat.size // n_samples)
+    samples = numpy.asarray(flat[::stride][:n_samples], dtype=numpy.float64)
+    samples = samples[numpy.isfinite(samples)]
+    if samples.size == 0:
+        return 0.0, 1.0
+    samples.sort()
+
+    npix = samples.size
+    vmin = float(samples[0])
+    vmax = float(samples[-1])
+    minpix = max(min_npixels, int(npix * max_reject))
+    x = numpy.arange(npix, dtype=numpy.float64)
+    # 棄却したピクセルの近傍も棄却する
+    kernel = numpy.ones(max(1, int(npix * 0.01)))
+
+    good = numpy.ones(npix, dtype=bool)
+    ngoodpix = npix
+    last_ngoodpix = npix + 1
+    slope = 0.0
+    for _ in range(max_iterations):
+        if ngoodpix >= last_ngoodpix or ngoodpix < minpix:
+            break
+        xg = x[good]
+        yg = samples[good]
+        xm = xg.mean()
+        ym = yg.mean()
+        sxx = ((xg - xm) ** 2).sum()
+        slope = ((xg - xm) * (yg - ym)).sum() / sxx if sxx > 0 else 0.0
+        residual = samples - (ym + slope * (x - xm))
+        threshold = krej * residual[good].std()
+        bad = (residual < -threshold) | (residual > threshold)
+        good = numpy.convolve(bad, kernel, mode="same") == 0
+        last_ngoodpix = ngoodpix
+        ngoodpix = int(good.sum())
+
+    if ngoodpix >= minpix:
+        if contrast > 0:
+            slope /= contrast
+        center = (npix - 1) // 2
+        median = float(numpy.median(samples))
+        vmin = max(vmin, median - (center - 1) * slope)
+        vmax = min(vmax, median + (npix - center) * slope)
+    return vmin, vmax
+
+
+def _display_limits(filepath: Path, hdu_index: int, data) -> tuple[float, float]:
+    """ファイル・HDUごとの表示範囲を取得（キャッシュあり）
+
+    表示範囲はフル解像度のデータから計算して保存するため、
+    同じ画像はどのサイズで描画しても同じ濃淡になります。
+    """
+    cache = get_fits_cache()
+    st = filepath.stat()
+    limits = cache.get_display_limits(filepath, st, hdu_index)
+    if limits is None:
+        limits = _zscale_limits(data)
+        cache.put_display_limits(filepath, st, hdu_index, limits)
+    return limits
+
+
+def _fits2array(filepath: Path, max_width: int = 1024, max_height: int = 1024, hdu_index: int = 1):
+    """FITSファイルから8ビットのグレースケール画像配列を生成
+
+    プロセスプールからも呼び出されるため、モジュールレベルの関数にしています。
 
     Args:
         filepath: FITSファイルのパス
@@ -338,19 +608,40 @@ def _fits2png(filepath: Path, max_width: int = 1024, max_height: int = 1024, hdu
         hdu_index: 使用するHDUのインデックス
 
     Returns:
-        PNG画像のバイトデータ
+        uint8の2次元配列
     """
     import astropy.io.fits as afits
-    import numpy
-    import skimage.transform
-    from astropy.visualization import ZScaleInterval
-    from PIL import Image
 
     with afits.open(filepath) as hdul:
-        data = hdul[hdu_index].data[::-1]  # type: ignore[union-attr]
+        return _hdu2array(filepath, hdu_index, hdul[hdu_index].data, max_width, max_height)  # type: ignore[union-attr]
+
+
+def _image_hdu_indices(hdul) -> list[int]:
+    """2次元画像を持つHDU（プライマリHDUを除く）のインデックス"""
+    return [i for i, hdu in enumerate(hdul) if i > 0 and hdu.is_image and hdu.header.get("NAXIS") == 2]
+
+
+def _hdu2array(filepath: Path, hdu_index: int, data, max_width: int, max_height: int):
+    """HDUのデータから8ビットのグレースケール画像配列を生成
+
+    Args:
+        filepath: FITSファイルのパス（表示範囲のキャッシュに使用）
+        hdu_index: HDUのインデックス（表示範囲のキャッシュに使用）
+        data: HDUのデータ（2次元配列）
+        max_width: 最大幅
+        max_height: 最大高さ
+
+    Returns:
+        uint8の2次元配列
+    """
+    import numpy
+    import skimage.transform
 
     assert len(data.shape) == 2
 
+    vmin, vmax = _display_limits(filepath, hdu_index, data)
+    data = data[::-1]
+
     # リサイズファクターを計算
     factor = max(
         (data.shape[0] - 1) // max_height + 1 if max_height else 0,
@@ -362,28 +653,355 @@ def _fits2png(filepath: Path, max_width: int = 1024, max_height: int = 1024, hdu
     if factor > 1:
         data = skimage.transform.downscale_local_mean(data, (factor, factor))
 
-    # ZScaleで値をマッピング
-    zscale = ZScaleInterval()
-    vmin, vmax = zscale.get_limits(data)
-
     # 8ビットに変換
-    data8 = numpy.array(
-        255 * numpy.clip((data - vmin) / (vmax - vmin), 0.0, 1.0), dtype=numpy.uint8
+    scale = (vmax - vmin) or 1.0
+    return numpy.array(
+        255 * numpy.clip((data - vmin) / scale, 0.0, 1.0), dtype=numpy.uint8
     )
 
-    # PNG形式で出力
-    img = Image.fromarray(data8)
-    buffer = io.BytesIO()
-    img.save(buffer, format="png")
-    return buffer.getvalue()
 
+def _fits2image(
+    filepath: Path,
+    max_width: int = 1024,
+    max_height: int = 1024,
+    hdu_index: int = 1,
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> EncodedImage:
+    """FITSファイルからプレビュー画像を生成
 
-def _cached_response(content: bytes, media_type: str) -> Response:
+    Args:
+        filepath: FITSファイルのパス
+        max_width: 最大幅
+        max_height: 最大高さ
+        hdu_index: 使用するHDUのインデックス
+        fmt: 出力形式
+        quality: 品質（非可逆形式のみ）
+
+    Returns:
+        エンコード済みの画像
+    """
+    return encode_image(_fits2array(filepath, max_width, max_height, hdu_index), fmt, quality)
+
+
+def _sps_mosaic_image(
+    tiles: dict[int, Any],
+    tile_width: int,
+    tile_height: int,
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> EncodedImage:
+    """SPSカメラのプレビューを1枚のグリッド画像にまとめる
+
+    行は分光器（SM1-4）、列はアーム（b, r, n, m）の順に並べます。
+    画像のないカメラは暗いタイルになります。
+
+    Args:
+        tiles: カメラID（1-16） -> uint8の2次元配列（Noneは画像なし）
+        tile_width: タイルの幅
+        tile_height: タイルの高さ
+        fmt: 出力形式
+        quality: 品質（非可逆形式のみ）
+
+    Returns:
+        エンコード済みの画像
+    """
+    labeled = [
+        (f"{'brnm'[(camera_id - 1) % 4]}{(camera_id - 1) // 4 + 1}", tiles.get(camera_id))
+        for camera_id in range(1, 17)
+    ]
+    return encode_image(_tile_grid(labeled, 4, tile_width, tile_height), fmt, quality)
+
+
+def _tile_grid(tiles: list[tuple[str, Any]], columns: int, tile_width: int, tile_height: int):
+    """ラベル付きのタイルを格子状に並べた画像を作成
+
+    タイルは左上から行方向に並べ、タイルより小さい画像は中央に配置します。
+    画像のないタイル（None）は暗いタイルになります。
+
+    Args:
+        tiles: (ラベル, uint8の2次元配列またはNone) のリスト
+        columns: 列数
+        tile_width: タイルの幅
+        tile_height: タイルの高さ
+
+    Returns:
+        PIL の Image
+    """
+    import numpy
+    from PIL import Image, ImageDraw
+
+    gap = 2
+    rows = (len(tiles) - 1) // columns + 1
+    grid = numpy.full(
+        (rows * tile_height + (rows - 1) * gap, columns * tile_width + (columns - 1) * gap),
+        16,
+        dtype=numpy.uint8,
+    )
+    for i, (_, tile) in enumerate(tiles):
+        y0 = (i // columns) * (tile_height + gap)
+        x0 = (i % columns) * (tile_width + gap)
+        if tile is None:
+            grid[y0 : y0 + tile_height, x0 : x0 + tile_width] = 48
+            continue
+        h, w = min(tile.shape[0], tile_height), min(tile.shape[1], tile_width)
+        oy = y0 + (tile_height - h) // 2
+        ox = x0 + (tile_width - w) // 2
+        grid[oy : oy + h, ox : ox + w] = tile[:h, :w]
+
+    img = Image.fromarray(grid)
+    draw = ImageDraw.Draw(img)
+    for i, (label, _) in enumerate(tiles):
+        xy = ((i % columns) * (tile_width + gap) + 4, (i // columns) * (tile_height + gap) + 2)
+        draw.text(xy, label, fill=255, stroke_width=1, stroke_fill=0)
+    return img
+
+
+def _agc_arrays(filepath: Path, max_width: int, max_height: int) -> dict[int, Any]:
+    """AGC FITSファイルを1回だけ開き、全カメラのHDUを画像配列にする
+
+    Returns:
+        HDUのインデックス -> uint8の2次元配列
+    """
+    import astropy.io.fits as afits
+
+    with afits.open(filepath) as hdul:
+        return {
+            hdu_index: _hdu2array(
+                filepath, hdu_index, hdul[hdu_index].data, max_width, max_height  # type: ignore[union-attr]
+            )
+            for hdu_index in _image_hdu_indices(hdul)
+        }
+
+
+def _cache_agc_previews(
+    filepath: Path,
+    width: int,
+    height: int,
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> dict[int, tuple[bytes, str, Optional[float]]]:
+    """AGC FITSファイルの全カメラのプレビュー画像を生成してディスクキャッシュに保存
+
+    ファイルは1回だけ開き、全HDUをまとめて処理します。
+    プロセスプールからも呼び出されるため、モジュールレベルの関数にしています。
+
+    Returns:
+        HDUのインデックス -> (画像, キャッシュキー, エンコード時間)
+    """
+    st = filepath.stat()
+    cache = get_preview_cache()
+    results: dict[int, tuple[bytes, str, Optional[float]]] = {}
+    for hdu_index, data8 in _agc_arrays(filepath, width, height).items():
+        key = _preview_key(filepath, st, width, height, hdu_index, fmt, quality)
+        encoded = encode_image(data8, fmt, quality)
+        cache.put(key, encoded.content)
+        results[hdu_index] = (encoded.content, key, encoded.encode_seconds)
+    return results
+
+
+def _agc_strip_image(
+    filepath: Path,
+    tile_width: int,
+    tile_height: int,
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> EncodedImage:
+    """AGC FITSファイルの全カメラを横一列に並べた画像を生成
+
+    プロセスプールからも呼び出されるため、モジュールレベルの関数にしています。
+    """
+    arrays = _agc_arrays(filepath, tile_width, tile_height)
+    if not arrays:
+        raise FileNotFoundError(f"No image HDU in {filepath.name}")
+    tiles = [(str(hdu_index), array) for hdu_index, array in sorted(arrays.items())]
+    return encode_image(_tile_grid(tiles, len(tiles), tile_width, tile_height), fmt, quality)
+
+
+def _sps_camera_files(
+    visit: M.PfsVisit, type: FitsType, settings=None
+) -> dict[int, tuple[Path, os.stat_result]]:
+    """Visitの存在するSPS FITSファイルをカメラごとに取得
+
+    Returns:
+        カメラID（1-16） -> (ファイルパス, stat情報)
+    """
+    if settings is None:
+        settings = get_settings()
+
+    index = _FileIndex()
+    postisrccd_paths = {}
+    if type == FitsType.postISRCCD:
+        try:
+            postisrccd_paths = get_postisrccd_uri_cache().get_visit_paths(visit.pfs_visit_id)
+        except FileNotFoundError:
+            pass
+
+    files: dict[int, tuple[Path, os.stat_result]] = {}
+    for camera_id in range(1, 17):
+        match type:
+            case FitsType.raw:
+                candidates = [_sps_fits_path(visit, camera_id, settings)]
+            case FitsType.calexp:
+                candidates = _calexp_fits_candidates(visit, camera_id, settings)
+            case FitsType.postISRCCD:
+                sm = (camera_id - 1) // 4 + 1
+                arm = "brnm"[(camera_id - 1) % 4]
+                path = postisrccd_paths.get((arm, sm))
+                candidates = [path] if path else []
+        for path in candidates:
+            st = index.stat(path)
+            if st is not None:
+                files[camera_id] = (path, st)
+                break
+    return files
+
+
+def _preview_key(
+    filepath: Path,
+    st: os.stat_result,
+    width: int,
+    height: int,
+    hdu_index: int,
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> str:
+    """プレビュー画像のキャッシュキー
+
+    ファイルの同一性（パス、更新日時、サイズ）を含むため、
+    DBを参照せずファイルだけから計算できます（事前生成でも使用）。
+    """
+    return FileCache.make_key(
+        "preview", str(filepath), st.st_mtime_ns, st.st_size, width, height, hdu_index, fmt.value, quality
+    )
+
+
+def _cache_preview(
+    filepath: Path,
+    width: int,
+    height: int,
+    hdu_index: int = 1,
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> tuple[bytes, str, Optional[float]]:
+    """プレビュー画像をディスクキャッシュから取得し、なければ生成して保存
+
+    プロセスプールからも呼び出されるため、モジュールレベルの関数にしています。
+
+    Returns:
+        (画像, キャッシュキー, エンコード時間（キャッシュにあった場合はNone）)
+    """
+    st = filepath.stat()
+    key = _preview_key(filepath, st, width, height, hdu_index, fmt, quality)
+    cache = get_preview_cache()
+    content = cache.get(key)
+    if content is not None:
+        return content, key, None
+    encoded = _fits2image(filepath, width, height, hdu_index, fmt, quality)
+    cache.put(key, encoded.content)
+    return encoded.content, key, encoded.encode_seconds
+
+
+async def _preview_response(
+    filepath: Path,
+    width: int,
+    height: int,
+    output: OutputFormat,
+    kind: str,
+    hdu_index: int = 1,
+) -> Response:
+    """プレビュー画像のレスポンスを返す（キャッシュになければプロセスプールで生成）"""
+    st = await run_in_threadpool(filepath.stat)
+    key = _preview_key(filepath, st, width, height, hdu_index, output.format, output.quality)
+    content = await run_in_threadpool(get_preview_cache().get, key)
+    if content is None:
+        loop = asyncio.get_running_loop()
+        content, key, encode_seconds = await loop.run_in_executor(
+            get_render_executor(),
+            _cache_preview,
+            filepath,
+            width,
+            height,
+            hdu_index,
+            output.format,
+            output.quality,
+        )
+        if encode_seconds is not None:
+            record_encoding(EncodedImage(content, output.format, encode_seconds), kind)
+    return _cached_response(content, output.format.media_type, etag=key, headers=output.headers)
+
+
+# 生成中の処理（同じファイルへの同時リクエストで共有する）
+_inflight: dict[tuple, "asyncio.Task[Any]"] = {}
+
+
+async def _shared(key: tuple, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """同じキーの処理が実行中であればその結果を待ち、なければ実行する
+
+    フロントエンドは同じAGCファイルの全カメラを同時に要求するため、
+    それぞれのリクエストが同じファイルを処理しないようにします。
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _agc_preview_response(
+    filepath: Path, hdu_index: int, width: int, height: int, output: OutputFormat
+) -> Response:
+    """AGCのプレビュー画像のレスポンスを返す
+
+    キャッシュになければファイルの全カメラ分をまとめて生成してキャッシュするため、
+    残りのカメラへのリクエストはキャッシュから返せます。
+    """
+    st = await run_in_threadpool(filepath.stat)
+    key = _preview_key(filepath, st, width, height, hdu_index, output.format, output.quality)
+    content = await run_in_threadpool(get_preview_cache().get, key)
+    if content is None:
+
+        async def render() -> dict[int, tuple[bytes, str, Optional[float]]]:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                get_render_executor(),
+                _cache_agc_previews,
+                filepath,
+                width,
+                height,
+                output.format,
+                output.quality,
+            )
+            for hdu_content, _, encode_seconds in results.values():
+                if encode_seconds is not None:
+                    record_encoding(EncodedImage(hdu_content, output.format, encode_seconds), "agc")
+            return results
+
+        results = await _shared(
+            ("agc", str(filepath), st.st_mtime_ns, width, height, output.format, output.quality),
+            render,
+        )
+        if hdu_index not in results:
+            raise FileNotFoundError(f"No image HDU {hdu_index} in {filepath.name}")
+        content, key, _ = results[hdu_index]
+    return _cached_response(content, output.format.media_type, etag=key, headers=output.headers)
+
+
+def _cached_response(
+    content: bytes,
+    media_type: str,
+    etag: Optional[str] = None,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
     """キャッシュヘッダー付きレスポンスを返す"""
+    headers = {"cache-control": CACHE_CONTROL_HEADER, **(headers or {})}
+    if etag is not None:
+        headers["etag"] = f'"{etag}"'
     return Response(
         content=content,
         media_type=media_type,
-        headers={"cache-control": CACHE_CONTROL_HEADER},
+        headers=headers,
     )
 
 
@@ -427,19 +1045,108 @@ async def download_sps_fits(
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
-        return FileResponse(filepath, filename=filepath.name, media_type="image/fits")
+        return ConditionalFileResponse(filepath, filename=filepath.name, media_type="image/fits")
     except FileNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
+@router.get(
+    "/visits/{visit_id}/sps.png",
+    summary="Get SPS contact sheet image",
+    description="Get a single image showing previews of all available SPS cameras of a visit in a grid (rows: spectrograph 1-4, columns: arm b, r, n, m). The format is PNG unless requested with `format=` or negotiated from the Accept header.",
+)
+async def get_sps_fits_mosaic(
+    visit_id: int,
+    output: ImageOutput,
+    width: int = Query(default=256, le=1024, description="Width of each camera tile"),
+    height: int = Query(default=256, le=1024, description="Height of each camera tile"),
+    type: FitsType = FitsType.raw,
+    db: AsyncSession = Depends(get_db),
+):
+    """Visitの全SPSカメラのプレビューを1枚の画像で取得
+
+    各カメラの画像はプロセスプールで並列に生成し、
+    結果はディスクキャッシュに保存します。
+    一部のカメラの生成に失敗した場合は no-store で返し、全て失敗した場合は500を返します。
+    """
+    result = await db.execute(
+        select(M.PfsVisit).where(M.PfsVisit.pfs_visit_id == visit_id)
+    )
+    visit = result.scalar_one_or_none()
+
+    if visit is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Visit {visit_id} not found"
+        )
+
+    settings = get_settings()
+    files = await run_in_threadpool(_sps_camera_files, visit, type, settings)
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {type.value} files for visit {visit_id}",
+        )
+
+    # ファイルの同一性（パス、更新日時、サイズ）をキーに含める
+    cache = get_preview_cache()
+    key = FileCache.make_key(
+        "sps-mosaic",
+        type.value,
+        width,
+        height,
+        output.format.value,
+        output.quality,
+        sorted((camera_id, str(path), st.st_mtime_ns, st.st_size) for camera_id, (path, st) in files.items()),
+    )
+    content = await run_in_threadpool(cache.get, key)
+    if content is None:
+        loop = asyncio.get_running_loop()
+        executor = get_render_executor()
+        camera_ids = sorted(files)
+        arrays = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, _fits2array, files[camera_id][0], width, height)
+                for camera_id in camera_ids
+            ),
+            return_exceptions=True,
+        )
+        tiles: dict[int, Any] = {}
+        for camera_id, array in zip(camera_ids, arrays):
+            if isinstance(array, BaseException):
+                logger.warning(f"Error rendering camera {camera_id} of visit {visit_id}: {array}")
+                continue
+            tiles[camera_id] = array
+        if not tiles:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error generating preview image",
+            )
+        encoded = await run_in_threadpool(
+            _sps_mosaic_image, tiles, width, height, output.format, output.quality
+        )
+        record_encoding(encoded, "sps_mosaic")
+        content = encoded.content
+        if len(tiles) < len(camera_ids):
+            # 一部のカメラが欠けた画像はキャッシュせず、次のリクエストで再生成する
+            return Response(
+                content=content,
+                media_type=output.format.media_type,
+                headers={"cache-control": "no-store", **output.headers},
+            )
+        await run_in_threadpool(cache.put, key, content)
+
+    return _cached_response(content, output.format.media_type, etag=key, headers=output.headers)
+
+
 @router.get(
     "/visits/{visit_id}/sps/{camera_id}.png",
     summary="Get SPS FITS preview image",
-    description="Get a PNG preview image of an SPS FITS file.",
+    description="Get a preview image of an SPS FITS file. The format is PNG unless requested with `format=` or negotiated from the Accept header.",
 )
 async def get_sps_fits_preview(
     visit_id: int,
     camera_id: int,
+    output: ImageOutput,
     width: int = Query(default=1024, le=4096),
     height: int = Query(default=1024, le=4096),
     type: FitsType = FitsType.raw,
@@ -469,8 +1176,7 @@ async def get_sps_fits_preview(
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
-        png = _fits2png(filepath, max_width=width, max_height=height)
-        return _cached_response(png, "image/png")
+        return await _preview_response(filepath, width, height, output, "sps")
     except FileNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -555,7 +1261,7 @@ async def download_mcs_fits(
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
-        return FileResponse(filepath, filename=filepath.name, media_type="image/fits")
+        return ConditionalFileResponse(filepath, filename=filepath.name, media_type="image/fits")
     except FileNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
@@ -563,11 +1269,12 @@ async def download_mcs_fits(
 @router.get(
     "/visits/{visit_id}/mcs/{frame_id}.png",
     summary="Get MCS FITS preview image",
-    description="Get a PNG preview image of an MCS FITS file.",
+    description="Get a preview image of an MCS FITS file. The format is PNG unless requested with `format=` or negotiated from the Accept header.",
 )
 async def get_mcs_fits_preview(
     visit_id: int,
     frame_id: int,
+    output: ImageOutput,
     width: int = Query(default=1024, le=4096),
     height: int = Query(default=1024, le=4096),
     db: AsyncSession = Depends(get_db),
@@ -590,8 +1297,7 @@ async def get_mcs_fits_preview(
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
-        png = _fits2png(filepath, max_width=width, max_height=height)
-        return _cached_response(png, "image/png")
+        return await _preview_response(filepath, width, height, output, "mcs")
     except FileNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -670,7 +1376,7 @@ async def download_agc_fits(
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
-        return FileResponse(filepath, filename=filepath.name, media_type="image/fits")
+        return ConditionalFileResponse(filepath, filename=filepath.name, media_type="image/fits")
     except (FileNotFoundError, AgcFitsNotAccessible) as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
@@ -678,12 +1384,13 @@ async def download_agc_fits(
 @router.get(
     "/visits/{visit_id}/agc/{exposure_id}-{hdu_index}.png",
     summary="Get AGC FITS preview image",
-    description="Get a PNG preview image of a specific HDU in an AGC FITS file.",
+    description="Get a preview image of a specific HDU in an AGC FITS file. The format is PNG unless requested with `format=` or negotiated from the Accept header.",
 )
 async def get_agc_fits_preview(
     visit_id: int,
     exposure_id: int,
     hdu_index: int,
+    output: ImageOutput,
     width: int = Query(default=512, le=4096),
     height: int = Query(default=512, le=4096),
     db: AsyncSession = Depends(get_db),
@@ -707,8 +1414,7 @@ async def get_agc_fits_preview(
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
-        png = _fits2png(filepath, max_width=width, max_height=height, hdu_index=hdu_index)
-        return _cached_response(png, "image/png")
+        return await _agc_preview_response(filepath, hdu_index, width, height, output)
     except (FileNotFoundError, AgcFitsNotAccessible) as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -717,3 +1423,493 @@ async def get_agc_fits_preview(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error generating preview image",
         )
+
+
+# /{exposure_id}-{hdu_index}.png にも一致するため、その後に登録する
+@router.get(
+    "/visits/{visit_id}/agc/{exposure_id}.png",
+    summary="Get AGC strip image",
+    description="Get a single image with all guide cameras (image HDUs) of an AGC exposure side by side. The format is PNG unless requested with `format=` or negotiated from the Accept header.",
+)
+async def get_agc_fits_strip(
+    visit_id: int,
+    exposure_id: int,
+    output: ImageOutput,
+    width: int = Query(default=256, le=1024, description="Width of each camera tile"),
+    height: int = Query(default=256, le=1024, description="Height of each camera tile"),
+    db: AsyncSession = Depends(get_db),
+):
+    """AGC露出の全カメラを横一列に並べた画像を取得
+
+    ファイルは1回だけ開いて全HDUを処理し、結果はディスクキャッシュに保存します。
+    """
+    result = await db.execute(
+        select(M.AgcExposure).where(M.AgcExposure.agc_exposure_id == exposure_id)
+    )
+    agc_exposure = result.scalar_one_or_none()
+
+    if agc_exposure is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"AGC exposure {exposure_id} not found",
+        )
+
+    try:
+        settings = get_settings()
+        filepath = _agc_fits_path(agc_exposure, settings)
+        st = await run_in_threadpool(filepath.stat)
+
+        cache = get_preview_cache()
+        key = FileCache.make_key(
+            "agc-strip",
+            str(filepath),
+            st.st_mtime_ns,
+            st.st_size,
+            width,
+            height,
+            output.format.value,
+            output.quality,
+        )
+        content = await run_in_threadpool(cache.get, key)
+        if content is None:
+            loop = asyncio.get_running_loop()
+            encoded = await loop.run_in_executor(
+                get_render_executor(),
+                _agc_strip_image,
+                filepath,
+                width,
+                height,
+                output.format,
+                output.quality,
+            )
+            record_encoding(encoded, "agc_strip")
+            content = encoded.content
+            await run_in_threadpool(cache.put, key, content)
+
+        return _cached_response(content, output.format.media_type, etag=key, headers=output.headers)
+    except (FileNotFoundError, AgcFitsNotAccessible) as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Error generating AGC strip image: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error generating preview image",
+        )
+
+
+# ============================================================
+# Pixel Analysis Endpoints
+# ============================================================
+#
+# ファイル全体をダウンロードせずに、切り出しやピクセル統計でクイックルックできるようにする
+
+
+async def _sps_file(
+    visit_id: int,
+    camera_id: int,
+    type: FitsType = FitsType.raw,
+    db: AsyncSession = Depends(get_db),
+) -> Path:
+    """SPS FITSファイルのパスを取得（DI用）"""
+    result = await db.execute(
+        select(M.PfsVisit).where(M.PfsVisit.pfs_visit_id == visit_id)
+    )
+    visit = result.scalar_one_or_none()
+
+    if visit is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Visit {visit_id} not found"
+        )
+
+    try:
+        settings = get_settings()
+        match type:
+            case FitsType.raw:
+                filepath = _sps_fits_path(visit, camera_id, settings)
+            case FitsType.calexp:
+                filepath = _calexp_fits_path(visit, camera_id, settings)
+            case FitsType.postISRCCD:
+                filepath = _postISRCCD_fits_path(visit, camera_id)
+
+        if not filepath.exists():
+            raise FileNotFoundError(f"File not found: {filepath}")
+        return filepath
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+async def _mcs_file(
+    visit_id: int,
+    frame_id: int,
+    db: AsyncSession = Depends(get_db),
+) -> Path:
+    """MCS FITSファイルのパスを取得（DI用）"""
+    result = await db.execute(
+        select(M.PfsVisit).where(M.PfsVisit.pfs_visit_id == visit_id)
+    )
+    visit = result.scalar_one_or_none()
+
+    if visit is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Visit {visit_id} not found"
+        )
+
+    try:
+        filepath = _mcs_fits_path(visit, frame_id, get_settings())
+
+        if not filepath.exists():
+            raise FileNotFoundError(f"File not found: {filepath}")
+        return filepath
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+async def _agc_file(
+    visit_id: int,
+    exposure_id: int,
+    db: AsyncSession = Depends(get_db),
+) -> Path:
+    """AGC FITSファイルのパスを取得（DI用）"""
+    result = await db.execute(
+        select(M.AgcExposure).where(M.AgcExposure.agc_exposure_id == exposure_id)
+    )
+    agc_exposure = result.scalar_one_or_none()
+
+    if agc_exposure is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"AGC exposure {exposure_id} not found",
+        )
+
+    try:
+        filepath = _agc_fits_path(agc_exposure, get_settings())
+
+        if not filepath.exists():
+            raise FileNotFoundError(f"File not found: {filepath}")
+        return filepath
+    except (FileNotFoundError, AgcFitsNotAccessible) as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@dataclass
+class PixelRegionQuery:
+    """切り出し・統計の対象（HDUと矩形領域）"""
+
+    hdu_index: int
+    x: int
+    y: int
+    width: Optional[int]
+    height: Optional[int]
+
+
+def _pixel_region(
+    hdu_index: int = Query(default=1, ge=0, description="HDU index"),
+    x: int = Query(default=0, ge=0, description="Left edge of the region (0-based pixel)"),
+    y: int = Query(default=0, ge=0, description="Bottom edge of the region (0-based pixel)"),
+    width: Optional[int] = Query(default=None, ge=1, description="Width of the region (to the image edge if omitted)"),
+    height: Optional[int] = Query(default=None, ge=1, description="Height of the region (to the image edge if omitted)"),
+) -> PixelRegionQuery:
+    """クエリパラメータから対象の領域を取得（DI用）"""
+    return PixelRegionQuery(hdu_index, x, y, width, height)
+
+
+# 依存性注入用の型エイリアス
+PixelRegion = Annotated[PixelRegionQuery, Depends(_pixel_region)]
+
+
+async def _cutout_response(
+    filepath: Path, query: PixelRegionQuery, format: CutoutFormat
+) -> Response:
+    """切り出した領域のレスポンスを返す"""
+
+    def cutout() -> tuple[bytes, fits_analysis.Region]:
+        data, region, header = fits_analysis.read_region(
+            filepath, query.hdu_index, query.x, query.y, query.width, query.height
+        )
+        match format:
+            case CutoutFormat.fits:
+                return fits_analysis.cutout_fits(data, region, header), region
+            case CutoutFormat.npy:
+                return fits_analysis.cutout_npy(data), region
+
+    try:
+        content, region = await run_in_threadpool(cutout)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    filename = (
+        f"{filepath.stem}-{query.hdu_index}-{region.x}_{region.y}_{region.width}x{region.height}"
+        f".{format.value}"
+    )
+    media_type = "image/fits" if format == CutoutFormat.fits else "application/octet-stream"
+    return _cached_response(
+        content,
+        media_type,
+        headers={"content-disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def _stats_response(
+    filepath: Path,
+    query: PixelRegionQuery,
+    mode: StatsMode,
+    bins: int,
+    range_min: Optional[float],
+    range_max: Optional[float],
+) -> FitsStats:
+    """領域のピクセル統計を計算"""
+
+    def compute() -> FitsStats:
+        data, region, _ = fits_analysis.read_region(
+            filepath,
+            query.hdu_index,
+            query.x,
+            query.y,
+            query.width,
+            query.height,
+            max_pixels=fits_analysis.MAX_STATS_PIXELS,
+        )
+        stats = FitsStats(
+            hdu_index=query.hdu_index,
+            x=region.x,
+            y=region.y,
+            width=region.width,
+            height=region.height,
+        )
+        match mode:
+            case StatsMode.region:
+                stats.region = PixelStats(**fits_analysis.region_stats(data))
+            case StatsMode.rows:
+                stats.rows = ProfileStats(**fits_analysis.profile_stats(data, axis=1))
+            case StatsMode.columns:
+                stats.columns = ProfileStats(**fits_analysis.profile_stats(data, axis=0))
+            case StatsMode.histogram:
+                stats.histogram = PixelHistogram(
+                    **fits_analysis.histogram(data, bins, range_min, range_max)
+                )
+        return stats
+
+    try:
+        return await run_in_threadpool(compute)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+_CUTOUT_DESCRIPTION = (
+    "Get a rectangular region of a FITS image as a FITS file (header of the HDU with CRPIXn "
+    "shifted and LTV1/LTV2 set) or as NumPy .npy bytes. At most "
+    f"{fits_analysis.MAX_CUTOUT_PIXELS} pixels."
+)
+_STATS_DESCRIPTION = (
+    "Compute pixel statistics of a rectangular region of a FITS image without downloading it. "
+    "`mode` selects statistics of the whole region, per row, per column, or a histogram. "
+    "NaN and Inf are excluded."
+)
+
+
+@router.get(
+    "/visits/{visit_id}/sps/{camera_id}/cutout",
+    summary="Get SPS FITS cutout",
+    description=_CUTOUT_DESCRIPTION,
+)
+async def get_sps_fits_cutout(
+    filepath: Annotated[Path, Depends(_sps_file)],
+    region: PixelRegion,
+    format: CutoutFormat = CutoutFormat.fits,
+):
+    """SPS FITSファイルの矩形領域を切り出す"""
+    return await _cutout_response(filepath, region, format)
+
+
+@router.get(
+    "/visits/{visit_id}/sps/{camera_id}/stats",
+    response_model=FitsStats,
+    summary="Get SPS FITS pixel statistics",
+    description=_STATS_DESCRIPTION,
+)
+async def get_sps_fits_stats(
+    filepath: Annotated[Path, Depends(_sps_file)],
+    region: PixelRegion,
+    mode: StatsMode = StatsMode.region,
+    bins: int = Query(default=100, ge=1, le=10000, description="Number of histogram bins"),
+    range_min: Optional[float] = Query(default=None, description="Lower edge of the histogram"),
+    range_max: Optional[float] = Query(default=None, description="Upper edge of the histogram"),
+):
+    """SPS FITSファイルの領域のピクセル統計を取得"""
+    return await _stats_response(filepath, region, mode, bins, range_min, range_max)
+
+
+@router.get(
+    "/visits/{visit_id}/mcs/{frame_id}/cutout",
+    summary="Get MCS FITS cutout",
+    description=_CUTOUT_DESCRIPTION,
+)
+async def get_mcs_fits_cutout(
+    filepath: Annotated[Path, Depends(_mcs_file)],
+    region: PixelRegion,
+    format: CutoutFormat = CutoutFormat.fits,
+):
+    """MCS FITSファイルの矩形領域を切り出す"""
+    return await _cutout_response(filepath, region, format)
+
+
+@router.get(
+    "/visits/{visit_id}/mcs/{frame_id}/stats",
+    response_model=FitsStats,
+    summary="Get MCS FITS pixel statistics",
+    description=_STATS_DESCRIPTION,
+)
+async def get_mcs_fits_stats(
+    filepath: Annotated[Path, Depends(_mcs_file)],
+    region: PixelRegion,
+    mode: StatsMode = StatsMode.region,
+    bins: int = Query(default=100, ge=1, le=10000, description="Number of histogram bins"),
+    range_min: Optional[float] = Query(default=None, description="Lower edge of the histogram"),
+    range_max: Optional[float] = Query(default=None, description="Upper edge of the histogram"),
+):
+    """MCS FITSファイルの領域のピクセル統計を取得"""
+    return await _stats_response(filepath, region, mode, bins, range_min, range_max)
+
+
+@router.get(
+    "/visits/{visit_id}/agc/{exposure_id}/cutout",
+    summary="Get AGC FITS cutout",
+    description=_CUTOUT_DESCRIPTION + " `hdu_index` selects the guide camera.",
+)
+async def get_agc_fits_cutout(
+    filepath: Annotated[Path, Depends(_agc_file)],
+    region: PixelRegion,
+    format: CutoutFormat = CutoutFormat.fits,
+):
+    """AGC FITSファイルの矩形領域を切り出す"""
+    return await _cutout_response(filepath, region, format)
+
+
+@router.get(
+    "/visits/{visit_id}/agc/{exposure_id}/stats",
+    response_model=FitsStats,
+    summary="Get AGC FITS pixel statistics",
+    description=_STATS_DESCRIPTION + " `hdu_index` selects the guide camera.",
+)
+async def get_agc_fits_stats(
+    filepath: Annotated[Path, Depends(_agc_file)],
+    region: PixelRegion,
+    mode: StatsMode = StatsMode.region,
+    bins: int = Query(default=100, ge=1, le=10000, description="Number of histogram bins"),
+    range_min: Optional[float] = Query(default=None, description="Lower edge of the histogram"),
+    range_max: Optional[float] = Query(default=None, description="Upper edge of the histogram"),
+):
+    """AGC FITSファイルの領域のピクセル統計を取得"""
+    return await _stats_response(filepath, region, mode, bins, range_min, range_max)
+
+
+# ============================================================
+# Visit Files Endpoint
+# ============================================================
+
+
+def _collect_visit_files(
+    visit: M.PfsVisit,
+    mcs_frame_ids: list[int],
+    agc_exposures: list[M.AgcExposure],
+) -> VisitFiles:
+    """Visitに関連する存在するFITSファイルを収集
+
+    ディレクトリ一覧をまとめて読み込むことで、
+    ファイルごとのstatを最小限に抑えます。
+    """
+    settings = get_settings()
+    index = _FileIndex()
+
+    try:
+        postisrccd_paths = get_postisrccd_uri_cache().get_visit_paths(visit.pfs_visit_id)
+    except FileNotFoundError:
+        postisrccd_paths = {}
+
+    sps: list[SpsFitsFiles] = []
+    for camera_id in range(1, 17):
+        sm = (camera_id - 1) // 4 + 1
+        arm = "brnm"[(camera_id - 1) % 4]
+        postisrccd_path = postisrccd_paths.get((arm, sm))
+        files = SpsFitsFiles(
+            camera_id=camera_id,
+            raw=index.file_info(_sps_fits_path(visit, camera_id, settings)),
+            calexp=index.first_file_info(_calexp_fits_candidates(visit, camera_id, settings)),
+            postISRCCD=index.file_info(postisrccd_path) if postisrccd_path else None,
+        )
+        if files.raw or files.calexp or files.postISRCCD:
+            sps.append(files)
+
+    mcs: list[McsFitsFile] = []
+    for frame_id in mcs_frame_ids:
+        info = index.first_file_info(_mcs_fits_candidates(visit, frame_id, settings))
+        if info is not None:
+            mcs.append(McsFitsFile(frame_id=frame_id, file=info))
+
+    agc: list[AgcFitsFile] = []
+    for agc_exposure in agc_exposures:
+        if agc_exposure.taken_at is None:
+            # 撮影日時がなければディレクトリを決められない
+            continue
+        info = index.file_info(_agc_fits_path_newer(agc_exposure, settings))
+        if info is None:
+            # 古い命名規則のファイルはFITSを開いて確認する必要がある
+            try:
+                info = index.file_info(_agc_fits_path(agc_exposure, settings))
+            except AgcFitsNotAccessible:
+                pass
+        if info is not None:
+            agc.append(AgcFitsFile(exposure_id=agc_exposure.agc_exposure_id, file=info))
+
+    return VisitFiles(visit_id=visit.pfs_visit_id, sps=sps, mcs=mcs, agc=agc)
+
+
+@visit_files_router.get(
+    "/{visit_id}/files",
+    response_model=VisitFiles,
+    summary="List FITS files of a visit",
+    description="List the raw, calexp, postISRCCD, MCS and AGC FITS files that exist for a visit, with sizes and modification times.",
+)
+async def list_visit_files(
+    visit_id: int,
+    db: AsyncSession = Depends(get_db),
+):
+    """Visitに関連する存在するFITSファイルの一覧を取得
+
+    クライアントはこの結果を使い、存在するファイルのプレビューのみを要求できます。
+    """
+    result = await db.execute(
+        select(M.PfsVisit).where(M.PfsVisit.pfs_visit_id == visit_id)
+    )
+    visit = result.scalar_one_or_none()
+
+    if visit is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Visit {visit_id} not found"
+        )
+
+    mcs_frame_ids = list(
+        (
+            await db.scalars(
+                select(M.McsExposure.mcs_frame_id)
+                .where(M.McsExposure.pfs_visit_id == visit_id)
+                .order_by(M.McsExposure.mcs_frame_id)
+            )
+        ).all()
+    )
+    agc_exposures = list(
+        (
+            await db.scalars(
+                select(M.AgcExposure)
+                .where(M.AgcExposure.pfs_visit_id == visit_id)
+                .order_by(M.AgcExposure.agc_exposure_id)
+            )
+        ).all()
+    )
+
+    # ファイルシステムへのアクセスはイベントループを塞がないようスレッドで行う
+    return await run_in_threadpool(_collect_visit_files, visit, mcs_frame_ids, agc_exposures)
@@ -5,6 +5,8 @@ from datetime import datetime, timezone
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from pfs_obslog import metrics
+
 router = APIRouter()
 
 
@@ -44,3 +46,14 @@ async def readyz() -> HealthResponse:  # pragma: no cover
         timestamp=datetime.now(timezone.utc).isoformat(),
         version="0.1.0",
     )
+
+
+@router.get("/metrics")
+async def get_metrics() -> dict:
+    """
+    メトリクスエンドポイント
+
+    画像のエンコード時間や出力サイズなどの集計値を返します。
+    値はリクエストを処理したワーカープロセスごとのものです。
+    """
+    return metrics.snapshot()
@@ -5,17 +5,22 @@ PFS Design ファイル（観測設計）の一覧表示、詳細取得、ダウ
 
 import datetime
 import math
+import os
 import re
 from logging import getLogger
 from pathlib import Path
-from typing import Any, Literal, Optional
+from typing import Any, Callable, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+import numpy as np
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
+from pfs_obslog.columnar import COLUMNS_MEDIA_TYPE, encode_columns
 from pfs_obslog.config import get_settings
-from pfs_obslog.pfs_design_cache import get_pfs_design_cache
+from pfs_obslog.filecache import FileCache, get_design_detail_cache
+from pfs_obslog.pfs_design_cache import FiberFilter, get_pfs_design_cache
 from pfs_obslog.routers.fits import FitsMeta, FitsHdu, FitsHeader, Card
 
 logger = getLogger(__name__)
@@ -102,6 +107,7 @@ class PfsDesignListResponse(BaseModel):
     total: int  # 全件数（フィルタ適用後）
     offset: int  # 現在のオフセット
     limit: int  # 取得件数
+    next_cursor: Optional[str] = None  # 次のページのカーソル（最後のページ、キャッシュ無効時はNone）
 
 
 class PfsDesignPosition(BaseModel):
@@ -112,6 +118,12 @@ class PfsDesignPosition(BaseModel):
     dec: float  # 中心赤緯
 
 
+class PfsDesignConeEntry(PfsDesignEntry):
+    """コーンサーチの結果のPFS Design エントリ"""
+
+    separation: float  # 円の中心からの角距離（度）
+
+
 class PfsDesignRankResponse(BaseModel):
     """PFS Design ランクレスポンス"""
 
@@ -245,10 +257,52 @@ def _read_design_entry(path: Path) -> PfsDesignEntry:
 # ============================================================
 
 
+# 一覧系のレスポンスの形式を変えた場合に上げる（ETagに含める）
+LIST_VERSION = 1
+
+
+def _generation_headers(generation: int) -> dict[str, str]:
+    """キャッシュの世代から作ったETagのヘッダー
+
+    一覧系のレスポンスは同じURLならキャッシュの内容だけで決まるため、
+    内容が変わるたびに進む世代をETagにします。
+    """
+    # 同期で内容が変わる可能性があるため、ブラウザには毎回ETagで確認させる
+    return {"cache-control": "no-cache", "etag": f'"pfs-designs-{LIST_VERSION}-{generation}"'}
+
+
+def _not_modified(request: Request, headers: dict[str, str]) -> bool:
+    """If-None-Match がETagに一致するか"""
+    return headers["etag"] in (request.headers.get("if-none-match") or "")
+
+
+def _fiber_filter(
+    proposal_id: Optional[str] = Query(None, description="Only designs with a fiber of this proposalId"),
+    cat_id: Optional[int] = Query(None, description="Only designs with a fiber of this catId"),
+    ob_code: Optional[str] = Query(None, description="Only designs with a fiber whose obCode starts with this"),
+    fiber_status: Optional[int] = Query(None, description="Only designs with a fiber of this fiberStatus"),
+) -> Optional[FiberFilter]:
+    """ファイバーの値による絞り込みのクエリパラメータ
+
+    キャッシュの副テーブルで検索するため、キャッシュが無効な場合は400を返します。
+    """
+    if proposal_id is None and cat_id is None and not ob_code and fiber_status is None:
+        return None
+    if not get_settings().pfs_design_cache_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="proposal_id, cat_id, ob_code and fiber_status filters require the design cache",
+        )
+    return FiberFilter(proposal_id=proposal_id, cat_id=cat_id, ob_code=ob_code, fiber_status=fiber_status)
+
+
 def _sync_cache_in_background() -> None:
-    """バックグラウンドでキャッシュを同期"""
+    """バックグラウンドでキャッシュを同期
+
+    ディレクトリの監視が有効な場合は、監視サービスが変更を反映するため何もしません。
+    """
     settings = get_settings()
-    if not settings.pfs_design_cache_enabled:
+    if not settings.pfs_design_cache_enabled or settings.pfs_design_watch_enabled:
         return
     cache = get_pfs_design_cache(settings.pfs_design_cache_db, settings.pfs_design_dir)
     cache.sync()
@@ -261,16 +315,21 @@ def _sync_cache_in_background() -> None:
     description="Get a paginated list of PFS Design files with optional filtering and sorting.",
 )
 def list_pfs_designs(
+    request: Request,
+    response: Response,
     background_tasks: BackgroundTasks,
     search: Optional[str] = Query(
-        None, description="Search string (matches name or id)"
+        None, description="Search string (substring of name, id, file name or arms)"
     ),
     sort_by: Literal["date_modified", "name", "id", "altitude"] = Query(
         "date_modified", description="Field to sort by"
     ),
     sort_order: Literal["asc", "desc"] = Query("desc", description="Sort order"),
-    offset: int = Query(0, ge=0, description="Number of items to skip"),
+    offset: int = Query(0, ge=0, description="Number of items to skip (counted from the cursor if given)"),
     limit: int = Query(50, ge=1, le=1000, description="Number of items to return"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page (same filter and sort conditions)"
+    ),
     zenith_ra: Optional[float] = Query(
         None, description="Zenith RA in degrees (required for altitude sort)"
     ),
@@ -283,13 +342,17 @@ def list_pfs_designs(
     date_to: Optional[str] = Query(
         None, description="End date filter (YYYY-MM-DD format)"
     ),
+    fibers: Optional[FiberFilter] = Depends(_fiber_filter),
 ):
     """PFS Design の一覧を取得（ページネーション対応）
 
     キャッシュが有効な場合、SQLiteキャッシュから一覧を取得し、
     バックグラウンドでキャッシュを更新します。
+    次のページは next_cursor を cursor に指定して取得できます（OFFSETより速い）。
+    キャッシュの世代をETagとして返し、変わっていなければ304を返します。
 
     altitude ソートの場合は zenith_ra, zenith_dec パラメータが必要です。
+    proposal_id, cat_id, ob_code, fiber_status はキャッシュが有効な場合のみ使えます。
     """
     # altitude ソートのバリデーション
     if sort_by == "altitude":
@@ -312,33 +375,39 @@ def list_pfs_designs(
         # バックグラウンドでキャッシュ更新
         background_tasks.add_task(_sync_cache_in_background)
 
-        # キャッシュから取得（高度ソートもキャッシュ側で処理）
-        entries, total = cache.get_entries_paginated(
-            search=search,
-            sort_by=sort_by,
-            sort_order=sort_order,
-            offset=offset,
-            limit=limit,
-            zenith_ra=zenith_ra,
-            zenith_dec=zenith_dec,
-            date_from=date_from,
-            date_to=date_to,
-        )
+        # キャッシュを読む前の世代（読んでいる間に同期が終わっても古い世代のETagになるだけ）
+        headers = _generation_headers(cache.get_generation())
+        if _not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        def get_page():
+            # キャッシュから取得（高度ソートもキャッシュ側で処理）
+            try:
+                return cache.get_page(
+                    search=search,
+                    sort_by=sort_by,
+                    sort_order=sort_order,
+                    offset=offset,
+                    limit=limit,
+                    zenith_ra=zenith_ra,
+                    zenith_dec=zenith_dec,
+                    date_from=date_from,
+                    date_to=date_to,
+                    cursor=cursor,
+                    fibers=fibers,
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        page = get_page()
 
         # キャッシュが空の場合は同期を待つ（初回のみ）
-        if total == 0 and not search and not date_from and not date_to:
+        if page.total == 0 and not search and not date_from and not date_to and fibers is None:
             cache.sync()
-            entries, total = cache.get_entries_paginated(
-                search=search,
-                sort_by=sort_by,
-                sort_order=sort_order,
-                offset=offset,
-                limit=limit,
-                zenith_ra=zenith_ra,
-                zenith_dec=zenith_dec,
-                date_from=date_from,
-                date_to=date_to,
-            )
+            headers = _generation_headers(cache.get_generation())
+            page = get_page()
+
+        response.headers.update(headers)
 
         items = [
             PfsDesignEntry(
@@ -354,11 +423,11 @@ def list_pfs_designs(
                 num_guidestar_rows=e["num_guidestar_rows"],
                 design_rows=DesignRows(**e["design_rows"]),
             )
-            for e in entries
+            for e in page.entries
         ]
 
         return PfsDesignListResponse(
-            items=items, total=total, offset=offset, limit=limit
+            items=items, total=page.total, offset=offset, limit=limit, next_cursor=page.next_cursor
         )
 
     # キャッシュが無効な場合（フォールバック）
@@ -381,7 +450,7 @@ def list_pfs_designs(
         design_list = [
             d
             for d in design_list
-            if search_lower in d.name.lower() or search_lower in d.id.lower()
+            if any(search_lower in value.lower() for value in (d.name, d.id, d.frameid, d.arms))
         ]
 
     # ソート
@@ -409,12 +478,13 @@ def list_pfs_designs(
     "/positions",
     response_model=list[PfsDesignPosition],
     summary="Get PFS Design positions",
-    description="Get positions (id, ra, dec) of PFS Designs. Supports filtering by search and date range.",
+    description="Get positions (id, ra, dec) of PFS Designs. Supports filtering by search, date range and fiber values (proposalId, catId, obCode, fiberStatus).",
 )
 def list_design_positions(
+    request: Request,
     background_tasks: BackgroundTasks,
     search: Optional[str] = Query(
-        None, description="Search string (matches name or id)"
+        None, description="Search string (substring of name, id, file name or arms)"
     ),
     date_from: Optional[str] = Query(
         None, description="Start date filter (YYYY-MM-DD format)"
@@ -422,11 +492,13 @@ def list_design_positions(
     date_to: Optional[str] = Query(
         None, description="End date filter (YYYY-MM-DD format)"
     ),
+    fibers: Optional[FiberFilter] = Depends(_fiber_filter),
 ):
     """Designの位置情報を取得
 
     天球ビュー（SkyViewer）でのDesign表示に使用します。
     検索条件・日付フィルターでフィルタリング可能です。
+    キャッシュの世代をETagとして返し、変わっていなければ304を返します。
     """
     settings = get_settings()
     design_dir = settings.pfs_design_dir
@@ -441,25 +513,29 @@ def list_design_positions(
         # バックグラウンドでキャッシュ更新
         background_tasks.add_task(_sync_cache_in_background)
 
-        # フィルター条件がある場合はフィルター付きで取得
-        if search or date_from or date_to:
-            positions = cache.get_positions_filtered(
-                search=search,
-                date_from=date_from,
-                date_to=date_to,
-            )
-        else:
-            # キャッシュから取得
-            positions = cache.get_all_positions()
+        headers = _generation_headers(cache.get_generation())
+        if _not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-            # キャッシュが空の場合は同期を待つ（初回のみ）
-            if not positions:
-                cache.sync()
-                positions = cache.get_all_positions()
+        # メモリ上の列から取得
+        ids, ras, decs = cache.get_position_arrays(
+            search=search, date_from=date_from, date_to=date_to, fibers=fibers
+        )
 
-        return [
-            PfsDesignPosition(id=p["id"], ra=p["ra"], dec=p["dec"]) for p in positions
-        ]
+        # キャッシュが空の場合は同期を待つ（初回のみ）
+        if not ids.size and not (search or date_from or date_to or fibers):
+            cache.sync()
+            headers = _generation_headers(cache.get_generation())
+            ids, ras, decs = cache.get_position_arrays()
+
+        # 数万件になるため、要素ごとのモデルを作らずに配列から直接JSONにする
+        content = orjson.dumps(
+            [
+                {"id": design_id, "ra": ra, "dec": dec}
+                for design_id, ra, dec in zip(ids.tolist(), ras.tolist(), decs.tolist())
+            ]
+        )
+        return Response(content=content, media_type="application/json", headers=headers)
 
     # キャッシュが無効な場合（フォールバック）
     # 全ファイルを読み込み、位置情報のみ抽出
@@ -488,6 +564,117 @@ def list_design_positions(
     return positions
 
 
+@router.get(
+    "/cone",
+    response_model=list[PfsDesignConeEntry],
+    summary="Cone search for PFS Designs",
+    description=(
+        "Get PFS Designs whose center lies within `radius` degrees of (ra, dec), nearest first. "
+        "Supports filtering by search, date range and fiber values (proposalId, catId, obCode, fiberStatus)."
+    ),
+)
+def search_designs_in_cone(
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    ra: float = Query(..., description="RA of the cone center in degrees"),
+    dec: float = Query(..., ge=-90.0, le=90.0, description="Dec of the cone center in degrees"),
+    radius: float = Query(..., gt=0.0, le=180.0, description="Cone radius in degrees"),
+    search: Optional[str] = Query(
+        None, description="Search string (substring of name, id, file name or arms)"
+    ),
+    date_from: Optional[str] = Query(
+        None, description="Start date filter (YYYY-MM-DD format)"
+    ),
+    date_to: Optional[str] = Query(
+        None, description="End date filter (YYYY-MM-DD format)"
+    ),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of items to return"),
+    fibers: Optional[FiberFilter] = Depends(_fiber_filter),
+):
+    """指定した円（コーン）の中にあるDesignを近い順に取得
+
+    キャッシュの空間インデックスを使います。
+    キャッシュが無効な場合は全ファイルを読み込んで絞り込みます。
+    """
+    settings = get_settings()
+    design_dir = settings.pfs_design_dir
+
+    if not design_dir.exists():
+        return []
+
+    # キャッシュが有効な場合
+    if settings.pfs_design_cache_enabled:
+        cache = get_pfs_design_cache(settings.pfs_design_cache_db, design_dir)
+
+        # バックグラウンドでキャッシュ更新
+        background_tasks.add_task(_sync_cache_in_background)
+
+        headers = _generation_headers(cache.get_generation())
+        if _not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+        entries = cache.get_entries_in_cone(
+            ra=ra,
+            dec=dec,
+            radius=radius,
+            search=search,
+            date_from=date_from,
+            date_to=date_to,
+            limit=limit,
+            fibers=fibers,
+        )
+        return [
+            PfsDesignConeEntry(
+                id=e["id"],
+                frameid=e["frameid"],
+                name=e["name"],
+                date_modified=e["date_modified"],
+                ra=e["ra"],
+                dec=e["dec"],
+                arms=e["arms"],
+                num_design_rows=e["num_design_rows"],
+                num_photometry_rows=e["num_photometry_rows"],
+                num_guidestar_rows=e["num_guidestar_rows"],
+                design_rows=DesignRows(**e["design_rows"]),
+                separation=e["separation"],
+            )
+            for e in entries
+        ]
+
+    # キャッシュが無効な場合（フォールバック）
+    # 全件取得してメモリでフィルタリング
+    pattern = re.compile(r"^pfsDesign-0x[0-9a-fA-F]{16}\.fits$")
+    matches: list[PfsDesignConeEntry] = []
+    cos_radius = math.cos(_deg2rad(radius))
+
+    for path in design_dir.glob("pfsDesign-0x*.fits"):
+        if not pattern.match(path.name):
+            continue
+        try:
+            entry = _read_design_entry(path)
+        except Exception as e:
+            logger.warning(f"Failed to read design file {path}: {e}")
+            continue
+        cos_separation = _calculate_altitude(entry.ra, entry.dec, ra, dec)
+        if cos_separation < cos_radius:
+            continue
+        if search and not any(
+            search.lower() in value.lower() for value in (entry.name, entry.id, entry.frameid, entry.arms)
+        ):
+            continue
+        # 日付はキャッシュと同じくUTCの日付で比べる
+        date = datetime.datetime.fromtimestamp(path.stat().st_mtime, datetime.timezone.utc).date().isoformat()
+        if (date_from and date < date_from) or (date_to and date > date_to):
+            continue
+        separation = math.degrees(math.acos(max(-1.0, min(1.0, cos_separation))))
+        matches.append(PfsDesignConeEntry(**entry.model_dump(), separation=separation))
+
+    matches.sort(key=lambda e: e.separation)
+    return matches[:limit]
+
+
 @router.get(
     "/rank/{design_id}",
     response_model=PfsDesignRankResponse,
@@ -496,9 +683,11 @@ def list_design_positions(
 )
 def get_design_rank(
     design_id: str,
+    request: Request,
+    response: Response,
     background_tasks: BackgroundTasks,
     search: Optional[str] = Query(
-        None, description="Search string (matches name or id)"
+        None, description="Search string (substring of name, id, file name or arms)"
     ),
     sort_by: Literal["date_modified", "name", "id", "altitude"] = Query(
         "date_modified", description="Field to sort by"
@@ -516,6 +705,7 @@ def get_design_rank(
     date_to: Optional[str] = Query(
         None, description="End date filter (YYYY-MM-DD format)"
     ),
+    fibers: Optional[FiberFilter] = Depends(_fiber_filter),
 ):
     """指定したDesign IDの順位を取得
 
@@ -548,6 +738,11 @@ def get_design_rank(
         # バックグラウンドでキャッシュ更新
         background_tasks.add_task(_sync_cache_in_background)
 
+        headers = _generation_headers(cache.get_generation())
+        if _not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
         rank = cache.get_design_rank(
             design_id=design_id.lower(),
             search=search,
@@ -557,6 +752,7 @@ def get_design_rank(
             zenith_dec=zenith_dec,
             date_from=date_from,
             date_to=date_to,
+            fibers=fibers,
         )
 
         return PfsDesignRankResponse(rank=rank)
@@ -590,14 +786,175 @@ def download_design(id_hex: str):
     return FileResponse(str(filepath), media_type="image/fits", filename=filepath.name)
 
 
-@router.get(
-    "/{id_hex}",
-    response_model=PfsDesignDetail,
-    summary="Get PFS Design details",
-    description="Get detailed information about a specific PFS Design.",
-)
-def get_design(id_hex: str):
-    """PFS Design の詳細を取得"""
+# 詳細の形式を変えた場合に上げる（キャッシュキーとETagに含める）
+DETAIL_VERSION = 1
+
+# 型付き配列で返すファイバーの数値の列 -> 列がない場合の型
+_FIBER_NUMERIC_COLUMNS: dict[str, type] = {
+    "fiberId": np.int32,
+    "ra": np.float64,
+    "dec": np.float64,
+    "tract": np.int32,
+    "catId": np.int32,
+    "objId": np.int64,
+    "targetType": np.int32,
+    "pmRa": np.float32,
+    "pmDec": np.float32,
+    "parallax": np.float32,
+    "fiberStatus": np.int32,
+}
+# 値の一覧と各ファイバーの値の番号（int32）にして返す文字列の列 -> 列がない場合の値
+_FIBER_STRING_COLUMNS: dict[str, str] = {
+    "patch": "",
+    "epoch": "J2000.0",
+    "proposalId": "",
+    "obCode": "",
+}
+
+
+def _read_design_detail(filepath: Path, mtime: float) -> PfsDesignDetail:
+    """Designファイルから詳細を読み取る"""
+    import astropy.io.fits as afits
+
+    with afits.open(filepath) as hdul:
+        meta = _fits_meta_from_hdul(filepath.name, hdul)
+
+        # HDU 1 のカラム名を取得
+        hdu1_columns = hdul[1].columns.names  # type: ignore[union-attr]
+        
+        # ヘルパー関数: カラムが存在する場合のみ取得
+        def get_field(col_name: str, default_value: Any = None) -> Any:
+            if col_name in hdu1_columns:
+                return hdul[1].data.field(col_name)  # type: ignore[union-attr]
+            else:
+                # デフォルト値を返す（配列の長さは fiberId に合わせる）
+                length = len(hdul[1].data.field("fiberId"))  # type: ignore[union-attr]
+                if default_value is None:
+                    # 型に応じたデフォルト値
+                    if col_name in ["tract", "catId", "targetType", "fiberStatus"]:
+                        return [0] * length
+                    elif col_name in ["ra", "dec", "pmRa", "pmDec", "parallax"]:
+                        return [0.0] * length
+                    elif col_name in ["patch", "objId", "epoch", "proposalId", "obCode"]:
+                        return [""] * length
+                    elif col_name == "pfiNominal":
+                        return [[0.0, 0.0]] * length
+                return [default_value] * length
+
+        # ヘルパー関数: get_field() の結果を list に変換
+        # （カラムが存在する場合は numpy array、存在しない場合は Python list が返される）
+        def to_list(field_data: Any) -> list:
+            if hasattr(field_data, "tolist"):
+                return field_data.tolist()
+            return list(field_data)
+
+        # objId は大きな整数なので文字列に変換
+        objId_data = get_field("objId")
+        objId_str_list = [str(x) for x in objId_data]
+
+        # epoch も文字列に変換
+        epoch_data = get_field("epoch", "J2000.0")
+        epoch_str_list = [str(x) for x in epoch_data]
+
+        design_data = DesignData(
+            fiberId=hdul[1].data.field("fiberId").tolist(),  # type: ignore[union-attr]
+            ra=to_list(get_field("ra")),
+            dec=to_list(get_field("dec")),
+            tract=to_list(get_field("tract")),
+            patch=to_list(get_field("patch")),
+            catId=to_list(get_field("catId")),
+            objId=objId_str_list,
+            targetType=to_list(get_field("targetType")),
+            epoch=epoch_str_list,
+            pmRa=to_list(get_field("pmRa")),
+            pmDec=to_list(get_field("pmDec")),
+            parallax=to_list(get_field("parallax")),
+            proposalId=[str(x) for x in get_field("proposalId")],
+            obCode=to_list(get_field("obCode")),
+            pfiNominal=to_list(get_field("pfiNominal")),
+            fiberStatus=to_list(get_field("fiberStatus")),
+        )
+
+        # HDU 3: Guidestar Data
+        guidestar_data = GuidestarData(
+            ra=hdul[3].data.field("ra").tolist(),  # type: ignore[union-attr]
+            dec=hdul[3].data.field("dec").tolist(),  # type: ignore[union-attr]
+        )
+
+        return PfsDesignDetail(
+            fits_meta=meta,
+            date_modified=datetime.datetime.fromtimestamp(mtime),
+            design_data=design_data,
+            guidestar_data=guidestar_data,
+        )
+
+
+def _read_fiber_columns(filepath: Path) -> bytes:
+    """Designファイルのファイバーの列を columnar.encode_columns の形式にする
+
+    FITSのバイナリテーブルの列をそのまま配列として使い、値ごとの変換はしません。
+    pfiNominal は pfiNominalX・pfiNominalY の2列に分けます。
+    文字列の列は値の一覧をヘッダーの categories に入れ、列には一覧での番号を入れます。
+    ガイド星（行数が異なる）はヘッダーの guidestars に入れます。
+    """
+    import astropy.io.fits as afits
+
+    with afits.open(filepath) as hdul:
+        data = hdul[1].data  # type: ignore[union-attr]
+        names = set(hdul[1].columns.names)  # type: ignore[union-attr]
+        length = len(data)
+
+        arrays: dict[str, np.ndarray] = {}
+        for name, dtype in _FIBER_NUMERIC_COLUMNS.items():
+            arrays[name] = np.asarray(data.field(name)) if name in names else np.zeros(length, dtype=dtype)
+        if "pfiNominal" in names:
+            pfi_nominal = np.asarray(data.field("pfiNominal"))
+        else:
+            pfi_nominal = np.zeros((length, 2), dtype=np.float32)
+        arrays["pfiNominalX"] = pfi_nominal[:, 0]
+        arrays["pfiNominalY"] = pfi_nominal[:, 1]
+
+        categories: dict[str, list[str]] = {}
+        for name, default in _FIBER_STRING_COLUMNS.items():
+            if name in names:
+                values, codes = np.unique(np.asarray(data.field(name)), return_inverse=True)
+                categories[name] = [str(value) for value in values]
+                arrays[name] = codes.reshape(-1).astype(np.int32)
+            else:
+                categories[name] = [default]
+                arrays[name] = np.zeros(length, dtype=np.int32)
+
+        guidestars = hdul[3].data  # type: ignore[union-attr]
+        meta = {
+            "categories": categories,
+            "guidestars": {
+                "ra": guidestars.field("ra").tolist(),
+                "dec": guidestars.field("dec").tolist(),
+            },
+        }
+    return encode_columns(arrays, meta)
+
+
+def _cached_design_response(
+    id_hex: str,
+    request: Request,
+    kind: str,
+    media_type: str,
+    build: Callable[[Path, os.stat_result], bytes],
+) -> Response:
+    """Designファイルから作った内容をキャッシュして返す
+
+    Designファイルは書き換えられることがほとんどないため、作った内容を
+    ファイルの (ID, 更新日時, サイズ) ごとにディスクキャッシュに保存して返します。
+    ETag にも同じキーを使い、ファイルが変わっていなければ304を返します。
+
+    Args:
+        id_hex: Design ID（16進数）
+        request: リクエスト（If-None-Match の確認用）
+        kind: 内容の種類（キャッシュキーに含める）
+        media_type: レスポンスのメディアタイプ
+        build: (ファイルパス, stat) から内容を作る関数
+    """
     if not re.match(r"^[0-9a-fA-F]{16}$", id_hex):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -607,89 +964,75 @@ def get_design(id_hex: str):
     settings = get_settings()
     filepath = settings.pfs_design_dir / f"pfsDesign-0x{id_hex}.fits"
 
-    if not filepath.exists():
+    try:
+        st = filepath.stat()
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Design file not found: {id_hex}",
         )
 
-    try:
-        import astropy.io.fits as afits
-
-        with afits.open(filepath) as hdul:
-            meta = _fits_meta_from_hdul(filepath.name, hdul)
-
-            # HDU 1 のカラム名を取得
-            hdu1_columns = hdul[1].columns.names  # type: ignore[union-attr]
-            
-            # ヘルパー関数: カラムが存在する場合のみ取得
-            def get_field(col_name: str, default_value: Any = None) -> Any:
-                if col_name in hdu1_columns:
-                    return hdul[1].data.field(col_name)  # type: ignore[union-attr]
-                else:
-                    # デフォルト値を返す（配列の長さは fiberId に合わせる）
-                    length = len(hdul[1].data.field("fiberId"))  # type: ignore[union-attr]
-                    if default_value is None:
-                        # 型に応じたデフォルト値
-                        if col_name in ["tract", "catId", "targetType", "fiberStatus"]:
-                            return [0] * length
-                        elif col_name in ["ra", "dec", "pmRa", "pmDec", "parallax"]:
-                            return [0.0] * length
-                        elif col_name in ["patch", "objId", "epoch", "proposalId", "obCode"]:
-                            return [""] * length
-                        elif col_name == "pfiNominal":
-                            return [[0.0, 0.0]] * length
-                    return [default_value] * length
-
-            # ヘルパー関数: get_field() の結果を list に変換
-            # （カラムが存在する場合は numpy array、存在しない場合は Python list が返される）
-            def to_list(field_data: Any) -> list:
-                if hasattr(field_data, "tolist"):
-                    return field_data.tolist()
-                return list(field_data)
-
-            # objId は大きな整数なので文字列に変換
-            objId_data = get_field("objId")
-            objId_str_list = [str(x) for x in objId_data]
-
-            # epoch も文字列に変換
-            epoch_data = get_field("epoch", "J2000.0")
-            epoch_str_list = [str(x) for x in epoch_data]
-
-            design_data = DesignData(
-                fiberId=hdul[1].data.field("fiberId").tolist(),  # type: ignore[union-attr]
-                ra=to_list(get_field("ra")),
-                dec=to_list(get_field("dec")),
-                tract=to_list(get_field("tract")),
-                patch=to_list(get_field("patch")),
-                catId=to_list(get_field("catId")),
-                objId=objId_str_list,
-                targetType=to_list(get_field("targetType")),
-                epoch=epoch_str_list,
-                pmRa=to_list(get_field("pmRa")),
-                pmDec=to_list(get_field("pmDec")),
-                parallax=to_list(get_field("parallax")),
-                proposalId=[str(x) for x in get_field("proposalId")],
-                obCode=to_list(get_field("obCode")),
-                pfiNominal=to_list(get_field("pfiNominal")),
-                fiberStatus=to_list(get_field("fiberStatus")),
+    key = FileCache.make_key(kind, DETAIL_VERSION, id_hex.lower(), st.st_mtime_ns, st.st_size)
+    etag = f'"{key}"'
+    # ファイルが書き換えられる可能性があるため、ブラウザには毎回ETagで確認させる
+    headers = {"cache-control": "no-cache", "etag": etag}
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+
+    cache = get_design_detail_cache()
+    content = cache.get(key)
+    if content is None:
+        try:
+            content = build(filepath, st)
+        except Exception as e:
+            logger.exception(f"Error reading design file {filepath}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error reading design file",
             )
+        cache.put(key, content)
 
-            # HDU 3: Guidestar Data
-            guidestar_data = GuidestarData(
-                ra=hdul[3].data.field("ra").tolist(),  # type: ignore[union-attr]
-                dec=hdul[3].data.field("dec").tolist(),  # type: ignore[union-attr]
-            )
+    return Response(content=content, media_type=media_type, headers=headers)
 
-            return PfsDesignDetail(
-                fits_meta=meta,
-                date_modified=datetime.datetime.fromtimestamp(filepath.stat().st_mtime),
-                design_data=design_data,
-                guidestar_data=guidestar_data,
-            )
-    except Exception as e:
-        logger.exception(f"Error reading design file {filepath}: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error reading design file",
-        )
+
+@router.get(
+    "/{id_hex}/fibers",
+    response_class=Response,
+    responses={200: {"content": {COLUMNS_MEDIA_TYPE: {}}}},
+    summary="Get PFS Design fiber data as typed arrays",
+    description="Get the design fiber columns of a PFS Design in a binary typed-array format.",
+)
+def get_design_fibers(id_hex: str, request: Request) -> Response:
+    """PFS Design のファイバーのデータを型付き配列として取得
+
+    詳細の design_data・guidestar_data と同じ内容を、JSONの代わりに
+    columnar.encode_columns の形式で返します（列の説明は _read_fiber_columns を参照）。
+    objId は int64 のまま返します。
+    """
+    return _cached_design_response(
+        id_hex,
+        request,
+        "pfs-design-fibers",
+        COLUMNS_MEDIA_TYPE,
+        lambda filepath, st: _read_fiber_columns(filepath),
+    )
+
+
+@router.get(
+    "/{id_hex}",
+    response_model=PfsDesignDetail,
+    summary="Get PFS Design details",
+    description="Get detailed information about a specific PFS Design.",
+)
+def get_design(id_hex: str, request: Request) -> Response:
+    """PFS Design の詳細を取得
+
+    シリアライズ済みのJSONをキャッシュして返します（_cached_design_response を参照）。
+    """
+    return _cached_design_response(
+        id_hex,
+        request,
+        "pfs-design",
+        "application/json",
+        lambda filepath, st: orjson.dumps(_read_design_detail(filepath, st.st_mtime).model_dump()),
+    )
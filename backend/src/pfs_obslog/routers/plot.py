@@ -1,31 +1,44 @@
 """MCSデータチャートAPI エンドポイント
 
-MCSデータの可視化APIを提供します。
+MCSデータの可視化APIを提供します（サーバーで描画した画像と、ブラウザで描画するための配列データ）。
 """
 
-import io
-from typing import Literal
+import hashlib
+from typing import Literal, Optional
 
-import matplotlib
 import numpy as np
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
-from matplotlib import pyplot as plt
 from sqlalchemy import select
 
 from pfs_obslog import models as M
+from pfs_obslog.columnar import COLUMNS_MEDIA_TYPE, encode_columns, fetch_arrays
 from pfs_obslog.database import DbSession
-
-# Aggバックエンドを使用（GUI不要）
-matplotlib.use("Agg")
+from pfs_obslog.filecache import FileCache, get_chart_cache
+from pfs_obslog.imageformat import (
+    EncodedImage,
+    ImageFormat,
+    ImageOutput,
+    encode_image,
+    record_encoding,
+)
+from pfs_obslog.scatterplot import render_color_scatter
 
 router = APIRouter(prefix="/mcs_data", tags=["plot"])
 
+# MCSデータは書き込み後に変更されないため、ブラウザに長期間キャッシュさせる
+IMMUTABLE_CACHE_CONTROL = f"max-age={365 * 24 * 3600}, immutable"
+# チャートの描画方法を変えた場合に上げる（キャッシュキーとETagに含める）
+CHART_VERSION = 1
+
 
 @router.get("/{frame_id}.png")
 async def show_mcs_data_chart(
     db: DbSession,
     frame_id: int,
+    output: ImageOutput,
+    request: Request,
     width: int = Query(default=640, le=1280, description="画像幅（px）"),
     height: int = Query(default=480, le=960, description="画像高さ（px）"),
     theme: Literal["light", "dark"] = Query(
@@ -36,6 +49,8 @@ async def show_mcs_data_chart(
 
     指定されたframe_idのMCSデータをカラー散布図として表示します。
     色はpeakvalueに基づきます。
+    MCSデータは書き込み後に変更されないため、画像はディスクキャッシュに保存し、
+    immutable なキャッシュヘッダーを付けて返します。
 
     Args:
         db: DBセッション
@@ -43,40 +58,110 @@ async def show_mcs_data_chart(
         width: 画像幅（px）
         height: 画像高さ（px）
         theme: カラーテーマ（light/dark）
+        output: 出力形式（format=, quality= または Accept ヘッダー）
+        request: リクエスト（If-None-Match の確認用）
 
     Returns:
-        PNG画像のレスポンス
+        画像のレスポンス（デフォルトはPNG）
 
     Raises:
         HTTPException: データが見つからない場合は204を返す
     """
-    # MCSデータを取得
-    result = await db.scalars(
-        select(M.McsData).where(M.McsData.mcs_frame_id == frame_id)
+    # 同じフレーム・サイズ・テーマの画像は一度だけ描画し、ワーカー間で共有する
+    key = FileCache.make_key(
+        "mcs-chart", CHART_VERSION, frame_id, width, height, theme, output.format.value, output.quality
     )
-    rows = result.all()
+    etag = f'"{key}"'
+    headers = {"cache-control": IMMUTABLE_CACHE_CONTROL, "etag": etag, **output.headers}
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+
+    cache = get_chart_cache()
+    content = await run_in_threadpool(cache.get, key)
+    if content is None:
+        # MCSデータを取得（必要な列だけを配列として取得、NULLはNaNになり描画されない）
+        arrays = await fetch_arrays(
+            db,
+            select(
+                M.McsData.mcs_center_x_pix, M.McsData.mcs_center_y_pix, M.McsData.peakvalue
+            ).where(M.McsData.mcs_frame_id == frame_id),
+        )
+        x = arrays["mcs_center_x_pix"]
+        y = arrays["mcs_center_y_pix"]
+        peakvalue = arrays["peakvalue"]
+
+        if x.size == 0:
+            raise HTTPException(status_code=204, detail="No data found")
+
+        # プロットを生成
+        encoded = await run_in_threadpool(
+            _create_color_scatter_plot,
+            x,
+            y,
+            peakvalue,
+            width,
+            height,
+            theme,
+            output.format,
+            output.quality,
+        )
+        record_encoding(encoded, "mcs_plot")
+        content = encoded.content
+        await run_in_threadpool(cache.put, key, content)
+
+    return Response(content=content, media_type=output.format.media_type, headers=headers)
+
+
+# /{frame_id}.png にも一致するため、その後に登録する
+@router.get(
+    "/{frame_id}",
+    response_class=Response,
+    responses={200: {"content": {COLUMNS_MEDIA_TYPE: {}}}},
+)
+async def get_mcs_data_arrays(
+    db: DbSession,
+    frame_id: int,
+    request: Request,
+) -> Response:
+    """MCSデータを型付き配列として取得
 
-    if not rows:
-        raise HTTPException(status_code=204, detail="No data found")
+    ブラウザ側で描画するためのデータです（ズームやテーマの変更でサーバーに再要求しなくて済む）。
+    spot_id（int32）、mcs_center_x_pix・mcs_center_y_pix・peakvalue・bgvalue（float32）の列を
+    columnar.encode_columns の形式で返します。NULLはNaNになります。
 
-    # データを配列に変換
-    xypb = np.array(
-        [
-            [
-                row.mcs_center_x_pix or 0.0,
-                row.mcs_center_y_pix or 0.0,
-                row.peakvalue or 0.0,
-                row.bgvalue or 0.0,
-            ]
-            for row in rows
-        ]
+    Args:
+        db: DBセッション
+        frame_id: MCSフレームID
+        request: リクエスト（If-None-Match の確認用）
+
+    Returns:
+        バイナリのレスポンス
+
+    Raises:
+        HTTPException: データが見つからない場合は204を返す
+    """
+    arrays = await fetch_arrays(
+        db,
+        select(
+            M.McsData.spot_id,
+            M.McsData.mcs_center_x_pix,
+            M.McsData.mcs_center_y_pix,
+            M.McsData.peakvalue,
+            M.McsData.bgvalue,
+        )
+        .where(M.McsData.mcs_frame_id == frame_id)
+        .order_by(M.McsData.spot_id),
     )
-    x, y, peakvalue, _bgvalue = xypb.T
 
-    # プロットを生成
-    png_bytes = _create_color_scatter_plot(x, y, peakvalue, width, height, theme)
+    if arrays["spot_id"].size == 0:
+        raise HTTPException(status_code=204, detail="No data found")
 
-    return Response(content=png_bytes, media_type="image/png")
+    content = encode_columns(arrays, {"frame_id": frame_id})
+    etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+    headers = {"cache-control": IMMUTABLE_CACHE_CONTROL, "etag": etag}
+    if etag in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=COLUMNS_MEDIA_TYPE, headers=headers)
 
 
 def _create_color_scatter_plot(
@@ -86,8 +171,12 @@ def _create_color_scatter_plot(
     width: int,
     height: int,
     theme: Literal["light", "dark"] = "light",
-) -> bytes:
-    """カラー散布図をPNG形式で生成
+    fmt: ImageFormat = ImageFormat.png,
+    quality: Optional[int] = None,
+) -> EncodedImage:
+    """カラー散布図の画像を生成
+
+    matplotlib は使わず、NumPy で直接ラスタライズします（scatterplot モジュール）。
 
     Args:
         x: X座標の配列
@@ -96,40 +185,11 @@ def _create_color_scatter_plot(
         width: 画像幅（px）
         height: 画像高さ（px）
         theme: カラーテーマ（light/dark）
+        fmt: 出力形式
+        quality: 品質（非可逆形式のみ）
 
     Returns:
-        PNG画像のバイト列
+        エンコード済みの画像
     """
-    DPI = 72
-
-    # ダークモード用のスタイル設定
-    if theme == "dark":
-        plt.style.use("dark_background")
-        face_color = "#1a1a1a"
-        grid_color = "#404040"
-        cmap = "plasma"
-    else:
-        plt.style.use("default")
-        face_color = "white"
-        grid_color = "#cccccc"
-        cmap = "viridis"
-
-    fig = plt.figure(dpi=DPI, figsize=(width / DPI, height / DPI))
-    fig.patch.set_facecolor(face_color)
-
-    try:
-        ax = fig.add_subplot(111)
-        ax.set_facecolor(face_color)
-        ax.set_aspect("equal")
-
-        scatter = ax.scatter(x, y, s=1, c=z, cmap=cmap)
-        ax.grid(True, color=grid_color, alpha=0.5)
-        fig.colorbar(scatter, ax=ax)
-
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", facecolor=face_color, transparent=False)
-        return buf.getvalue()
-    finally:
-        plt.close(fig)
-        # スタイルをリセット
-        plt.style.use("default")
+    image = render_color_scatter(x, y, z, width, height, theme)
+    return encode_image(image, fmt, quality)
@@ -0,0 +1,255 @@
+"""カラー散布図のラスタライザ
+
+点の座標と値を NumPy で直接ピクセルバッファに描き込みます。
+matplotlib の Figure を作らないため高速で、プロセス全体のスタイルも変更しません。
+
+- 色はカラーマップから事前に作った256色の対応表（LUT）で決める
+- 軸・目盛り・グリッド・カラーバーの枠は、サイズ・テーマ・軸範囲ごとに作った
+  テンプレート画像をキャッシュして再利用する（リクエストごとにはコピーして点を描くだけ）
+- 軸範囲は目盛りの刻みに合わせて丸めるため、同じ視野のフレーム間でテンプレートを共有できる
+"""
+
+import math
+from dataclasses import dataclass
+from functools import cache, lru_cache
+from typing import Literal
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+Theme = Literal["light", "dark"]
+
+# 点の大きさ（一辺のピクセル数）
+DOT_SIZE = 2
+# 軸範囲の余白（データ範囲に対する割合）
+MARGIN = 0.05
+FONT_SIZE = 11
+
+
+@dataclass(frozen=True)
+class _ThemeColors:
+    face: tuple[int, int, int]
+    text: tuple[int, int, int]
+    grid: tuple[int, int, int]  # 背景色と混ぜた色（半透明のグリッド線に相当）
+    cmap: str
+
+
+THEMES: dict[str, _ThemeColors] = {
+    "light": _ThemeColors((255, 255, 255), (0, 0, 0), (230, 230, 230), "viridis"),
+    "dark": _ThemeColors((26, 26, 26), (255, 255, 255), (45, 45, 45), "plasma"),
+}
+
+
+@cache
+def colormap_lut(name: str) -> np.ndarray:
+    """カラーマップの256色の対応表（uint8, shape=(256, 3)）
+
+    matplotlib からはカラーマップの定義だけを使います（pyplot はインポートしない）。
+    """
+    from matplotlib import colormaps
+
+    lut = colormaps[name](np.linspace(0.0, 1.0, 256))[:, :3]
+    lut = np.round(lut * 255).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+@cache
+def _font() -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    return ImageFont.load_default(size=FONT_SIZE)
+
+
+def nice_step(lo: float, hi: float, max_ticks: int) -> float:
+    """目盛りの刻み（1, 2, 5 × 10^n）"""
+    span = hi - lo
+    if not span > 0:
+        return 1.0
+    raw = span / max(1, max_ticks)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def ticks(lo: float, hi: float, step: float) -> list[float]:
+    """範囲内の目盛りの位置"""
+    first = math.ceil(lo / step - 1e-9)
+    last = math.floor(hi / step + 1e-9)
+    return [i * step for i in range(first, last + 1)]
+
+
+def format_tick(value: float, step: float) -> str:
+    """刻みに応じた桁数で目盛りの値を表示"""
+    decimals = max(0, -math.floor(math.log10(step))) if step < 1 else 0
+    return f"{value:.{decimals}f}"
+
+
+def _axis_limits(values: np.ndarray, max_ticks: int) -> tuple[float, float, float]:
+    """余白を付けた軸範囲
+
+    テンプレートを共有しやすいように、範囲は目盛りの刻みの1/5単位で外側に丸めます。
+
+    Returns:
+        (下限, 上限, 刻み)
+    """
+    lo, hi = float(values.min()), float(values.max())
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    pad = (hi - lo) * MARGIN
+    step = nice_step(lo - pad, hi + pad, max_ticks)
+    quantum = step / 5
+    return math.floor((lo - pad) / quantum) * quantum, math.ceil((hi + pad) / quantum) * quantum, step
+
+
+@dataclass(frozen=True)
+class AxesTemplate:
+    """軸とカラーバーの描かれた背景画像（書き込み不可）"""
+
+    image: np.ndarray  # uint8, shape=(height, width, 3)
+    box: tuple[int, int, int, int]  # データ領域 (left, top, right, bottom)
+    colorbar: tuple[int, int, int, int]  # カラーバー (left, top, right, bottom)
+
+
+@lru_cache(maxsize=16)
+def axes_template(
+    width: int,
+    height: int,
+    theme: Theme,
+    xlim: tuple[float, float, float],
+    ylim: tuple[float, float, float],
+) -> AxesTemplate:
+    """軸・グリッド・目盛り・カラーバーを描いたテンプレート画像を作成
+
+    データ領域は縦横比1:1（X・Yの1単位が同じピクセル数）で、描画可能な範囲の中央に置きます。
+
+    Args:
+        width: 画像幅（px）
+        height: 画像高さ（px）
+        theme: カラーテーマ
+        xlim: X軸の (下限, 上限, 刻み)
+        ylim: Y軸の (下限, 上限, 刻み)
+    """
+    colors = THEMES[theme]
+    font = _font()
+    x0, x1, xstep = xlim
+    y0, y1, ystep = ylim
+    xticks = ticks(x0, x1, xstep)
+    yticks = ticks(y0, y1, ystep)
+    ylabel_width = max(font.getlength(format_tick(v, ystep)) for v in yticks)
+
+    pad = 6
+    tick_length = 4
+    colorbar_width = max(8, width // 40)
+    # カラーバーの目盛りの値はリクエストごとに描くので、その幅を確保しておく
+    colorbar_space = colorbar_width + 12 + tick_length + int(font.getlength("-0000.0")) + pad
+    left = pad + int(ylabel_width) + tick_length + 4
+    right = max(left + 1, width - colorbar_space)
+    top = pad + FONT_SIZE // 2
+    bottom = max(top + 1, height - (pad + FONT_SIZE + tick_length + 4))
+
+    scale = max(1e-9, min((right - left) / (x1 - x0), (bottom - top) / (y1 - y0)))
+    box_width = round((x1 - x0) * scale)
+    box_height = round((y1 - y0) * scale)
+    box_left = left + (right - left - box_width) // 2
+    box_top = top + (bottom - top - box_height) // 2
+    box = (box_left, box_top, box_left + box_width, box_top + box_height)
+
+    img = Image.new("RGB", (width, height), colors.face)
+    draw = ImageDraw.Draw(img)
+
+    def px(x: float) -> int:
+        return round(box[0] + (x - x0) * scale)
+
+    def py(y: float) -> int:
+        return round(box[3] - (y - y0) * scale)
+
+    for v in xticks:
+        draw.line([(px(v), box[1]), (px(v), box[3])], fill=colors.grid)
+        draw.line([(px(v), box[3]), (px(v), box[3] + tick_length)], fill=colors.text)
+        draw.text((px(v), box[3] + tick_length + 2), format_tick(v, xstep), fill=colors.text, font=font, anchor="mt")
+    for v in yticks:
+        draw.line([(box[0], py(v)), (box[2], py(v))], fill=colors.grid)
+        draw.line([(box[0] - tick_length, py(v)), (box[0], py(v))], fill=colors.text)
+        draw.text((box[0] - tick_length - 2, py(v)), format_tick(v, ystep), fill=colors.text, font=font, anchor="rm")
+    draw.rectangle(box, outline=colors.text)
+
+    # カラーバー（上が最大値）
+    colorbar_left = box[2] + 12
+    colorbar = (colorbar_left, box[1], colorbar_left + colorbar_width, box[3])
+    image = np.array(img)
+    lut = colormap_lut(colors.cmap)
+    levels = np.linspace(255, 0, colorbar[3] - colorbar[1]).round().astype(np.intp)
+    image[colorbar[1] : colorbar[3], colorbar[0] : colorbar[2]] = lut[levels][:, None, :]
+    img = Image.fromarray(image)
+    ImageDraw.Draw(img).rectangle(colorbar, outline=colors.text)
+
+    image = np.array(img)
+    image.flags.writeable = False
+    return AxesTemplate(image, box, colorbar)
+
+
+def render_color_scatter(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    width: int,
+    height: int,
+    theme: Theme = "light",
+) -> Image.Image:
+    """カラー散布図を描画
+
+    点の色はzの最小値から最大値までをカラーマップに対応させます。
+    座標または値が有限でない点は描きません。
+
+    Args:
+        x: X座標の配列
+        y: Y座標の配列
+        z: 色の値の配列
+        width: 画像幅（px）
+        height: 画像高さ（px）
+        theme: カラーテーマ（light/dark）
+
+    Returns:
+        RGBの画像
+    """
+    colors = THEMES[theme]
+    x, y, z = (np.asarray(a, dtype=np.float64) for a in (x, y, z))
+    valid = np.isfinite(x) & np.isfinite(y) & np.isfinite(z)
+    x, y, z = x[valid], y[valid], z[valid]
+    if x.size == 0:
+        return Image.fromarray(axes_template(width, height, theme, (0.0, 1.0, 0.2), (0.0, 1.0, 0.2)).image)
+
+    xlim = _axis_limits(x, max(2, width // 100))
+    ylim = _axis_limits(y, max(2, height // 80))
+    template = axes_template(width, height, theme, xlim, ylim)
+    image = template.image.copy()
+
+    # 点を描く（後の点が前の点を上書きする）
+    left, top, right, bottom = template.box
+    px = np.floor(left + (x - xlim[0]) * ((right - left) / (xlim[1] - xlim[0]))).astype(np.intp)
+    py = np.floor(bottom - (y - ylim[0]) * ((bottom - top) / (ylim[1] - ylim[0]))).astype(np.intp)
+    zmin, zmax = float(z.min()), float(z.max())
+    if zmax > zmin:
+        levels = np.clip((z - zmin) * (255 / (zmax - zmin)), 0, 255).astype(np.intp)
+    else:
+        levels = np.full(z.size, 128, dtype=np.intp)
+    point_colors = colormap_lut(colors.cmap)[levels]
+    for dy in range(DOT_SIZE):
+        for dx in range(DOT_SIZE):
+            qx, qy = px + dx, py - dy
+            inside = (qx > left) & (qx < right) & (qy > top) & (qy < bottom)
+            image[qy[inside], qx[inside]] = point_colors[inside]
+
+    # カラーバーの目盛り（値の範囲はフレームごとに異なるため毎回描く）
+    img = Image.fromarray(image)
+    draw = ImageDraw.Draw(img)
+    font = _font()
+    cb_left, cb_top, cb_right, cb_bottom = template.colorbar
+    zlo, zhi = (zmin, zmax) if zmax > zmin else (zmin - 0.5, zmax + 0.5)
+    zstep = nice_step(zlo, zhi, max(2, (cb_bottom - cb_top) // 60))
+    for v in ticks(zlo, zhi, zstep):
+        ty = round(cb_bottom - (v - zlo) / (zhi - zlo) * (cb_bottom - cb_top))
+        draw.line([(cb_right, ty), (cb_right + 4, ty)], fill=colors.text)
+        draw.text((cb_right + 6, ty), format_tick(v, zstep), fill=colors.text, font=font, anchor="lm")
+    return img
@@ -11,9 +11,12 @@ from urllib.parse import urlparse
 from collections.abc import AsyncGenerator
 from fastapi.testclient import TestClient
 
+from pfs_obslog.butler_cache import clear_postisrccd_uri_cache
 from pfs_obslog.config import Settings
 from pfs_obslog.main import app
 from pfs_obslog.database import get_db
+from pfs_obslog.filecache import clear_chart_cache, clear_design_detail_cache, clear_preview_cache
+from pfs_obslog.fits_cache import clear_fits_cache
 from pfs_obslog.pfs_design_cache import clear_pfs_design_cache
 
 
@@ -207,3 +210,43 @@ def cleanup_pfs_design_cache():
     clear_pfs_design_cache()
     yield
     clear_pfs_design_cache()
+
+
+@pytest.fixture(autouse=True)
+def cleanup_postisrccd_uri_cache():
+    """各テスト前後にpostISRCCDのURIキャッシュをクリア"""
+    clear_postisrccd_uri_cache()
+    yield
+    clear_postisrccd_uri_cache()
+
+
+@pytest.fixture(autouse=True)
+def cleanup_preview_cache():
+    """各テスト前後にプレビュー画像キャッシュのシングルトンをクリア"""
+    clear_preview_cache()
+    yield
+    clear_preview_cache()
+
+
+@pytest.fixture(autouse=True)
+def cleanup_chart_cache():
+    """各テスト前後にチャート画像キャッシュのシングルトンをクリア"""
+    clear_chart_cache()
+    yield
+    clear_chart_cache()
+
+
+@pytest.fixture(autouse=True)
+def cleanup_design_detail_cache():
+    """各テスト前後にPFS Design詳細キャッシュのシングルトンをクリア"""
+    clear_design_detail_cache()
+    yield
+    clear_design_detail_cache()
+
+
+@pytest.fixture(autouse=True)
+def cleanup_fits_cache():
+    """各テスト前後にFITS情報キャッシュのシングルトンをクリア"""
+    clear_fits_cache()
+    yield
+    clear_fits_cache()
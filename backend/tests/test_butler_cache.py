@@ -0,0 +1,102 @@
+"""Butler URI キャッシュのテスト
+
+lsst.daf.butler は本番環境でのみ利用可能なため、
+Butler の代わりにモックを使用してテストします。
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from pfs_obslog.butler_cache import ButlerUriCache, _uri_to_path
+
+
+def _ref(visit: int, arm: str, spectrograph: int) -> SimpleNamespace:
+    """DatasetRef相当のオブジェクトを作成"""
+    return SimpleNamespace(
+        dataId={"visit": visit, "arm": arm, "spectrograph": spectrograph}
+    )
+
+
+def _make_butler(refs: list[SimpleNamespace], chain: list[str] | None = None) -> MagicMock:
+    """テスト用のButlerモックを作成"""
+    butler = MagicMock()
+    butler.registry.queryDatasets.return_value = refs
+    butler.registry.getCollectionChain.return_value = chain or ["run1"]
+    butler.getURI.side_effect = lambda ref: (
+        f"file:///data/postISRCCD_{ref.dataId['visit']}_{ref.dataId['arm']}{ref.dataId['spectrograph']}.fits"
+    )
+    return butler
+
+
+class TestUriToPath:
+    """_uri_to_path関数のテスト"""
+
+    def test_file_uri(self):
+        assert _uri_to_path("file:///data/a.fits") == Path("/data/a.fits")
+
+    def test_unexpected_uri(self):
+        with pytest.raises(FileNotFoundError):
+            _uri_to_path("s3://bucket/a.fits")
+
+
+class TestButlerUriCache:
+    """ButlerUriCacheクラスのテスト"""
+
+    def test_get_path_resolves_whole_visit_at_once(self):
+        """1回の問い合わせでvisitの全カメラ分を解決する"""
+        butler = _make_butler([_ref(100, "b", 1), _ref(100, "r", 1), _ref(100, "r", 2)])
+        cache = ButlerUriCache(lambda: butler, "postISRCCD", "drpActor/reductions")
+
+        assert cache.get_path(100, "b", 1) == Path("/data/postISRCCD_100_b1.fits")
+        assert cache.get_path(100, "r", 2) == Path("/data/postISRCCD_100_r2.fits")
+
+        butler.registry.queryDatasets.assert_called_once()
+        assert butler.registry.queryDatasets.call_args.kwargs["where"] == "visit = 100"
+        assert butler.registry.queryDatasets.call_args.kwargs["findFirst"] is True
+
+    def test_get_path_not_found(self):
+        """データセットがない場合はFileNotFoundError"""
+        butler = _make_butler([_ref(100, "b", 1)])
+        cache = ButlerUriCache(lambda: butler, "postISRCCD", "drpActor/reductions")
+
+        with pytest.raises(FileNotFoundError):
+            cache.get_path(100, "n", 3)
+
+    def test_butler_unavailable(self):
+        """Butlerが利用できない場合はFileNotFoundError"""
+
+        def unavailable():
+            raise ImportError("No module named 'lsst'")
+
+        cache = ButlerUriCache(unavailable, "postISRCCD", "drpActor/reductions")
+
+        with pytest.raises(FileNotFoundError):
+            cache.get_path(100, "b", 1)
+
+    def test_lru_eviction(self):
+        """上限を超えると古いvisitから破棄される"""
+        butler = _make_butler([])
+        cache = ButlerUriCache(lambda: butler, "postISRCCD", "c", max_visits=2)
+
+        cache.get_visit_paths(1)
+        cache.get_visit_paths(2)
+        cache.get_visit_paths(3)
+        cache.get_visit_paths(1)
+
+        assert butler.registry.queryDatasets.call_count == 4
+
+    def test_collection_change_clears_cache(self):
+        """コレクションの構成が変わるとキャッシュが破棄される"""
+        butler = _make_butler([_ref(100, "b", 1)], chain=["run1"])
+        cache = ButlerUriCache(lambda: butler, "postISRCCD", "c", check_interval=0.0)
+
+        cache.get_visit_paths(100)
+        cache.get_visit_paths(100)
+        assert butler.registry.queryDatasets.call_count == 1
+
+        butler.registry.getCollectionChain.return_value = ["run2", "run1"]
+        cache.get_visit_paths(100)
+        assert butler.registry.queryDatasets.call_count == 2
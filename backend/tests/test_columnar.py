@@ -0,0 +1,119 @@
+"""列ごとの配列取得のテスト（DB不要）"""
+
+import struct
+
+import numpy as np
+import orjson
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import psycopg
+
+from pfs_obslog import models as M
+from pfs_obslog.columnar import copy_statement, encode_columns, parse_binary_copy
+
+
+def _binary_copy(rows: list[tuple], formats: list[str]) -> bytes:
+    """PostgreSQL のバイナリCOPYの出力を組み立てる（NoneはNULL）"""
+    data = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+    for row in rows:
+        data += struct.pack(">h", len(row))
+        for value, fmt in zip(row, formats):
+            if value is None:
+                data += struct.pack(">i", -1)
+            else:
+                data += struct.pack(">i", struct.calcsize(fmt)) + struct.pack(f">{fmt}", value)
+    return data + b"\xff\xff"
+
+
+class TestParseBinaryCopy:
+    """バイナリCOPYの変換のテスト"""
+
+    def test_columns(self):
+        data = _binary_copy([(1.5, 10, 2.25), (float("nan"), -1, 0.0)], ["f", "i", "d"])
+        x, flags, flux = parse_binary_copy(data, [np.dtype(np.float32), np.dtype(np.int32), np.dtype(np.float64)])
+        assert x.dtype == np.float32 and x.dtype.isnative
+        np.testing.assert_array_equal(x, [1.5, np.nan])
+        np.testing.assert_array_equal(flags, [10, -1])
+        np.testing.assert_array_equal(flux, [2.25, 0.0])
+
+    def test_empty(self):
+        (x,) = parse_binary_copy(_binary_copy([], ["f"]), [np.dtype(np.float32)])
+        assert x.shape == (0,)
+
+    def test_null_is_rejected(self):
+        data = _binary_copy([(1.0, 2.0), (None, 3.0)], ["f", "f"])
+        with pytest.raises(ValueError):
+            parse_binary_copy(data, [np.dtype(np.float32)] * 2)
+
+    def test_not_copy_stream(self):
+        with pytest.raises(ValueError):
+            parse_binary_copy(b"x,y\n1,2\n", [np.dtype(np.float32)])
+
+
+class TestCopyStatement:
+    """COPY文の生成のテスト"""
+
+    def test_coalesce_and_cast(self):
+        """NULLの置き換えとキャストが入り、条件はパラメータになる"""
+        stmt = select(M.McsData.mcs_center_x_pix, M.McsData.flags).where(M.McsData.mcs_frame_id == 42)
+        query, params = copy_statement(stmt, psycopg.dialect(), {"flags": -1})
+        assert query.startswith("COPY (SELECT CAST(coalesce(mcs_data.mcs_center_x_pix")
+        assert "AS REAL) AS mcs_center_x_pix" in query
+        assert "AS INTEGER) AS flags" in query
+        assert query.endswith("TO STDOUT (FORMAT BINARY)")
+        assert 42 in params.values()
+        assert -1 in params.values()
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            copy_statement(select(M.PfsVisit.pfs_visit_description), psycopg.dialect())
+
+    def test_unlabeled_column(self):
+        with pytest.raises(ValueError):
+            copy_statement(select(M.McsData.mcs_center_x_pix * 2.0), psycopg.dialect())
+        query, _ = copy_statement(select((M.McsData.mcs_center_x_pix * 2.0).label("x2")), psycopg.dialect())
+        assert "AS x2" in query
+
+
+class TestEncodeColumns:
+    """ブラウザ向けバイナリ形式のテスト"""
+
+    def _decode(self, content: bytes) -> tuple[dict, dict[str, np.ndarray]]:
+        (header_length,) = struct.unpack_from("<I", content)
+        header = orjson.loads(content[4 : 4 + header_length])
+        arrays = {
+            column["name"]: np.frombuffer(
+                content,
+                dtype=np.dtype(column["dtype"]).newbyteorder("<"),
+                count=header["length"],
+                offset=column["offset"],
+            )
+            for column in header["columns"]
+        }
+        return header, arrays
+
+    def test_round_trip(self):
+        """各列は8バイト境界から始まり、ヘッダーの位置と型で読み戻せる"""
+        arrays = {
+            "spot_id": np.arange(5, dtype=np.int32),
+            "x": np.linspace(0, 1, 5, dtype=np.float32),
+            "flux": np.array([1, 2, np.nan, 4, 5], dtype=np.float64),
+        }
+        header, decoded = self._decode(encode_columns(arrays, {"frame_id": 42}))
+        assert header["frame_id"] == 42
+        assert header["length"] == 5
+        assert all(column["offset"] % 8 == 0 for column in header["columns"])
+        for name, array in arrays.items():
+            assert decoded[name].dtype == array.dtype
+            np.testing.assert_array_equal(decoded[name], array)
+
+    def test_big_endian_input(self):
+        """ビッグエンディアンの配列もリトルエンディアンで書き出す"""
+        content = encode_columns({"x": np.array([1.5, 2.5], dtype=">f4")})
+        header, decoded = self._decode(content)
+        assert header["columns"][0]["dtype"] == "float32"
+        np.testing.assert_array_equal(decoded["x"], [1.5, 2.5])
+
+    def test_length_mismatch(self):
+        with pytest.raises(ValueError):
+            encode_columns({"a": np.zeros(2), "b": np.zeros(3)})
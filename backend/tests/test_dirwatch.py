@@ -0,0 +1,130 @@
+"""ディレクトリ監視のテスト"""
+
+import os
+
+import pytest
+
+from pfs_obslog.dirwatch import DirectoryChangeWatcher, DirectoryWatcher
+
+
+def _write(path, data=b"data"):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class TestPollingWatcher:
+    """ポーリングによる監視のテスト"""
+
+    def test_detects_new_file_when_stable(self, tmp_path):
+        """サイズと更新日時が変わらなくなったファイルを報告する"""
+        watcher = DirectoryWatcher(poll_interval=0.0, use_inotify=False)
+        watcher.set_directories([tmp_path])
+        assert watcher.backend == "polling"
+
+        _write(tmp_path / "new.fits")
+        assert watcher.wait(0.0) == []  # 初めて見つけた時点ではまだ報告しない
+        assert watcher.wait(0.0) == [tmp_path / "new.fits"]
+        assert watcher.wait(0.0) == []  # 一度報告したものは報告しない
+
+    def test_existing_files_not_reported(self, tmp_path):
+        """監視開始時に既にあるファイルは報告しない"""
+        _write(tmp_path / "old.fits")
+        watcher = DirectoryWatcher(poll_interval=0.0, use_inotify=False)
+        watcher.set_directories([tmp_path])
+        assert watcher.wait(0.0) == []
+        assert watcher.wait(0.0) == []
+
+    def test_report_existing(self, tmp_path):
+        """report_existing を指定すると既にあるファイルも報告する"""
+        _write(tmp_path / "old.fits")
+        watcher = DirectoryWatcher(poll_interval=0.0, use_inotify=False)
+        watcher.set_directories([tmp_path], report_existing=True)
+        assert watcher.wait(0.0) == [tmp_path / "old.fits"]
+        assert watcher.wait(0.0) == []
+        assert watcher.wait(0.0) == []
+
+    def test_missing_directory_added_later(self, tmp_path):
+        """存在しないディレクトリは次の set_directories で追加される"""
+        directory = tmp_path / "later"
+        watcher = DirectoryWatcher(poll_interval=0.0, use_inotify=False)
+        watcher.set_directories([directory])
+        assert watcher.directories == []
+
+        directory.mkdir()
+        watcher.set_directories([directory])
+        assert watcher.directories == [directory]
+
+    def test_remove_directory(self, tmp_path):
+        """監視対象から外したディレクトリは報告しない"""
+        watcher = DirectoryWatcher(poll_interval=0.0, use_inotify=False)
+        watcher.set_directories([tmp_path])
+        watcher.set_directories([])
+        _write(tmp_path / "new.fits")
+        assert watcher.wait(0.0) == []
+        assert watcher.wait(0.0) == []
+
+
+class TestInotifyWatcher:
+    """inotify による監視のテスト"""
+
+    @pytest.fixture
+    def watcher(self):
+        watcher = DirectoryWatcher()
+        if watcher.backend != "inotify":
+            pytest.skip("inotify is not available")
+        yield watcher
+        watcher.close()
+
+    def test_detects_closed_file(self, watcher, tmp_path):
+        """書き込みが完了したファイルを報告する"""
+        watcher.set_directories([tmp_path])
+        _write(tmp_path / "new.fits")
+        assert watcher.wait(0.5) == [tmp_path / "new.fits"]
+
+    def test_detects_renamed_file(self, watcher, tmp_path):
+        """一時ファイルからリネームされたファイルを報告する"""
+        watcher.set_directories([tmp_path])
+        _write(tmp_path / ".tmp")
+        os.rename(tmp_path / ".tmp", tmp_path / "new.fits")
+        assert watcher.wait(0.5) == [tmp_path / "new.fits"]
+
+    def test_timeout(self, watcher, tmp_path):
+        """ファイルが作られなければ空のリストを返す"""
+        watcher.set_directories([tmp_path])
+        assert watcher.wait(0.01) == []
+
+
+class TestDirectoryChangeWatcher:
+    """ディレクトリ内の追加・変更・削除の検出のテスト"""
+
+    def test_polling_reports_unknown_change(self, tmp_path):
+        """ポーリングではディレクトリの更新日時が変わったときにNoneを返す"""
+        watcher = DirectoryChangeWatcher(tmp_path, poll_interval=0.0, use_inotify=False)
+        assert watcher.backend == "polling"
+        assert watcher.wait(0.0) == set()
+
+        _write(tmp_path / "new.fits")
+        os.utime(tmp_path, ns=(0, tmp_path.stat().st_mtime_ns + 1))
+        assert watcher.wait(0.0) is None
+        assert watcher.wait(0.0) == set()
+
+    def test_polling_interval(self, tmp_path):
+        """確認間隔が経つまではディレクトリを確認しない"""
+        watcher = DirectoryChangeWatcher(tmp_path, poll_interval=60.0, use_inotify=False)
+        os.utime(tmp_path, ns=(0, tmp_path.stat().st_mtime_ns + 1))
+        assert watcher.wait(0.01) == set()
+
+    def test_inotify_reports_names(self, tmp_path):
+        """追加・名前変更・削除されたファイル名を報告する"""
+        (tmp_path / "old.fits").touch()
+        watcher = DirectoryChangeWatcher(tmp_path, poll_interval=60.0)
+        if watcher.backend != "inotify":
+            pytest.skip("inotify is not available")
+        try:
+            _write(tmp_path / "new.fits")
+            os.rename(tmp_path / "old.fits", tmp_path / "renamed.fits")
+            (tmp_path / "new.fits").unlink()
+            assert watcher.wait(0.5) == {"new.fits", "old.fits", "renamed.fits"}
+            assert watcher.wait(0.01) == set()
+        finally:
+            watcher.close()
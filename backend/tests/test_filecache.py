@@ -0,0 +1,50 @@
+"""ディスクキャッシュのテスト"""
+
+import os
+
+from pfs_obslog.filecache import FileCache
+
+
+class TestFileCache:
+    """FileCacheクラスのテスト"""
+
+    def test_get_missing(self, tmp_path):
+        """存在しないキーはNoneを返す"""
+        cache = FileCache(tmp_path / "cache", max_bytes=1024)
+        assert cache.get(FileCache.make_key("missing")) is None
+
+    def test_put_and_get(self, tmp_path):
+        """保存したデータを取得できる"""
+        cache = FileCache(tmp_path / "cache", max_bytes=1024)
+        key = FileCache.make_key("preview", 1, 2)
+        cache.put(key, b"data")
+        assert cache.get(key) == b"data"
+
+    def test_shared_between_instances(self, tmp_path):
+        """同じディレクトリを使う別インスタンス（別プロセス相当）から読める"""
+        key = FileCache.make_key("shared")
+        FileCache(tmp_path / "cache", max_bytes=1024).put(key, b"shared")
+        assert FileCache(tmp_path / "cache", max_bytes=1024).get(key) == b"shared"
+
+    def test_make_key_differs_by_parts(self):
+        """構成要素が異なればキーも異なる"""
+        assert FileCache.make_key("a", 1) != FileCache.make_key("a", 2)
+        assert FileCache.make_key("a", 1) == FileCache.make_key("a", 1)
+
+    def test_eviction_removes_least_recently_used(self, tmp_path):
+        """上限を超えると最終アクセスの古いものから削除される"""
+        cache = FileCache(tmp_path / "cache", max_bytes=250)
+        keys = [FileCache.make_key(i) for i in range(3)]
+        for i, key in enumerate(keys[:2]):
+            cache.put(key, b"x" * 100)
+            path = cache._path(key)
+            os.utime(path, (1000 + i, 1000 + i))
+
+        # keys[0] にアクセスして最終アクセス時刻を更新
+        assert cache.get(keys[0]) is not None
+
+        cache.put(keys[2], b"x" * 100)
+
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
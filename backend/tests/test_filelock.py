@@ -0,0 +1,28 @@
+"""プロセス間ロックのテスト"""
+
+from pfs_obslog.filelock import LeaderLock
+
+
+class TestLeaderLock:
+    """LeaderLockクラスのテスト"""
+
+    def test_exclusive(self, tmp_path):
+        """同時に1つだけがロックを取得できる"""
+        first = LeaderLock(tmp_path / "leader.lock")
+        second = LeaderLock(tmp_path / "leader.lock")
+
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        assert first.try_acquire()  # 保持中は何度呼んでもTrue
+
+        first.release()
+        assert second.try_acquire()
+        assert second.is_held
+        second.release()
+        assert not second.is_held
+
+    def test_creates_parent_directory(self, tmp_path):
+        """ロックファイルのディレクトリがなければ作成する"""
+        lock = LeaderLock(tmp_path / "sub" / "leader.lock")
+        assert lock.try_acquire()
+        lock.release()
@@ -0,0 +1,228 @@
+"""ファイルダウンロード用レスポンスのテスト"""
+
+import asyncio
+import os
+from email.utils import formatdate
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from pfs_obslog.config import Settings
+from pfs_obslog.fileresponse import ConditionalFileResponse, strong_etag
+
+CONTENT = bytes(range(256)) * 16
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "raw" / "PFSA00000101.fits"
+    path.parent.mkdir()
+    path.write_bytes(CONTENT)
+    return path
+
+
+@pytest.fixture
+def client(data_file):
+    app = FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    def get_file():
+        return ConditionalFileResponse(data_file, filename=data_file.name, media_type="image/fits")
+
+    return TestClient(app)
+
+
+class TestValidators:
+    """ETag / Last-Modified のテスト"""
+
+    def test_headers(self, client, data_file):
+        """強いETagとLast-Modifiedが付与される"""
+        response = client.get("/file")
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        st = os.stat(data_file)
+        assert response.headers["etag"] == strong_etag(st)
+        assert not response.headers["etag"].startswith("W/")
+        assert response.headers["last-modified"] == formatdate(st.st_mtime, usegmt=True)
+        assert response.headers["accept-ranges"] == "bytes"
+
+    def test_etag_changes_when_file_replaced(self, client, data_file):
+        """ファイルが置き換えられるとETagが変わる"""
+        etag = client.get("/file").headers["etag"]
+        os.utime(data_file, ns=(0, 1_000_000_000))
+        assert client.get("/file").headers["etag"] != etag
+
+
+class TestConditionalGet:
+    """条件付きGETのテスト"""
+
+    def test_if_none_match(self, client):
+        """ETagが一致すれば304"""
+        etag = client.get("/file").headers["etag"]
+        response = client.get("/file", headers={"If-None-Match": f'"other", {etag}'})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_if_none_match_mismatch(self, client):
+        """ETagが一致しなければ200"""
+        response = client.get("/file", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_if_modified_since(self, client):
+        """更新されていなければ304"""
+        last_modified = client.get("/file").headers["last-modified"]
+        response = client.get("/file", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+    def test_if_modified_since_older(self, client):
+        """指定日時より後に更新されていれば200"""
+        response = client.get("/file", headers={"If-Modified-Since": formatdate(0, usegmt=True)})
+        assert response.status_code == 200
+
+    def test_if_none_match_takes_precedence(self, client):
+        """If-None-Match がある場合は If-Modified-Since を無視する"""
+        last_modified = client.get("/file").headers["last-modified"]
+        response = client.get(
+            "/file",
+            headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+        )
+        assert response.status_code == 200
+
+
+class TestRange:
+    """Range リクエストのテスト"""
+
+    def test_single_range(self, client):
+        """部分取得"""
+        response = client.get("/file", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+
+    def test_open_ended_range(self, client):
+        """続きからの取得（ダウンロードの再開）"""
+        response = client.get("/file", headers={"Range": "bytes=4000-"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[4000:]
+
+    def test_suffix_range(self, client):
+        """末尾からの取得"""
+        response = client.get("/file", headers={"Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[-10:]
+
+    def test_unsatisfiable_range(self, client):
+        """範囲外は416"""
+        response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    def test_if_range_match(self, client):
+        """If-Range が一致すれば部分取得"""
+        etag = client.get("/file").headers["etag"]
+        response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206
+        assert response.content == CONTENT[:10]
+
+    def test_if_range_mismatch(self, client):
+        """If-Range が一致しなければ全体を返す"""
+        response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    @pytest.mark.parametrize("http_range", ["bytes=0-9,20-29", "bytes=abc", "bytes=9-0", "items=0-9"])
+    def test_ignored_range(self, client, http_range):
+        """複数範囲・不正な Range は無視して全体を返す"""
+        response = client.get("/file", headers={"Range": http_range})
+        assert response.status_code == 200
+        assert response.content == CONTENT
+
+    def test_range_in_chunks(self, client):
+        """chunk_size より大きい範囲も分割して送信される"""
+        with patch.object(ConditionalFileResponse, "chunk_size", 100):
+            response = client.get("/file", headers={"Range": "bytes=50-1049"})
+        assert response.status_code == 206
+        assert response.content == CONTENT[50:1050]
+        assert response.headers["content-length"] == "1000"
+
+    def test_head(self, client):
+        """HEAD はヘッダーのみ"""
+        response = client.head("/file", headers={"Range": "bytes=0-9"})
+        assert response.status_code == 206
+        assert response.content == b""
+        assert response.headers["content-length"] == "10"
+
+
+class TestZeroCopy:
+    """ゼロコピー送信のテスト"""
+
+    def _call(self, response, headers, extensions):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/file",
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+            "extensions": extensions,
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopysend":
+                file = message["file"]
+                os.lseek(file.fileno(), message["offset"], os.SEEK_SET)
+                message = dict(message, data=os.read(file.fileno(), message["count"]))
+            messages.append(message)
+
+        asyncio.run(response(scope, receive, send))
+        return messages
+
+    def test_zerocopysend(self, data_file):
+        """サーバーが対応していれば zerocopysend で送信する"""
+        messages = self._call(
+            ConditionalFileResponse(data_file),
+            {},
+            {"http.response.zerocopysend": {}},
+        )
+        assert messages[0]["status"] == 200
+        assert messages[1]["type"] == "http.response.zerocopysend"
+        assert messages[1]["data"] == CONTENT
+
+    def test_zerocopysend_range(self, data_file):
+        """部分取得でも zerocopysend を使う"""
+        messages = self._call(
+            ConditionalFileResponse(data_file),
+            {"range": "bytes=10-19"},
+            {"http.response.zerocopysend": {}},
+        )
+        assert messages[0]["status"] == 206
+        assert messages[1]["offset"] == 10
+        assert messages[1]["data"] == CONTENT[10:20]
+
+
+class TestAccelRedirect:
+    """X-Accel-Redirect のテスト"""
+
+    def test_accel_redirect(self, client, data_file):
+        """data_root 配下のファイルはNginxに送信を任せる"""
+        settings = Settings(data_root=data_file.parent.parent, x_accel_redirect_location="/_data/")
+        with patch("pfs_obslog.fileresponse.get_settings", return_value=settings):
+            response = client.get("/file")
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"] == "/_data/raw/PFSA00000101.fits"
+        assert "attachment" in response.headers["content-disposition"]
+
+    def test_accel_redirect_outside_data_root(self, client, data_file, tmp_path):
+        """data_root 外のファイルは通常どおり送信する"""
+        settings = Settings(data_root=tmp_path / "other", x_accel_redirect_location="/_data")
+        with patch("pfs_obslog.fileresponse.get_settings", return_value=settings):
+            response = client.get("/file")
+        assert "x-accel-redirect" not in response.headers
+        assert response.content == CONTENT
@@ -108,3 +108,303 @@ class TestSizeParameters:
             "/api/fits/visits/1/sps/1.png?width=10000&height=10000"
         )
         assert response.status_code == 422  # Validation error
+
+
+class TestVisitFilesAPI:
+    """GET /api/visits/{visit_id}/files のテスト"""
+
+    def test_visit_files_requires_auth(self, client: TestClient):
+        """認証なしでアクセスすると401を返す"""
+        response = client.get("/api/visits/1/files")
+        assert response.status_code == 401
+
+    def test_visit_files_visit_not_found(self, authenticated_client: TestClient):
+        """存在しないVisitへのアクセスは404を返す"""
+        response = authenticated_client.get("/api/visits/999999/files")
+        assert response.status_code == 404
+
+
+class TestCollectVisitFiles:
+    """_collect_visit_files のテスト（DB不要）"""
+
+    def test_collect_existing_files(self, tmp_path):
+        """存在するファイルのみが一覧に含まれる"""
+        import datetime
+        from types import SimpleNamespace
+        from unittest.mock import patch
+
+        from pfs_obslog.config import Settings
+        from pfs_obslog.routers.fits import _collect_visit_files
+
+        settings = Settings(data_root=tmp_path, butler_warmup=False)
+        # ディレクトリの日付は issued_at + 10時間 の日付
+        visit = SimpleNamespace(
+            pfs_visit_id=123,
+            issued_at=datetime.datetime(2025, 1, 2, 20, 0, 0),
+        )
+        raw_dir = tmp_path / "raw" / "2025-01-03"
+        (raw_dir / "sps").mkdir(parents=True)
+        (raw_dir / "mcs").mkdir(parents=True)
+        (raw_dir / "sps" / "PFSA00012312.fits").write_bytes(b"x" * 10)  # camera 2 (r1)
+        (raw_dir / "mcs" / "PFSC00004567.fits").write_bytes(b"x" * 20)
+
+        with patch("pfs_obslog.routers.fits.get_settings", return_value=settings):
+            files = _collect_visit_files(visit, [4567, 4568], [])  # type: ignore[arg-type]
+
+        assert files.visit_id == 123
+        assert [f.camera_id for f in files.sps] == [2]
+        assert files.sps[0].raw is not None
+        assert files.sps[0].raw.size == 10
+        assert files.sps[0].calexp is None
+        assert [m.frame_id for m in files.mcs] == [4567]
+        assert files.mcs[0].file.size == 20
+        assert files.agc == []
+
+    def test_agc_without_taken_at(self, tmp_path):
+        """撮影日時のないAGC露出は飛ばす"""
+        import datetime
+        from types import SimpleNamespace
+        from unittest.mock import patch
+
+        from pfs_obslog.config import Settings
+        from pfs_obslog.routers.fits import AgcFitsNotAccessible, _agc_fits_path, _collect_visit_files
+
+        settings = Settings(data_root=tmp_path, butler_warmup=False)
+        visit = SimpleNamespace(pfs_visit_id=123, issued_at=datetime.datetime(2025, 1, 2, 20, 0, 0))
+        agc_dir = tmp_path / "raw" / "2025-01-03" / "agcc"
+        agc_dir.mkdir(parents=True)
+        (agc_dir / "agcc_000123_00000002.fits").write_bytes(b"x" * 30)
+        agc_exposures = [
+            SimpleNamespace(pfs_visit_id=123, agc_exposure_id=1, taken_at=None),
+            SimpleNamespace(pfs_visit_id=123, agc_exposure_id=2, taken_at=datetime.datetime(2025, 1, 2, 20, 1, 0)),
+        ]
+
+        with patch("pfs_obslog.routers.fits.get_settings", return_value=settings):
+            files = _collect_visit_files(visit, [], agc_exposures)  # type: ignore[arg-type]
+            with pytest.raises(AgcFitsNotAccessible):
+                _agc_fits_path(agc_exposures[0], settings)  # type: ignore[arg-type]
+
+        assert [a.exposure_id for a in files.agc] == [2]
+        assert files.agc[0].file.size == 30
+
+
+class TestSpsMosaic:
+    """SPSコンタクトシート生成のテスト（DB不要）"""
+
+    def test_mosaic_api_visit_not_found(self, authenticated_client: TestClient):
+        """存在しないVisitへのアクセスは404を返す"""
+        response = authenticated_client.get("/api/fits/visits/999999/sps.png")
+        assert response.status_code == 404
+
+    def test_mosaic_png(self):
+        """カメラ画像が4x4のグリッドにまとめられる"""
+        import io
+
+        import numpy as np
+        from PIL import Image
+
+        from pfs_obslog.routers.fits import _sps_mosaic_image
+
+        tiles = {1: np.full((32, 64), 200, dtype=np.uint8), 16: np.zeros((64, 64), dtype=np.uint8)}
+        png = _sps_mosaic_image(tiles, 64, 64).content
+
+        img = Image.open(io.BytesIO(png))
+        assert img.format == "PNG"
+        assert img.size == (4 * 64 + 3 * 2, 4 * 64 + 3 * 2)
+
+    def _get_mosaic(self, tmp_path, failing_cameras):
+        """2台のカメラのうち failing_cameras の生成が失敗する状態でエンドポイントを呼ぶ"""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock, patch
+
+        import numpy as np
+
+        from pfs_obslog.filecache import FileCache
+        from pfs_obslog.imageformat import ImageFormat, OutputFormat
+        from pfs_obslog.routers.fits import FitsType, get_sps_fits_mosaic
+
+        files = {}
+        for camera_id in (1, 2):
+            path = tmp_path / f"camera{camera_id}.fits"
+            path.write_bytes(b"x")
+            files[camera_id] = (path, path.stat())
+        failing_paths = {files[camera_id][0] for camera_id in failing_cameras}
+
+        def fits2array(path, width, height):
+            if path in failing_paths:
+                raise OSError(f"broken file: {path}")
+            return np.zeros((height, width), dtype=np.uint8)
+
+        visit = SimpleNamespace(pfs_visit_id=123)
+        db = SimpleNamespace(execute=AsyncMock(return_value=SimpleNamespace(scalar_one_or_none=lambda: visit)))
+        preview_cache = FileCache(tmp_path / "previews", max_bytes=1024 * 1024)
+        with (
+            ThreadPoolExecutor(1) as executor,
+            patch("pfs_obslog.routers.fits._sps_camera_files", return_value=files),
+            patch("pfs_obslog.routers.fits._fits2array", side_effect=fits2array),
+            patch("pfs_obslog.routers.fits.get_render_executor", return_value=executor),
+            patch("pfs_obslog.routers.fits.get_preview_cache", return_value=preview_cache),
+            patch.object(preview_cache, "put", wraps=preview_cache.put) as put,
+        ):
+            response = asyncio.run(
+                get_sps_fits_mosaic(
+                    123,
+                    OutputFormat(ImageFormat.png, None, False),
+                    width=16,
+                    height=16,
+                    type=FitsType.raw,
+                    db=db,  # type: ignore[arg-type]
+                )
+            )
+        return response, put
+
+    def test_mosaic_cached(self, tmp_path):
+        """全カメラの生成に成功すればキャッシュする"""
+        from pfs_obslog.routers.fits import CACHE_CONTROL_HEADER
+
+        response, put = self._get_mosaic(tmp_path, [])
+        assert response.headers["cache-control"] == CACHE_CONTROL_HEADER
+        put.assert_called_once()
+
+    def test_mosaic_partial_failure(self, tmp_path):
+        """一部のカメラが失敗した画像はキャッシュしない"""
+        response, put = self._get_mosaic(tmp_path, [2])
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
+        put.assert_not_called()
+
+    def test_mosaic_all_failed(self, tmp_path):
+        """全カメラが失敗すれば500"""
+        from fastapi import HTTPException
+
+        with pytest.raises(HTTPException) as exc_info:
+            self._get_mosaic(tmp_path, [1, 2])
+        assert exc_info.value.status_code == 500
+
+
+class TestAgcPreviews:
+    """AGCの全カメラ一括生成のテスト（DB不要）"""
+
+    @pytest.fixture
+    def agc_file(self, tmp_path):
+        import astropy.io.fits as afits
+        import numpy as np
+
+        path = tmp_path / "agcc_000001_00000001.fits"
+        rng = np.random.default_rng(0)
+        afits.HDUList(
+            [afits.PrimaryHDU()]
+            + [afits.ImageHDU(rng.normal(100, 10, (32, 48)).astype(np.float32)) for _ in range(3)]
+            + [afits.BinTableHDU.from_columns([afits.Column(name="x", format="E", array=np.zeros(2))])]
+        ).writeto(path)
+        return path
+
+    def test_cache_agc_previews(self, tmp_path, agc_file):
+        """ファイルを1回開くだけで全ての画像HDUをキャッシュする"""
+        from unittest.mock import patch
+
+        import astropy.io.fits as afits
+
+        from pfs_obslog.filecache import FileCache
+        from pfs_obslog.fits_cache import FitsCache
+        from pfs_obslog.routers.fits import _cache_agc_previews, _preview_key
+
+        preview_cache = FileCache(tmp_path / "previews", max_bytes=1024 * 1024)
+        with (
+            patch("pfs_obslog.routers.fits.get_preview_cache", return_value=preview_cache),
+            patch("pfs_obslog.routers.fits.get_fits_cache", return_value=FitsCache(tmp_path / "fits.db")),
+            patch("astropy.io.fits.open", wraps=afits.open) as fits_open,
+        ):
+            results = _cache_agc_previews(agc_file, 64, 64)
+
+        assert fits_open.call_count == 1
+        assert sorted(results) == [1, 2, 3]
+        st = agc_file.stat()
+        for hdu_index, (content, key, _) in results.items():
+            assert key == _preview_key(agc_file, st, 64, 64, hdu_index)
+            assert preview_cache.get(key) == content
+
+    def test_agc_strip_image(self, tmp_path, agc_file):
+        """全カメラが横一列に並ぶ"""
+        import io
+        from unittest.mock import patch
+
+        from PIL import Image
+
+        from pfs_obslog.fits_cache import FitsCache
+        from pfs_obslog.routers.fits import _agc_strip_image
+
+        with patch("pfs_obslog.routers.fits.get_fits_cache", return_value=FitsCache(tmp_path / "fits.db")):
+            png = _agc_strip_image(agc_file, 64, 64).content
+
+        img = Image.open(io.BytesIO(png))
+        assert img.size == (3 * 64 + 2 * 2, 64)
+
+
+class TestZScale:
+    """表示範囲計算のテスト（DB不要）"""
+
+    def test_matches_astropy(self):
+        """astropy の ZScaleInterval と同じ結果になる"""
+        import numpy as np
+        from astropy.visualization import ZScaleInterval
+
+        from pfs_obslog.routers.fits import _zscale_limits
+
+        rng = np.random.default_rng(0)
+        data = rng.poisson(500, (512, 512)).astype(np.uint16)
+        data[rng.random(data.shape) < 0.001] = 65535  # 宇宙線相当の外れ値
+
+        expected = ZScaleInterval().get_limits(data)
+        assert _zscale_limits(data) == pytest.approx(expected)
+
+    def test_ignores_non_finite(self):
+        """NaNを無視する"""
+        import numpy as np
+
+        from pfs_obslog.routers.fits import _zscale_limits
+
+        data = np.arange(10000, dtype=np.float64).reshape(100, 100)
+        data[::2] = np.nan
+        vmin, vmax = _zscale_limits(data)
+        assert np.isfinite(vmin) and np.isfinite(vmax)
+
+    def test_all_nan(self):
+        """有効な値がない場合も例外にならない"""
+        import numpy as np
+
+        from pfs_obslog.routers.fits import _zscale_limits
+
+        assert _zscale_limits(np.full((4, 4), np.nan)) == (0.0, 1.0)
+
+    def test_limits_shared_between_sizes(self, tmp_path):
+        """表示範囲は初回に保存され、異なるサイズの描画でも再利用される"""
+        from unittest.mock import patch
+
+        import astropy.io.fits as afits
+        import numpy as np
+
+        from pfs_obslog.fits_cache import FitsCache
+        from pfs_obslog.routers.fits import _fits2array
+
+        path = tmp_path / "image.fits"
+        rng = np.random.default_rng(1)
+        afits.HDUList(
+            [afits.PrimaryHDU(), afits.ImageHDU(rng.normal(100, 10, (64, 64)).astype(np.float32))]
+        ).writeto(path)
+
+        cache = FitsCache(tmp_path / "fits.db")
+        with (
+            patch("pfs_obslog.routers.fits.get_fits_cache", return_value=cache),
+            patch("pfs_obslog.routers.fits._zscale_limits", return_value=(90.0, 110.0)) as zscale,
+        ):
+            small = _fits2array(path, 16, 16)
+            large = _fits2array(path, 64, 64)
+
+        assert zscale.call_count == 1
+        assert small.shape == (16, 16)
+        assert large.shape == (64, 64)
+        assert cache.get_display_limits(path, path.stat(), 1) == (90.0, 110.0)
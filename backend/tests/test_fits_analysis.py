@@ -0,0 +1,162 @@
+"""FITS画像のピクセル解析のテスト"""
+
+import io
+
+import astropy.io.fits as afits
+import numpy as np
+import pytest
+
+from pfs_obslog import fits_analysis
+from pfs_obslog.fits_analysis import Region, read_region, resolve_region
+
+
+@pytest.fixture
+def fits_file(tmp_path):
+    """符号なし整数（BZERO付き）、浮動小数点、圧縮画像、テーブルのHDUを持つファイル"""
+    path = tmp_path / "PFSA00000111.fits"
+    raw = (np.arange(40 * 30).reshape(40, 30) % 60000).astype(np.uint16)
+    image = afits.ImageHDU(raw)
+    image.header["CRPIX1"] = 10.0
+    image.header["CRPIX2"] = 20.0
+    floats = np.arange(40 * 30, dtype=np.float32).reshape(40, 30)
+    floats[0, :] = np.nan
+    afits.HDUList(
+        [
+            afits.PrimaryHDU(),
+            image,
+            afits.ImageHDU(floats),
+            afits.CompImageHDU(raw),
+            afits.BinTableHDU.from_columns([afits.Column(name="x", format="E", array=np.zeros(2))]),
+        ]
+    ).writeto(path)
+    return path, raw, floats
+
+
+class TestResolveRegion:
+    """領域の計算のテスト"""
+
+    def test_defaults_to_image_edge(self):
+        assert resolve_region((40, 30)) == Region(0, 0, 30, 40)
+        assert resolve_region((40, 30), 5, 6) == Region(5, 6, 25, 34)
+
+    def test_clipped(self):
+        assert resolve_region((40, 30), 20, 30, 100, 100) == Region(20, 30, 10, 10)
+
+    def test_outside(self):
+        with pytest.raises(ValueError):
+            resolve_region((40, 30), 30, 0)
+
+
+class TestReadRegion:
+    """領域の読み込みのテスト"""
+
+    def test_unsigned(self, fits_file):
+        """BZEROによる符号なし整数がそのまま読める"""
+        path, raw, _ = fits_file
+        data, region, header = read_region(path, 1, 3, 4, 5, 6)
+        assert region == Region(3, 4, 5, 6)
+        assert data.dtype == np.uint16
+        np.testing.assert_array_equal(data, raw[4:10, 3:8])
+        assert "BZERO" not in header
+
+    def test_compressed(self, fits_file):
+        path, raw, _ = fits_file
+        data, _, _ = read_region(path, 3, 3, 4, 5, 6)
+        np.testing.assert_array_equal(data, raw[4:10, 3:8])
+
+    def test_errors(self, fits_file):
+        path, _, _ = fits_file
+        with pytest.raises(FileNotFoundError):
+            read_region(path, 9)
+        with pytest.raises(ValueError):
+            read_region(path, 4)  # テーブル
+        with pytest.raises(ValueError):
+            read_region(path, 1, max_pixels=100)
+
+
+class TestCutout:
+    """切り出しのテスト"""
+
+    def test_fits(self, fits_file):
+        """ヘッダーが引き継がれ、基準ピクセルが切り出し位置に合わせられる"""
+        path, raw, _ = fits_file
+        data, region, header = read_region(path, 1, 3, 4, 5, 6)
+        with afits.open(io.BytesIO(fits_analysis.cutout_fits(data, region, header))) as hdul:
+            np.testing.assert_array_equal(hdul[0].data, raw[4:10, 3:8])
+            assert hdul[0].header["CRPIX1"] == 7.0
+            assert hdul[0].header["CRPIX2"] == 16.0
+            assert hdul[0].header["LTV1"] == -3
+
+    def test_npy(self, fits_file):
+        path, raw, _ = fits_file
+        data, _, _ = read_region(path, 1, 3, 4, 5, 6)
+        loaded = np.load(io.BytesIO(fits_analysis.cutout_npy(data)))
+        assert loaded.dtype == np.dtype("<u2")
+        np.testing.assert_array_equal(loaded, raw[4:10, 3:8])
+
+
+class TestStats:
+    """ピクセル統計のテスト"""
+
+    def test_region_excludes_nan(self, fits_file):
+        path, _, floats = fits_file
+        data, _, _ = read_region(path, 2)
+        stats = fits_analysis.region_stats(data)
+        finite = floats[1:]
+        assert stats["count"] == finite.size
+        assert stats["min"] == finite.min()
+        assert stats["median"] == pytest.approx(np.median(finite))
+
+    def test_profiles(self, fits_file):
+        """全てNaNの行はNoneになる"""
+        path, _, floats = fits_file
+        data, _, _ = read_region(path, 2)
+        rows = fits_analysis.profile_stats(data, axis=1)
+        assert len(rows["mean"]) == 40
+        assert rows["mean"][0] is None
+        assert rows["mean"][1] == pytest.approx(floats[1].mean())
+        columns = fits_analysis.profile_stats(data, axis=0)
+        assert len(columns["max"]) == 30
+        assert columns["max"][2] == floats[-1, 2]
+
+    def test_histogram(self, fits_file):
+        path, _, _ = fits_file
+        data, _, _ = read_region(path, 1)
+        histogram = fits_analysis.histogram(data, bins=10, range_min=100, range_max=200)
+        assert len(histogram["edges"]) == 11
+        assert sum(histogram["counts"]) == 101
+        assert histogram["underflow"] == 100
+        assert histogram["overflow"] == data.size - 201
+
+
+class TestPixelAnalysisAPI:
+    """切り出し・統計APIのテスト（ファイルの解決を差し替えてDB不要にする）"""
+
+    @pytest.fixture
+    def api_client(self, authenticated_client, fits_file):
+        from pfs_obslog.main import app
+        from pfs_obslog.routers.fits import _sps_file
+
+        app.dependency_overrides[_sps_file] = lambda: fits_file[0]
+        return authenticated_client
+
+    def test_cutout(self, api_client, fits_file):
+        _, raw, _ = fits_file
+        response = api_client.get(
+            "/api/fits/visits/1/sps/1/cutout", params={"x": 3, "y": 4, "width": 5, "height": 6, "format": "npy"}
+        )
+        assert response.status_code == 200
+        assert "PFSA00000111-1-3_4_5x6.npy" in response.headers["content-disposition"]
+        np.testing.assert_array_equal(np.load(io.BytesIO(response.content)), raw[4:10, 3:8])
+
+    def test_stats(self, api_client):
+        response = api_client.get("/api/fits/visits/1/sps/1/stats", params={"hdu_index": 2, "mode": "columns"})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["width"], body["height"]) == (30, 40)
+        assert len(body["columns"]["median"]) == 30
+        assert body["region"] is None
+
+    def test_invalid_region(self, api_client):
+        response = api_client.get("/api/fits/visits/1/sps/1/stats", params={"x": 1000})
+        assert response.status_code == 400
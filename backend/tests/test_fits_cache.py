@@ -0,0 +1,51 @@
+"""FITS情報キャッシュのテスト"""
+
+import os
+
+from pfs_obslog.fits_cache import FitsCache
+
+
+class TestFitsCache:
+    """FitsCacheクラスのテスト"""
+
+    def test_header_roundtrip(self, tmp_path):
+        """保存したヘッダーを取得できる"""
+        path = tmp_path / "a.fits"
+        path.write_bytes(b"x" * 10)
+        cache = FitsCache(tmp_path / "fits.db")
+
+        assert cache.get_header(path, path.stat()) is None
+        cache.put_header(path, path.stat(), '{"filename": "a.fits", "hdul": []}')
+        assert cache.get_header(path, path.stat()) == '{"filename": "a.fits", "hdul": []}'
+
+    def test_display_limits_per_hdu(self, tmp_path):
+        """表示範囲はHDUごとに保存される"""
+        path = tmp_path / "a.fits"
+        path.write_bytes(b"x" * 10)
+        cache = FitsCache(tmp_path / "fits.db")
+
+        cache.put_display_limits(path, path.stat(), 1, (1.0, 2.0))
+        cache.put_display_limits(path, path.stat(), 2, (3.0, 4.0))
+        assert cache.get_display_limits(path, path.stat(), 1) == (1.0, 2.0)
+        assert cache.get_display_limits(path, path.stat(), 2) == (3.0, 4.0)
+        assert cache.get_display_limits(path, path.stat(), 3) is None
+
+    def test_invalidated_when_file_changes(self, tmp_path):
+        """ファイルが更新されるとキャッシュは無効になる"""
+        path = tmp_path / "a.fits"
+        path.write_bytes(b"x" * 10)
+        cache = FitsCache(tmp_path / "fits.db")
+        cache.put_header(path, path.stat(), "{}")
+        cache.put_display_limits(path, path.stat(), 1, (1.0, 2.0))
+
+        path.write_bytes(b"y" * 20)
+        os.utime(path, ns=(0, 1_000_000_000))
+        assert cache.get_header(path, path.stat()) is None
+        assert cache.get_display_limits(path, path.stat(), 1) is None
+
+    def test_shared_between_instances(self, tmp_path):
+        """同じDBを使う別インスタンス（別プロセス相当）から読める"""
+        path = tmp_path / "a.fits"
+        path.write_bytes(b"x")
+        FitsCache(tmp_path / "fits.db").put_display_limits(path, path.stat(), 1, (5.0, 6.0))
+        assert FitsCache(tmp_path / "fits.db").get_display_limits(path, path.stat(), 1) == (5.0, 6.0)
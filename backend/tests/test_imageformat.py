@@ -0,0 +1,127 @@
+"""プレビュー画像の出力形式のテスト"""
+
+import io
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from pfs_obslog import metrics
+from pfs_obslog.config import Settings
+from pfs_obslog.imageformat import (
+    ImageFormat,
+    ImageOutput,
+    encode_image,
+    negotiate_format,
+    record_encoding,
+)
+
+BROWSER_ACCEPT = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+
+
+def _settings(**kwargs) -> Settings:
+    return Settings(**kwargs)
+
+
+class TestNegotiateFormat:
+    """Accept ヘッダーによる形式の決定のテスト"""
+
+    def test_no_accept(self):
+        assert negotiate_format(None) == ImageFormat.png
+
+    def test_wildcard_only(self):
+        """ワイルドカードではPNGを返す"""
+        assert negotiate_format("*/*") == ImageFormat.png
+        assert negotiate_format("image/*") == ImageFormat.png
+
+    def test_server_preference(self):
+        """同じq値ならサーバーの優先順に従う"""
+        with patch("pfs_obslog.imageformat.get_settings", return_value=_settings(preview_formats=["webp", "avif"])):
+            assert negotiate_format(BROWSER_ACCEPT) == ImageFormat.webp
+        with patch("pfs_obslog.imageformat.get_settings", return_value=_settings(preview_formats=["avif", "webp"])):
+            assert negotiate_format(BROWSER_ACCEPT) == ImageFormat.avif
+
+    def test_q_value(self):
+        """q値の高いものを優先し、q=0は選ばない"""
+        with patch("pfs_obslog.imageformat.get_settings", return_value=_settings(preview_formats=["webp", "jpeg"])):
+            assert negotiate_format("image/webp;q=0.5, image/jpeg") == ImageFormat.jpeg
+            assert negotiate_format("image/webp;q=0") == ImageFormat.png
+
+    def test_not_in_preference(self):
+        """サーバーの優先順にない形式は選ばない"""
+        with patch("pfs_obslog.imageformat.get_settings", return_value=_settings(preview_formats=[])):
+            assert negotiate_format(BROWSER_ACCEPT) == ImageFormat.png
+
+
+class TestEncodeImage:
+    """エンコードのテスト"""
+
+    @pytest.mark.parametrize("fmt", list(ImageFormat))
+    def test_formats(self, fmt):
+        data = np.arange(64 * 32, dtype=np.uint16).reshape(32, 64).astype(np.uint8)
+        encoded = encode_image(data, fmt, 80)
+        img = Image.open(io.BytesIO(encoded.content))
+        assert img.format == fmt.value.upper()
+        assert img.size == (64, 32)
+        assert encoded.encode_seconds >= 0
+
+    def test_jpeg_rgba(self):
+        """JPEGではアルファチャンネルを捨てる"""
+        data = np.zeros((8, 8, 4), dtype=np.uint8)
+        assert encode_image(data, ImageFormat.jpeg).content[:2] == b"\xff\xd8"
+
+    def test_quality(self):
+        """品質を下げるとサイズが小さくなる"""
+        data = np.random.default_rng(0).integers(0, 256, (128, 128), dtype=np.uint8)
+        low = encode_image(data, ImageFormat.webp, 10)
+        high = encode_image(data, ImageFormat.webp, 95)
+        assert len(low.content) < len(high.content)
+
+    def test_record_encoding(self):
+        """エンコード時間とサイズがメトリクスに記録される"""
+        metrics.reset()
+        encoded = encode_image(np.zeros((8, 8), dtype=np.uint8), ImageFormat.png)
+        record_encoding(encoded, "sps")
+        values = {m["name"]: m for m in metrics.snapshot()["metrics"]}
+        assert values["image_encode_bytes"]["labels"] == {"format": "png", "kind": "sps"}
+        assert values["image_encode_bytes"]["sum"] == len(encoded.content)
+        assert values["image_encode_seconds"]["count"] == 1
+        metrics.reset()
+
+
+class TestOutputFormatDependency:
+    """出力形式の依存性注入のテスト"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+
+        @app.get("/image")
+        def image(output: ImageOutput):
+            return {"format": output.format.value, "quality": output.quality, "vary": output.headers.get("vary")}
+
+        return TestClient(app)
+
+    def test_explicit_format(self, client):
+        response = client.get("/image?format=jpeg&quality=50", headers={"Accept": BROWSER_ACCEPT})
+        assert response.json() == {"format": "jpeg", "quality": 50, "vary": None}
+
+    def test_negotiated(self, client):
+        with patch("pfs_obslog.imageformat.get_settings", return_value=_settings(preview_formats=["webp"], preview_quality=70)):
+            response = client.get("/image", headers={"Accept": BROWSER_ACCEPT})
+        assert response.json() == {"format": "webp", "quality": 70, "vary": "Accept"}
+
+    def test_png_has_no_quality(self, client):
+        response = client.get("/image?format=png&quality=50")
+        assert response.json()["quality"] is None
+
+    def test_invalid_quality(self, client):
+        assert client.get("/image?quality=0").status_code == 422
+
+    def test_unsupported_format(self, client):
+        with patch("pfs_obslog.imageformat.is_supported", return_value=False):
+            response = client.get("/image?format=avif")
+        assert response.status_code == 400
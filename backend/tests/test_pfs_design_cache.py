@@ -1,6 +1,7 @@
 """PFS Design Cache のテスト"""
 
 import datetime
+import os
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -8,7 +9,7 @@ import numpy as np
 import pytest
 from astropy.io import fits
 
-from pfs_obslog.pfs_design_cache import PfsDesignCache, _pick_id, clear_pfs_design_cache
+from pfs_obslog.pfs_design_cache import FiberFilter, PfsDesignCache, _pick_id, clear_pfs_design_cache
 
 
 def create_dummy_pfs_design(
@@ -19,6 +20,8 @@ def create_dummy_pfs_design(
     dec: float = 45.0,
     arms: str = "brn",
     num_fibers: int = 100,
+    proposal_id: str | None = None,
+    cat_id: int = 1,
 ) -> None:
     """テスト用のダミーPFS Designファイルを作成
 
@@ -30,6 +33,9 @@ def create_dummy_pfs_design(
         dec: 中心赤緯
         arms: 使用するアーム
         num_fibers: ファイバー数
+        proposal_id: 指定すると proposalId, catId, obCode, fiberStatus の列を加える
+            （obCode は "{proposal_id}_{fiberId}"、fiberStatus は最後のファイバーだけ2）
+        cat_id: catId
     """
     # Primary HDU
     primary_hdu = fits.PrimaryHDU()
@@ -52,6 +58,15 @@ def create_dummy_pfs_design(
         fits.Column(name="ra", format="D", array=np.full(num_fibers, ra)),
         fits.Column(name="dec", format="D", array=np.full(num_fibers, dec)),
     ]
+    if proposal_id is not None:
+        fiber_status = np.ones(num_fibers, dtype=np.int32)
+        fiber_status[-1] = 2
+        design_cols += [
+            fits.Column(name="proposalId", format="12A", array=np.full(num_fibers, proposal_id)),
+            fits.Column(name="catId", format="J", array=np.full(num_fibers, cat_id, dtype=np.int32)),
+            fits.Column(name="obCode", format="20A", array=[f"{proposal_id}_{i}" for i in fiber_ids]),
+            fits.Column(name="fiberStatus", format="J", array=fiber_status),
+        ]
     design_hdu = fits.BinTableHDU.from_columns(design_cols, name="DESIGN")
 
     # Photometry HDU (HDU 2) - 各ファイバーに対して複数のフィルターデータ
@@ -171,6 +186,18 @@ class TestPfsDesignCache:
         cache._syncing = False
         assert cache.is_syncing() is False
 
+    def test_sync_blocked_by_other_worker(self, cache, cache_dir):
+        """他のワーカープロセスが同期中の場合はスキップされる"""
+        from pfs_obslog.filelock import LeaderLock
+
+        other = LeaderLock(cache_dir / "test.db.lock")
+        assert other.try_acquire()
+        try:
+            assert cache.sync() is False
+        finally:
+            other.release()
+        assert cache.sync() is True
+
     @patch("pfs_obslog.pfs_design_cache.PfsDesignCache._update_entry")
     def test_sync_with_files(self, mock_update, cache_dir, design_dir):
         """ファイルがある場合の同期"""
@@ -433,3 +460,520 @@ class TestPfsDesignCacheWithRealFits:
         assert design_rows["engineering"] == 0
         assert design_rows["sunss_imaging"] == 0
         assert design_rows["sunss_diffuse"] == 0
+
+    @pytest.mark.timeout(60)  # プロセスプールの起動があるため長めに設定
+    def test_sync_parallel(self, tmp_path, design_files, monkeypatch):
+        """プロセスプールでの並列読み込みとまとめての書き込み"""
+        from pfs_obslog import pfs_design_cache
+
+        design_dir, files_info = design_files
+        # FITSとして読めないファイルはスキップされる
+        (design_dir / "pfsDesign-0x00000000000000ff.fits").write_bytes(b"broken")
+        monkeypatch.setattr(pfs_design_cache, "PARALLEL_SYNC_THRESHOLD", 0)
+        monkeypatch.setattr(pfs_design_cache, "READ_CHUNK_SIZE", 1)
+        monkeypatch.setattr(pfs_design_cache, "WRITE_BATCH_SIZE", 2)
+
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir, sync_workers=2)
+        with patch.object(PfsDesignCache, "_update_entry") as mock_update:
+            assert cache.sync() is True
+        mock_update.assert_not_called()
+
+        entries_by_id = {e["id"]: e for e in cache.get_all_entries()}
+        assert set(entries_by_id) == {info["id"] for info in files_info}
+        for info in files_info:
+            assert entries_by_id[info["id"]]["num_design_rows"] == info["num_fibers"]
+        assert cache.get_sync_progress() is None
+        # 途中の書き込みのまとまり（1回）と同期の完了で世代が進む
+        assert cache.get_generation() == 2
+
+    def test_wal_mode(self, tmp_path):
+        """同期中も読み込めるようにWALモードになっている"""
+        import sqlite3
+
+        db_path = tmp_path / "cache" / "test.db"
+        PfsDesignCache(db_path, tmp_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        finally:
+            conn.close()
+
+    def test_generation(self, tmp_path, design_files):
+        """内容が変わった同期が完了したときだけ世代が進む"""
+        design_dir, files_info = design_files
+        db_path = tmp_path / "cache" / "test.db"
+        cache = PfsDesignCache(db_path, design_dir)
+        assert cache.get_generation() == 0
+
+        cache.sync()
+        assert cache.get_generation() == 1
+        cache.sync()
+        assert cache.get_generation() == 1
+
+        (design_dir / f"pfsDesign-0x{files_info[0]['id']}.fits").unlink()
+        cache.sync()
+        # 別のワーカーのインスタンスからも同じ世代が見える
+        assert PfsDesignCache(db_path, design_dir).get_generation() == 2
+
+    def test_connections(self, tmp_path, design_files):
+        """読み込み用の接続はスレッドごとに使い回し、書き込みの結果がすぐに見える"""
+        import threading
+
+        design_dir, files_info = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        reader = cache._reader()
+        assert cache._reader() is reader
+        other = []
+        thread = threading.Thread(target=lambda: other.append(cache._reader()))
+        thread.start()
+        thread.join()
+        assert other[0] is not reader
+
+        assert cache.get_all_entries() == []
+        cache.sync()
+        assert len(cache.get_all_entries()) == len(files_info)
+
+        # 閉じた後も接続を開き直して使える
+        cache.close()
+        assert cache._reader() is not reader
+        assert cache.get_generation() == 1
+        cache.close()
+
+    def test_paginated_total(self, tmp_path, design_files):
+        """総件数はページと同じクエリで取得し、範囲外のページでも返す"""
+        design_dir, files_info = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        cache.sync()
+
+        entries, total = cache.get_entries_paginated(limit=2, sort_by="id", sort_order="asc")
+        assert [e["id"] for e in entries] == sorted(info["id"] for info in files_info)[:2]
+        assert total == len(files_info)
+        entries, total = cache.get_entries_paginated(offset=100)
+        assert (entries, total) == ([], len(files_info))
+        entries, total = cache.get_entries_paginated(search="no such design")
+        assert (entries, total) == ([], 0)
+
+    def test_cursor_pagination(self, tmp_path, design_files):
+        """カーソルでのページ送りと順位が、全件を並べた順序と一致する（同じキーの行は id 順）"""
+        design_dir, files_info = design_files
+        # 同じ更新日時のファイルを作る
+        for info in files_info[:2]:
+            os.utime(design_dir / f"pfsDesign-0x{info['id']}.fits", (1_700_000_000, 1_700_000_000))
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        cache.sync()
+
+        for sort_by in ("date_modified", "name", "id", "altitude"):
+            for sort_order in ("asc", "desc"):
+                conditions = dict(sort_by=sort_by, sort_order=sort_order, zenith_ra=100.0, zenith_dec=20.0)
+                expected = [e["id"] for e in cache.get_entries_paginated(**conditions)[0]]
+                ids, cursor = [], None
+                while True:
+                    page = cache.get_page(limit=1, cursor=cursor, **conditions)
+                    assert page.total == len(files_info)
+                    ids += [e["id"] for e in page.entries]
+                    if page.next_cursor is None:
+                        break
+                    cursor = page.next_cursor
+                assert ids == expected
+                assert [cache.get_design_rank(design_id, **conditions) for design_id in expected] == [0, 1, 2]
+
+        assert cache.get_entries_paginated(sort_by="date_modified", sort_order="asc")[0][0]["id"] == min(
+            info["id"] for info in files_info[:2]
+        )
+        cursor = cache.get_page(limit=1, sort_by="name").next_cursor
+        with pytest.raises(ValueError):
+            cache.get_page(sort_by="id", cursor=cursor)
+        with pytest.raises(ValueError):
+            cache.get_page(cursor="not a cursor")
+
+    def test_columns(self, tmp_path, design_files):
+        """メモリ上の列は世代が変わったときだけ作り直す"""
+        design_dir, files_info = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        assert cache.get_columns().id.size == 0
+        cache.sync()
+
+        columns = cache.get_columns()
+        assert columns.generation == cache.get_generation()
+        assert list(columns.id) == sorted(info["id"] for info in files_info)
+        assert not columns.ra.flags.writeable
+        assert cache.get_columns() is columns
+        assert cache.get_positions_filtered(search="science") == [
+            {"id": "fedcba0987654321", "ra": 270.0, "dec": 0.0}
+        ]
+        today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+        assert len(cache.get_positions_filtered(date_from=today)) == len(files_info)
+        assert cache.get_positions_filtered(date_to="2000-01-01") == []
+
+        (design_dir / f"pfsDesign-0x{files_info[0]['id']}.fits").unlink()
+        cache.sync()
+        assert cache.get_columns() is not columns
+        assert files_info[0]["id"] not in cache.get_columns().id
+
+    def test_fiber_filters(self, tmp_path, design_files):
+        """ファイバーの値（副テーブル）による絞り込み"""
+        import sqlite3
+
+        design_dir, files_info = design_files
+        for info, proposal_id, cat_id in ((files_info[0], "S24A-001", 90), (files_info[2], "S24B-002", 91)):
+            create_dummy_pfs_design(
+                design_dir / f"pfsDesign-0x{info['id']}.fits",
+                design_id=info["id"],
+                ra=info["ra"],
+                dec=info["dec"],
+                num_fibers=info["num_fibers"],
+                proposal_id=proposal_id,
+                cat_id=cat_id,
+            )
+        db_path = tmp_path / "cache" / "test.db"
+        cache = PfsDesignCache(db_path, design_dir)
+        cache.sync()
+
+        def ids(fibers: FiberFilter, **kwargs) -> list[str]:
+            entries, _ = cache.get_entries_paginated(sort_by="id", sort_order="asc", fibers=fibers, **kwargs)
+            return [e["id"] for e in entries]
+
+        a, b = files_info[0]["id"], files_info[2]["id"]
+        assert ids(FiberFilter(proposal_id="S24A-001")) == [a]
+        assert ids(FiberFilter(proposal_id="S24A")) == []
+        assert ids(FiberFilter(cat_id=91)) == [b]
+        assert ids(FiberFilter(ob_code="S24")) == [a, b]
+        assert ids(FiberFilter(ob_code="S24B-002_20")) == [b]
+        # 先頭 OB_CODE_PREFIX_LENGTH 文字は一致するが、FITSファイルには一致するファイバーがない
+        assert ids(FiberFilter(ob_code="S24B-002_x")) == []
+        assert ids(FiberFilter(fiber_status=2)) == [a, b]
+        assert ids(FiberFilter(fiber_status=2, cat_id=90)) == [a]
+        assert ids(FiberFilter(ob_code="S24"), search="fedcba09") == [b]
+        # 高度順（メモリ上の列）・順位・位置も同じ条件で絞り込む
+        assert [
+            e["id"]
+            for e in cache.get_entries_paginated(
+                sort_by="altitude", zenith_ra=0.0, zenith_dec=0.0, fibers=FiberFilter(ob_code="S24")
+            )[0]
+        ] == [b, a]
+        assert cache.get_design_rank(a, sort_by="id", sort_order="asc", fibers=FiberFilter(cat_id=91)) is None
+        assert cache.get_design_rank(b, sort_by="id", sort_order="asc", fibers=FiberFilter(ob_code="S")) == 1
+        assert [p["id"] for p in cache.get_positions_filtered(fibers=FiberFilter(cat_id=90))] == [a]
+        assert [e["id"] for e in cache.get_entries_in_cone(0.0, 0.0, 180.0, fibers=FiberFilter(cat_id=91))] == [b]
+
+        # 更新・削除で古い値が消える
+        path = design_dir / f"pfsDesign-0x{a}.fits"
+        create_dummy_pfs_design(path, design_id=a, proposal_id="S25A-003")
+        os.utime(path, (0, path.stat().st_mtime + 10))
+        (design_dir / f"pfsDesign-0x{b}.fits").unlink()
+        cache.sync()
+        assert ids(FiberFilter(ob_code="S24")) == []
+        assert ids(FiberFilter(proposal_id="S25A-003")) == [a]
+        conn = sqlite3.connect(db_path)
+        try:
+            # obCode（"S25A-003_{fiberId}"）は先頭 OB_CODE_PREFIX_LENGTH 文字だけを書き込む
+            assert conn.execute("SELECT * FROM pfs_design_ob_code_prefix").fetchall() == [("S25A-003", 1)]
+            assert conn.execute("SELECT * FROM pfs_design_fiber_status ORDER BY fiber_status").fetchall() == [
+                (1, 1, 99),
+                (2, 1, 1),
+            ]
+        finally:
+            conn.close()
+
+    def test_fiber_tables_migration(self, tmp_path, design_files):
+        """fibers_cached カラムがない既存のDBでは、次の同期でファイバーの値を読み直す"""
+        import sqlite3
+
+        design_dir, files_info = design_files
+        create_dummy_pfs_design(
+            design_dir / f"pfsDesign-0x{files_info[0]['id']}.fits", design_id=files_info[0]["id"], proposal_id="S24A-001"
+        )
+        db_path = tmp_path / "cache" / "test.db"
+        PfsDesignCache(db_path, design_dir).sync()
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("DELETE FROM pfs_design_proposal")
+            conn.execute("ALTER TABLE pfs_design_metadata DROP COLUMN fibers_cached")
+            conn.commit()
+        finally:
+            conn.close()
+
+        cache = PfsDesignCache(db_path, design_dir)
+        assert cache.get_entries_paginated(fibers=FiberFilter(proposal_id="S24A-001"))[1] == 0
+        generation = cache.get_generation()
+        cache.sync()
+        assert cache.get_generation() == generation + 1
+        assert cache.get_entries_paginated(fibers=FiberFilter(proposal_id="S24A-001"))[1] == 1
+        # 読み直した後は再び最新として扱う
+        cache.sync()
+        assert cache.get_generation() == generation + 1
+
+    def test_ob_code_prefix_migration(self, tmp_path, design_files):
+        """obCode 全体の副テーブルがある既存のDBは、先頭部分の副テーブルに置き換える"""
+        import sqlite3
+
+        design_dir, files_info = design_files
+        a = files_info[0]["id"]
+        create_dummy_pfs_design(design_dir / f"pfsDesign-0x{a}.fits", design_id=a, proposal_id="S24A-001")
+        db_path = tmp_path / "cache" / "test.db"
+        PfsDesignCache(db_path, design_dir).sync()
+        # 以前のスキーマに戻す
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.executescript(
+                """
+                DROP TRIGGER pfs_design_fibers_delete;
+                DROP TABLE pfs_design_ob_code_prefix;
+                CREATE TABLE pfs_design_ob_code (
+                    ob_code TEXT NOT NULL,
+                    design_rowid INTEGER NOT NULL,
+                    PRIMARY KEY (ob_code, design_rowid)
+                ) WITHOUT ROWID;
+                CREATE TRIGGER pfs_design_fibers_delete AFTER DELETE ON pfs_design_metadata BEGIN
+                    DELETE FROM pfs_design_ob_code WHERE design_rowid = old.rowid;
+                END;
+                """
+            )
+            conn.executemany(
+                "INSERT INTO pfs_design_ob_code SELECT ?, rowid FROM pfs_design_metadata WHERE id = ?",
+                [(f"S24A-001_{i}", a) for i in range(3)],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        cache = PfsDesignCache(db_path, design_dir)
+        assert cache.get_entries_paginated(fibers=FiberFilter(ob_code="S24A"))[1] == 1
+        # 削除のトリガーも新しい副テーブルを使う
+        (design_dir / f"pfsDesign-0x{a}.fits").unlink()
+        cache.sync()
+        assert cache.get_entries_paginated(fibers=FiberFilter(ob_code="S24A"))[1] == 0
+        conn = sqlite3.connect(db_path)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert "pfs_design_ob_code" not in tables
+            assert conn.execute("SELECT COUNT(*) FROM pfs_design_ob_code_prefix").fetchone()[0] == 0
+        finally:
+            conn.close()
+
+    def test_opdb_seed(self, tmp_path, design_files, monkeypatch):
+        """キャッシュにないDesignはFITSファイルを読む前に opdb から登録する"""
+        from sqlalchemy import create_engine, insert
+
+        from pfs_obslog import models as M
+        from pfs_obslog import pfs_design_cache
+
+        design_dir, files_info = design_files
+        # opdb の pfs_design・pfs_design_fiber テーブルだけを持つDB
+        engine = create_engine(f"sqlite:///{tmp_path / 'opdb.db'}")
+        M.Base.metadata.create_all(engine, tables=[M.PfsDesign.__table__, M.t_pfs_design_fiber])
+        seeded = {files_info[0]["id"]: [1, 2, 3], files_info[2]["id"]: [1, 1]}
+        with engine.begin() as conn:
+            for info in files_info:
+                pfs_design_id = pfs_design_cache._signed_design_id(info["id"])
+                conn.execute(
+                    insert(M.PfsDesign).values(
+                        pfs_design_id=pfs_design_id,
+                        variant=0,
+                        design_id0=0,
+                        design_name=f"opdb {info['name']}",
+                        ra_center_designed=info["ra"],
+                        dec_center_designed=info["dec"],
+                        num_guide_stars=6,
+                    )
+                )
+                # ファイバーの行がないDesignは登録しない
+                for fiber_id, target_type in enumerate(seeded.get(info["id"], []), 1):
+                    conn.execute(
+                        insert(M.t_pfs_design_fiber).values(
+                            pfs_design_id=pfs_design_id, fiber_id=fiber_id, target_type=target_type
+                        )
+                    )
+
+        monkeypatch.setattr(pfs_design_cache, "PARALLEL_SYNC_THRESHOLD", 0)
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir, sync_workers=1, opdb_engine=engine)
+        # FITSファイルを読まずに、opdb から登録した行だけを確認する
+        with patch.object(PfsDesignCache, "_update_entry"):
+            cache.sync()
+        entries = {e["id"]: e for e in cache.get_all_entries()}
+        assert set(entries) == set(seeded)
+        entry = entries[files_info[2]["id"]]
+        assert entry["name"] == "opdb Science Target"
+        assert (entry["ra"], entry["dec"]) == (270.0, 0.0)
+        assert entry["arms"] == "-"
+        assert entry["num_design_rows"] == 2
+        assert entry["num_guidestar_rows"] == 6
+        assert entry["design_rows"]["science"] == 2
+        assert entries[files_info[0]["id"]]["design_rows"] == {
+            "science": 1,
+            "sky": 1,
+            "fluxstd": 1,
+            "unassigned": 0,
+            "engineering": 0,
+            "sunss_imaging": 0,
+            "sunss_diffuse": 0,
+        }
+        assert cache.get_generation() == 2
+        assert [p["id"] for p in cache.get_positions_filtered(search="opdb")] == sorted(seeded)
+
+        # 次の同期でFITSファイルの値に置き換わる
+        cache.sync()
+        entries = {e["id"]: e for e in cache.get_all_entries()}
+        assert len(entries) == len(files_info)
+        entry = entries[files_info[2]["id"]]
+        assert entry["name"] == "Science Target"
+        assert entry["arms"] == "bmn"
+        assert entry["num_design_rows"] == 200
+        cache.close()
+
+    def test_opdb_seed_unavailable(self, tmp_path, design_files, monkeypatch):
+        """opdb から読めない場合はFITSファイルだけから読む"""
+        from sqlalchemy import create_engine
+
+        from pfs_obslog import pfs_design_cache
+
+        design_dir, files_info = design_files
+        monkeypatch.setattr(pfs_design_cache, "PARALLEL_SYNC_THRESHOLD", 0)
+        # テーブルのないDB
+        engine = create_engine(f"sqlite:///{tmp_path / 'opdb.db'}")
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir, sync_workers=1, opdb_engine=engine)
+        assert cache.sync() is True
+        assert len(cache.get_all_entries()) == len(files_info)
+        cache.close()
+
+    @pytest.mark.timeout(60)
+    def test_opdb_seed_unreachable(self, tmp_path, design_files, monkeypatch):
+        """opdb が応答しない場合は接続のタイムアウトの後、FITSファイルだけから読む"""
+        import socket
+        import time
+
+        from pfs_obslog import pfs_design_cache
+
+        design_dir, files_info = design_files
+        monkeypatch.setattr(pfs_design_cache, "PARALLEL_SYNC_THRESHOLD", 0)
+        # psycopg の接続タイムアウトの最小値は2秒
+        monkeypatch.setattr(pfs_design_cache, "OPDB_CONNECT_TIMEOUT", 2)
+        # 接続を受け付けるが何も返さないサーバー
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen()
+            port = server.getsockname()[1]
+            engine = pfs_design_cache.create_opdb_engine(f"postgresql://pfs@127.0.0.1:{port}/opdb")
+            cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir, sync_workers=1, opdb_engine=engine)
+            start_time = time.time()
+            assert cache.sync() is True
+            assert time.time() - start_time < 10
+        assert len(cache.get_all_entries()) == len(files_info)
+        cache.close()
+
+    def test_update_files(self, tmp_path, design_files):
+        """指定したファイルだけを反映する"""
+        design_dir, files_info = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        first, second = (f"pfsDesign-0x{info['id']}.fits" for info in files_info[:2])
+
+        assert cache.update_files([first, "unrelated.txt"]) is True
+        assert [e["id"] for e in cache.get_all_entries()] == [files_info[0]["id"]]
+        assert cache.get_generation() == 1
+
+        (design_dir / first).unlink()
+        assert cache.update_files([first, second]) is True
+        assert [e["id"] for e in cache.get_all_entries()] == [files_info[1]["id"]]
+        assert cache.get_generation() == 2
+
+        # 変わっていなければ世代は進まない
+        cache.update_files([second])
+        assert cache.get_generation() == 2
+
+    def test_search(self, tmp_path, design_files):
+        """全文検索インデックスでの検索（部分一致、大文字小文字を区別しない）"""
+        design_dir, files_info = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        cache.sync()
+
+        def search(text):
+            entries, total = cache.get_entries_paginated(search=text)
+            assert total == len(entries)
+            return sorted(e["id"] for e in entries)
+
+        assert search("test design") == ["1234567890abcdef", "abcdef1234567890"]
+        assert search("TARGET") == ["fedcba0987654321"]
+        assert search("0xfedcba") == ["fedcba0987654321"]  # ファイル名
+        assert search('"quoted"') == []
+        # 3文字未満はLIKEで検索する
+        assert search("bm") == ["abcdef1234567890", "fedcba0987654321"]
+        assert [p["id"] for p in cache.get_positions_filtered(search="target")] == ["fedcba0987654321"]
+        assert cache.get_design_rank("fedcba0987654321", search="science") == 0
+
+    def test_search_index_follows_updates(self, tmp_path, design_files):
+        """キャッシュの更新・削除が全文検索インデックスに反映される"""
+        design_dir, files_info = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        cache.sync()
+        path = design_dir / f"pfsDesign-0x{files_info[2]['id']}.fits"
+        create_dummy_pfs_design(path, design_id=files_info[2]["id"], name="Renamed")
+        os.utime(path, (0, path.stat().st_mtime + 10))
+        cache.sync()
+        assert cache.get_entries_paginated(search="science")[1] == 0
+        assert cache.get_entries_paginated(search="renamed")[1] == 1
+
+        path.unlink()
+        cache.sync()
+        assert cache.get_entries_paginated(search="renamed")[1] == 0
+
+    def test_search_index_migration(self, tmp_path, design_files):
+        """全文検索インデックスがない既存のDBでは既存の行からインデックスを作る"""
+        import sqlite3
+
+        design_dir, _ = design_files
+        db_path = tmp_path / "cache" / "test.db"
+        PfsDesignCache(db_path, design_dir).sync()
+        conn = sqlite3.connect(db_path)
+        try:
+            for trigger in ("insert", "delete", "update"):
+                conn.execute(f"DROP TRIGGER pfs_design_search_{trigger}")
+            conn.execute("DROP TABLE pfs_design_search")
+            conn.commit()
+        finally:
+            conn.close()
+
+        cache = PfsDesignCache(db_path, design_dir)
+        assert cache.get_entries_paginated(search="target")[1] == 1
+
+    def test_cone_search(self, tmp_path, design_files):
+        """空間インデックスによるコーンサーチ"""
+        design_dir, _ = design_files
+        cache = PfsDesignCache(tmp_path / "cache" / "test.db", design_dir)
+        cache.sync()
+
+        entries = cache.get_entries_in_cone(180.0, 40.0, 10.0)
+        assert [e["id"] for e in entries] == ["1234567890abcdef"]
+        assert entries[0]["separation"] == pytest.approx(5.0)
+        assert cache.get_entries_in_cone(180.0, 40.0, 4.9) == []
+
+        # 近い順
+        entries = cache.get_entries_in_cone(100.0, -30.0, 180.0)
+        assert [e["id"] for e in entries] == ["abcdef1234567890", "1234567890abcdef", "fedcba0987654321"]
+        assert [e["separation"] for e in entries] == pytest.approx([8.6575, 104.3128, 148.5251], abs=1e-4)
+        assert [e["id"] for e in cache.get_entries_in_cone(100.0, -30.0, 180.0, limit=1)] == [
+            "abcdef1234567890"
+        ]
+        # 検索・日付フィルターとの組み合わせ
+        assert [e["id"] for e in cache.get_entries_in_cone(0.0, 0.0, 180.0, search="science")] == [
+            "fedcba0987654321"
+        ]
+        assert cache.get_entries_in_cone(0.0, 0.0, 180.0, date_to="2000-01-01") == []
+
+    def test_cone_search_index_migration(self, tmp_path, design_files):
+        """空間インデックスがない既存のDBでは既存の行からインデックスを作る"""
+        import sqlite3
+
+        design_dir, _ = design_files
+        db_path = tmp_path / "cache" / "test.db"
+        PfsDesignCache(db_path, design_dir).sync()
+        conn = sqlite3.connect(db_path)
+        try:
+            for trigger in ("insert", "delete", "update"):
+                conn.execute(f"DROP TRIGGER pfs_design_position_{trigger}")
+            conn.execute("DROP TABLE pfs_design_position")
+            conn.commit()
+        finally:
+            conn.close()
+
+        cache = PfsDesignCache(db_path, design_dir)
+        assert len(cache.get_entries_in_cone(0.0, 0.0, 180.0)) == 3
@@ -0,0 +1,100 @@
+"""PFS Design ディレクトリ監視のテスト"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from pfs_obslog.pfs_design_cache import PfsDesignCache
+from pfs_obslog.pfs_design_watch import (
+    PfsDesignWatchService,
+    start_pfs_design_watcher,
+    stop_pfs_design_watcher,
+)
+
+
+@pytest.fixture
+def service(tmp_path):
+    cache = MagicMock(spec=PfsDesignCache)
+    cache.design_dir = tmp_path
+    cache.sync.return_value = True
+    cache.update_files.return_value = True
+    service = PfsDesignWatchService(cache, tmp_path / "watch.lock")
+    service.MIN_RESCAN_INTERVAL = 0.0
+    return service
+
+
+class TestPfsDesignWatchService:
+    """変更の反映のテスト"""
+
+    def test_nothing_pending(self, service):
+        service.record(set())
+        assert not service._due()
+
+    def test_debounce(self, service):
+        """最後の変更から DEBOUNCE 秒経つまでは反映しない"""
+        service.DEBOUNCE = 60.0
+        service.record({"pfsDesign-0x0000000000000001.fits"})
+        assert not service._due()
+        assert 0.0 < service._timeout() <= 1.0
+
+        service.DEBOUNCE = 0.0
+        assert service._due()
+        service.flush()
+        service.cache.update_files.assert_called_once_with({"pfsDesign-0x0000000000000001.fits"})
+        service.cache.sync.assert_not_called()
+        assert not service._due()
+
+    def test_max_delay(self, service):
+        """変更が続いていても MAX_DELAY 秒経ったら反映する"""
+        service.DEBOUNCE = 60.0
+        service.MAX_DELAY = 0.0
+        service.record({"a.fits"})
+        assert service._due()
+
+    def test_min_rescan_interval(self, service):
+        """前回の反映から MIN_RESCAN_INTERVAL 秒経つまでは反映しない"""
+        service.DEBOUNCE = 0.0
+        service.record({"a.fits"})
+        service.flush()
+        service.MIN_RESCAN_INTERVAL = 60.0
+        service.record({"b.fits"})
+        assert not service._due()
+
+    def test_unknown_change_rescans(self, service):
+        """どのファイルか不明な変更はディレクトリ全体を走査する"""
+        service.DEBOUNCE = 0.0
+        service.record({"a.fits"})
+        service.record(None)
+        service.flush()
+        service.cache.sync.assert_called_once()
+        service.cache.update_files.assert_not_called()
+
+    def test_keeps_changes_while_other_worker_syncs(self, service):
+        """他のワーカーが同期中の場合は変更を残して後で反映する"""
+        service.DEBOUNCE = 0.0
+        service.cache.update_files.return_value = False
+        service.record({"a.fits"})
+        service.flush()
+        assert service._due()
+
+        service.cache.update_files.return_value = True
+        service.record({"b.fits"})
+        service.flush()
+        service.cache.update_files.assert_called_with({"a.fits", "b.fits"})
+
+
+def test_start_without_design_dir(tmp_path, monkeypatch):
+    """ディレクトリがなくても監視を開始する（ディレクトリができるまで待つ）"""
+    from pfs_obslog.config import get_settings
+    from pfs_obslog.pfs_design_cache import clear_pfs_design_cache
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, "pfs_design_cache_enabled", True)
+    monkeypatch.setattr(settings, "pfs_design_watch_enabled", True)
+    monkeypatch.setattr(settings, "pfs_design_dir", tmp_path / "not-mounted-yet")
+    monkeypatch.setattr(type(settings), "cache_dir", property(lambda self: tmp_path / "cache"))
+    try:
+        assert start_pfs_design_watcher() is not None
+    finally:
+        stop_pfs_design_watcher()
+        clear_pfs_design_cache()
@@ -5,6 +5,8 @@ Note: pfs.datamodel が必要です。インストールされていない場合
       セットアップ方法は backend/README.md を参照してください。
 """
 
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -92,3 +94,229 @@ class TestPfsDesignDetailAPI:
         """存在しないDesignへのアクセスは404を返す"""
         response = authenticated_client.get("/api/pfs_designs/0000000000000000")
         assert response.status_code == 404
+
+
+class TestPfsDesignConeAPI:
+    """コーンサーチ API のテスト（キャッシュを差し替えてデータディレクトリ不要にする）"""
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        from unittest.mock import MagicMock
+
+        from pfs_obslog.config import get_settings
+        from pfs_obslog.pfs_design_cache import PfsDesignCache
+        from pfs_obslog.routers import pfs_designs
+
+        monkeypatch.setattr(get_settings(), "pfs_design_dir", tmp_path)
+        cache = MagicMock(spec=PfsDesignCache)
+        cache.get_entries_in_cone.return_value = []
+        monkeypatch.setattr(pfs_designs, "get_pfs_design_cache", lambda *args: cache)
+        return cache
+
+    def test_cone(self, authenticated_client: TestClient, cache):
+        response = authenticated_client.get(
+            "/api/pfs_designs/cone",
+            params={"ra": 150.0, "dec": 2.0, "radius": 1.5, "search": "cosmos", "date_from": "2025-01-01"},
+        )
+        assert response.status_code == 200
+        assert response.json() == []
+        cache.get_entries_in_cone.assert_called_once_with(
+            ra=150.0,
+            dec=2.0,
+            radius=1.5,
+            search="cosmos",
+            date_from="2025-01-01",
+            date_to=None,
+            limit=1000,
+            fibers=None,
+        )
+
+    def test_invalid_radius(self, authenticated_client: TestClient, cache):
+        response = authenticated_client.get("/api/pfs_designs/cone", params={"ra": 0, "dec": 0, "radius": 0})
+        assert response.status_code == 422
+
+
+class TestPfsDesignDetailCache:
+    """詳細のキャッシュと ETag のテスト（データディレクトリとキャッシュを一時ディレクトリに差し替える）"""
+
+    DESIGN_ID = "00000000000abcde"
+
+    @pytest.fixture
+    def design_dir(self, tmp_path, monkeypatch):
+        from pfs_obslog.config import get_settings
+        from pfs_obslog.filecache import FileCache
+        from pfs_obslog.routers import pfs_designs
+        from test_pfs_design_cache import create_dummy_pfs_design
+
+        design_dir = tmp_path / "designs"
+        design_dir.mkdir()
+        create_dummy_pfs_design(design_dir / f"pfsDesign-0x{self.DESIGN_ID}.fits", num_fibers=4)
+        monkeypatch.setattr(get_settings(), "pfs_design_dir", design_dir)
+        cache = FileCache(tmp_path / "cache", 16 * 1024 * 1024)
+        monkeypatch.setattr(pfs_designs, "get_design_detail_cache", lambda: cache)
+        return design_dir
+
+    @pytest.mark.timeout(60)
+    def test_cached(self, authenticated_client: TestClient, design_dir, monkeypatch):
+        """2回目以降はファイルを読まずにキャッシュから返す"""
+        from pfs_obslog.routers import pfs_designs
+
+        response = authenticated_client.get(f"/api/pfs_designs/{self.DESIGN_ID}")
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["design_data"]["fiberId"]) == 4
+        assert len(body["guidestar_data"]["ra"]) == 6
+        etag = response.headers["etag"]
+
+        def fail(*args):
+            raise AssertionError("design file should not be read")
+
+        monkeypatch.setattr(pfs_designs, "_read_design_detail", fail)
+        cached = authenticated_client.get(f"/api/pfs_designs/{self.DESIGN_ID}")
+        assert cached.status_code == 200
+        assert cached.content == response.content
+        assert cached.headers["etag"] == etag
+
+    @pytest.mark.timeout(60)
+    def test_not_modified(self, authenticated_client: TestClient, design_dir):
+        """ETag が一致すれば304、ファイルが変われば ETag も変わる"""
+        import os
+
+        url = f"/api/pfs_designs/{self.DESIGN_ID}"
+        etag = authenticated_client.get(url).headers["etag"]
+        response = authenticated_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        path = design_dir / f"pfsDesign-0x{self.DESIGN_ID}.fits"
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        response = authenticated_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    @pytest.mark.timeout(60)
+    def test_fibers(self, authenticated_client: TestClient, design_dir):
+        """ファイバーの列を型付き配列で返す（ない列は既定値、文字列は値の一覧と番号）"""
+        import struct
+
+        import numpy as np
+        import orjson
+
+        from pfs_obslog.columnar import COLUMNS_MEDIA_TYPE
+
+        response = authenticated_client.get(f"/api/pfs_designs/{self.DESIGN_ID}/fibers")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == COLUMNS_MEDIA_TYPE
+        content = response.content
+        (header_length,) = struct.unpack_from("<I", content)
+        header = orjson.loads(content[4 : 4 + header_length])
+        assert header["length"] == 4
+        columns = {column["name"]: column for column in header["columns"]}
+        assert columns["objId"]["dtype"] == "int64"
+
+        def column(name):
+            dtype = np.dtype(columns[name]["dtype"]).newbyteorder("<")
+            return np.frombuffer(content, dtype=dtype, count=4, offset=columns[name]["offset"])
+
+        np.testing.assert_array_equal(column("fiberId"), [1, 2, 3, 4])
+        np.testing.assert_array_equal(column("ra"), [180.0] * 4)
+        np.testing.assert_array_equal(column("pfiNominalX"), [0.0] * 4)
+        assert header["categories"]["epoch"] == ["J2000.0"]
+        np.testing.assert_array_equal(column("epoch"), [0] * 4)
+        assert header["guidestars"]["dec"] == [45.0] * 6
+
+        etag = response.headers["etag"]
+        assert etag != authenticated_client.get(f"/api/pfs_designs/{self.DESIGN_ID}").headers["etag"]
+        response = authenticated_client.get(
+            f"/api/pfs_designs/{self.DESIGN_ID}/fibers", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+
+class TestPfsDesignListCursorAPI:
+    """カーソルによるページ送り・ファイバーの値による絞り込み・世代の ETag のテスト
+    （一時ディレクトリのキャッシュを使う）
+    """
+
+    DESIGN_IDS = ["0000000000000001", "0000000000000002", "0000000000000003"]
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        from pfs_obslog.config import get_settings
+        from pfs_obslog.pfs_design_cache import PfsDesignCache
+        from pfs_obslog.routers import pfs_designs
+        from test_pfs_design_cache import create_dummy_pfs_design
+
+        design_dir = tmp_path / "designs"
+        design_dir.mkdir()
+        for design_id in self.DESIGN_IDS:
+            create_dummy_pfs_design(design_dir / f"pfsDesign-0x{design_id}.fits", design_id, num_fibers=4)
+        monkeypatch.setattr(get_settings(), "pfs_design_dir", design_dir)
+        cache = PfsDesignCache(tmp_path / "cache.db", design_dir, sync_workers=1)
+        cache.sync()
+        monkeypatch.setattr(pfs_designs, "get_pfs_design_cache", lambda *args: cache)
+        yield cache
+        cache.close()
+
+    @pytest.mark.timeout(60)
+    def test_cursor(self, authenticated_client: TestClient, cache):
+        params = {"sort_by": "id", "sort_order": "asc", "limit": 2}
+        first = authenticated_client.get("/api/pfs_designs", params=params).json()
+        assert [item["id"] for item in first["items"]] == self.DESIGN_IDS[:2]
+        assert first["total"] == 3
+        second = authenticated_client.get(
+            "/api/pfs_designs", params={**params, "cursor": first["next_cursor"]}
+        ).json()
+        assert [item["id"] for item in second["items"]] == self.DESIGN_IDS[2:]
+        assert second["total"] == 3
+        assert second["next_cursor"] is None
+
+        response = authenticated_client.get(
+            "/api/pfs_designs", params={"sort_by": "name", "cursor": first["next_cursor"]}
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.timeout(60)
+    def test_fiber_filters(self, authenticated_client: TestClient, cache, tmp_path, monkeypatch):
+        from pfs_obslog.config import get_settings
+        from test_pfs_design_cache import create_dummy_pfs_design
+
+        design_id = self.DESIGN_IDS[1]
+        path = tmp_path / "designs" / f"pfsDesign-0x{design_id}.fits"
+        create_dummy_pfs_design(path, design_id, num_fibers=4, proposal_id="S24A-001", cat_id=90)
+        os.utime(path, (0, path.stat().st_mtime + 10))
+        cache.sync()
+
+        for params in ({"proposal_id": "S24A-001"}, {"cat_id": 90}, {"ob_code": "S24A"}, {"fiber_status": 2}):
+            body = authenticated_client.get("/api/pfs_designs", params=params).json()
+            assert [item["id"] for item in body["items"]] == [design_id]
+            positions = authenticated_client.get("/api/pfs_designs/positions", params=params).json()
+            assert [position["id"] for position in positions] == [design_id]
+        rank = authenticated_client.get(f"/api/pfs_designs/rank/{design_id}", params={"cat_id": 90}).json()
+        assert rank["rank"] == 0
+        assert authenticated_client.get("/api/pfs_designs", params={"cat_id": 91}).json()["total"] == 0
+
+        # 副テーブルがないキャッシュ無効時は使えない
+        monkeypatch.setattr(get_settings(), "pfs_design_cache_enabled", False)
+        response = authenticated_client.get("/api/pfs_designs", params={"cat_id": 90})
+        assert response.status_code == 400
+
+    @pytest.mark.timeout(60)
+    def test_not_modified(self, authenticated_client: TestClient, cache, tmp_path):
+        """キャッシュの内容が変わるまで一覧・位置・順位は304を返す"""
+        urls = ["/api/pfs_designs", "/api/pfs_designs/positions", f"/api/pfs_designs/rank/{self.DESIGN_IDS[0]}"]
+        etags = {}
+        for url in urls:
+            response = authenticated_client.get(url)
+            assert response.status_code == 200
+            etags[url] = response.headers["etag"]
+            response = authenticated_client.get(url, headers={"If-None-Match": etags[url]})
+            assert response.status_code == 304
+
+        (tmp_path / "designs" / f"pfsDesign-0x{self.DESIGN_IDS[0]}.fits").unlink()
+        cache.sync()
+        for url in urls:
+            response = authenticated_client.get(url, headers={"If-None-Match": etags[url]})
+            assert response.status_code == 200
+            assert response.headers["etag"] != etags[url]
@@ -13,6 +13,20 @@ class TestMcsDataChartAuth:
         assert response.status_code == 401
         assert response.json()["detail"] == "Not authenticated"
 
+    def test_mcs_data_arrays_requires_auth(self, client: TestClient):
+        """認証なしでMCSデータの配列にアクセスすると401を返す"""
+        response = client.get("/api/mcs_data/1")
+        assert response.status_code == 401
+
+
+class TestMcsDataArrays:
+    """GET /api/mcs_data/{frame_id} のテスト"""
+
+    def test_mcs_data_arrays_not_found(self, authenticated_client: TestClient):
+        """存在しないframe_idでは204を返す"""
+        response = authenticated_client.get("/api/mcs_data/999999999")
+        assert response.status_code == 204
+
 
 class TestMcsDataChart:
     """GET /api/mcs_data/{frame_id}.png のテスト"""
@@ -92,3 +106,79 @@ class TestMcsDataChart:
         """無効なテーマでは422を返す"""
         response = authenticated_client.get("/api/mcs_data/1.png?theme=invalid")
         assert response.status_code == 422
+
+    def test_mcs_data_chart_invalid_format(self, authenticated_client: TestClient):
+        """無効な出力形式では422を返す"""
+        response = authenticated_client.get("/api/mcs_data/1.png?format=gif")
+        assert response.status_code == 422
+
+
+class TestMcsDataChartCache:
+    """MCSデータチャートのキャッシュのテスト（DBの代わりに取得関数を差し替える）"""
+
+    @pytest.fixture
+    def fetch_arrays(self, tmp_path):
+        from unittest.mock import AsyncMock, patch
+
+        import numpy as np
+
+        from pfs_obslog.filecache import FileCache
+
+        rng = np.random.default_rng(0)
+        arrays = {
+            "mcs_center_x_pix": rng.uniform(0, 8000, 100).astype(np.float32),
+            "mcs_center_y_pix": rng.uniform(0, 5000, 100).astype(np.float32),
+            "peakvalue": rng.uniform(0, 1000, 100).astype(np.float32),
+        }
+        with (
+            patch("pfs_obslog.routers.plot.fetch_arrays", AsyncMock(return_value=arrays)) as mock,
+            patch(
+                "pfs_obslog.routers.plot.get_chart_cache",
+                return_value=FileCache(tmp_path / "charts", max_bytes=1024 * 1024),
+            ),
+        ):
+            yield mock
+
+    def test_cached_and_immutable(self, authenticated_client: TestClient, fetch_arrays):
+        """2回目はDBを参照せず、ETagが一致すれば304を返す"""
+        response = authenticated_client.get("/api/mcs_data/1.png?theme=dark")
+        assert response.status_code == 200
+        assert "immutable" in response.headers["cache-control"]
+        etag = response.headers["etag"]
+
+        second = authenticated_client.get("/api/mcs_data/1.png?theme=dark")
+        assert second.content == response.content
+        assert fetch_arrays.await_count == 1
+
+        not_modified = authenticated_client.get(
+            "/api/mcs_data/1.png?theme=dark", headers={"if-none-match": etag}
+        )
+        assert not_modified.status_code == 304
+
+        # テーマが異なれば別の画像
+        other = authenticated_client.get("/api/mcs_data/1.png?theme=light")
+        assert other.headers["etag"] != etag
+        assert fetch_arrays.await_count == 2
+
+
+class TestColorScatterPlot:
+    """散布図生成のテスト（DB不要）"""
+
+    @pytest.mark.parametrize("fmt", ["png", "webp", "jpeg"])
+    def test_output_format(self, fmt):
+        """指定した形式で出力される"""
+        import io
+
+        import numpy as np
+        from PIL import Image
+
+        from pfs_obslog.imageformat import ImageFormat
+        from pfs_obslog.routers.plot import _create_color_scatter_plot
+
+        rng = np.random.default_rng(0)
+        x, y, z = rng.random((3, 100))
+        encoded = _create_color_scatter_plot(x, y, z, 320, 240, "light", ImageFormat(fmt), 80)
+
+        img = Image.open(io.BytesIO(encoded.content))
+        assert img.format == fmt.upper()
+        assert img.size == (320, 240)
@@ -0,0 +1,110 @@
+"""プレビュー画像の事前生成のテスト"""
+
+import datetime
+import os
+from unittest.mock import patch
+
+import numpy as np
+
+from pfs_obslog.filecache import FileCache
+from pfs_obslog.fits_cache import FitsCache
+from pfs_obslog.prerender import PrerenderQueue, classify, prerender_file, target_directories
+
+
+def _touch(path, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestClassify:
+    """対象ファイルの判定のテスト"""
+
+    def test_targets(self, tmp_path):
+        assert classify(tmp_path / "sps" / "PFSA12345611.fits") == "sps"
+        assert classify(tmp_path / "ramps" / "PFSB12345613.fits") == "ramps"
+        assert classify(tmp_path / "mcs" / "PFSC12345600.fits") == "mcs"
+        assert classify(tmp_path / "agcc" / "agcc_123456_00012345.fits") == "agcc"
+
+    def test_non_targets(self, tmp_path):
+        assert classify(tmp_path / "sps" / "PFSA12345611.fits.tmp") is None
+        assert classify(tmp_path / "sps" / "PFSC12345600.fits") is None
+        assert classify(tmp_path / "other" / "PFSA12345611.fits") is None
+
+
+class TestTargetDirectories:
+    """監視ディレクトリのテスト"""
+
+    def test_today_and_yesterday(self, tmp_path):
+        now = datetime.datetime(2025, 3, 1, 2, 0, tzinfo=datetime.timezone.utc)
+        directories = target_directories(tmp_path, now)
+        assert tmp_path / "raw" / "2025-03-01" / "sps" in directories
+        assert tmp_path / "raw" / "2025-02-28" / "agcc" in directories
+        assert len(directories) == 8
+
+
+class TestPrerenderQueue:
+    """待ち行列のテスト"""
+
+    def test_priority(self, tmp_path):
+        """SPS → MCS → AGC の順、同じ種類では新しいものから"""
+        queue = PrerenderQueue()
+        agc = _touch(tmp_path / "agcc" / "agcc_000001_00000001.fits", 300)
+        mcs = _touch(tmp_path / "mcs" / "PFSC00000100.fits", 200)
+        sps_old = _touch(tmp_path / "sps" / "PFSA00000111.fits", 100)
+        sps_new = _touch(tmp_path / "sps" / "PFSA00000211.fits", 150)
+        for path in (agc, mcs, sps_old, sps_new):
+            assert queue.push(path)
+
+        assert [queue.pop()[0] for _ in range(4)] == [sps_new, sps_old, mcs, agc]
+
+    def test_ignores_duplicates_and_non_targets(self, tmp_path):
+        queue = PrerenderQueue()
+        path = _touch(tmp_path / "sps" / "PFSA00000111.fits", 100)
+        assert queue.push(path)
+        assert not queue.push(path)
+        assert not queue.push(_touch(tmp_path / "sps" / "note.txt", 100))
+        assert len(queue) == 1
+
+    def test_drops_lowest_priority_when_full(self, tmp_path):
+        queue = PrerenderQueue(max_size=2)
+        agc = _touch(tmp_path / "agcc" / "agcc_000001_00000001.fits", 300)
+        mcs = _touch(tmp_path / "mcs" / "PFSC00000100.fits", 200)
+        sps = _touch(tmp_path / "sps" / "PFSA00000111.fits", 100)
+        for path in (agc, mcs, sps):
+            queue.push(path)
+        assert len(queue) == 2
+        assert [queue.pop()[0] for _ in range(2)] == [sps, mcs]
+
+
+class TestPrerenderFile:
+    """プレビュー生成のテスト"""
+
+    def test_renders_all_agc_hdus_into_preview_cache(self, tmp_path):
+        """AGCは全ての画像HDUを生成し、APIと同じキーでキャッシュに保存する"""
+        import astropy.io.fits as afits
+
+        from pfs_obslog.imageformat import default_format, resolve_quality
+        from pfs_obslog.routers.fits import _preview_key
+
+        path = tmp_path / "agcc" / "agcc_000001_00000001.fits"
+        path.parent.mkdir()
+        rng = np.random.default_rng(0)
+        afits.HDUList(
+            [afits.PrimaryHDU()]
+            + [afits.ImageHDU(rng.normal(100, 10, (32, 32)).astype(np.float32)) for _ in range(2)]
+        ).writeto(path)
+
+        preview_cache = FileCache(tmp_path / "previews", max_bytes=1024 * 1024)
+        with (
+            patch("pfs_obslog.routers.fits.get_preview_cache", return_value=preview_cache),
+            patch("pfs_obslog.routers.fits.get_fits_cache", return_value=FitsCache(tmp_path / "fits.db")),
+        ):
+            assert prerender_file(path, "agcc") == 2
+
+        st = path.stat()
+        fmt = default_format()
+        for hdu_index in (1, 2):
+            key = _preview_key(path, st, 512, 512, hdu_index, fmt, resolve_quality(None))
+            assert preview_cache.get(key) is not None
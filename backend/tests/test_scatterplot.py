@@ -0,0 +1,63 @@
+"""カラー散布図のラスタライザのテスト"""
+
+import numpy as np
+import pytest
+
+from pfs_obslog.scatterplot import (
+    THEMES,
+    axes_template,
+    colormap_lut,
+    nice_step,
+    render_color_scatter,
+    ticks,
+)
+
+
+class TestTicks:
+    """目盛りの計算のテスト"""
+
+    @pytest.mark.parametrize(
+        "lo, hi, max_ticks, expected",
+        [(0, 9000, 6, 2000), (0, 1, 5, 0.2), (100, 150, 5, 10), (0, 0, 5, 1.0)],
+    )
+    def test_nice_step(self, lo, hi, max_ticks, expected):
+        assert nice_step(lo, hi, max_ticks) == pytest.approx(expected)
+
+    def test_ticks(self):
+        assert ticks(-230, 9230, 2000) == [0, 2000, 4000, 6000, 8000]
+
+
+class TestRenderColorScatter:
+    """散布図の描画のテスト"""
+
+    def test_points_use_colormap(self):
+        """点の色はカラーマップの両端の色になる"""
+        x = np.array([0.0, 100.0])
+        y = np.array([0.0, 100.0])
+        z = np.array([1.0, 2.0])
+        image = np.asarray(render_color_scatter(x, y, z, 320, 240, "light"))
+        assert image.shape == (240, 320, 3)
+
+        lut = colormap_lut(THEMES["light"].cmap)
+        pixels = {tuple(p) for p in image.reshape(-1, 3)}
+        assert tuple(lut[0]) in pixels
+        assert tuple(lut[255]) in pixels
+
+    def test_template_is_shared(self):
+        """軸範囲が同じになるデータではテンプレートを再利用する"""
+        rng = np.random.default_rng(0)
+        axes_template.cache_clear()
+        for _ in range(3):
+            x, y = rng.uniform(200, 8800, 1000), rng.uniform(300, 5500, 1000)
+            x[:2], y[:2] = (200, 8800), (300, 5500)
+            render_color_scatter(x, y, rng.random(1000), 640, 480, "dark")
+        info = axes_template.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+    def test_non_finite_and_tiny(self):
+        """有限でない値や小さい画像サイズでもエラーにならない"""
+        x = np.array([np.nan, 1.0, 2.0])
+        y = np.array([1.0, np.inf, 2.0])
+        z = np.array([1.0, 1.0, np.nan])
+        assert render_color_scatter(x, y, z, 320, 240).size == (320, 240)
+        assert render_color_scatter(np.arange(3.0), np.arange(3.0), np.ones(3), 10, 10).size == (10, 10)